@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite cho crawler/OCR pipeline (kiểu asv, không cần thêm dependency).
+
+Sử dụng:
+    python benchmarks/bench.py list
+    python benchmarks/bench.py run [-k extract] [-r 5]
+    python benchmarks/bench.py compare [BASE.json] [HEAD.json] [-t 0.1]
+    python benchmarks/bench.py importtime [-b 300]
+
+Kết quả mỗi lần chạy được lưu vào benchmarks/results/<timestamp>_<commit>.json.
+`compare` không có tham số sẽ so sánh 2 lần chạy gần nhất và trả về exit code 1
+nếu có benchmark chậm hơn ngưỡng (mặc định 10% theo median).
+`importtime` kiểm tra budget thời gian import (-X importtime) của các CLI.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+FIXTURES = BENCH_DIR / "fixtures"
+RESULTS_DIR = BENCH_DIR / "results"
+OCR_DATA = ROOT / "ocr" / "data"
+
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "ocr"))
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str = None, setup=None, number: int = 1):
+    """
+    Đăng ký một benchmark. `setup()` (không tính giờ) trả về tuple args cho hàm
+    benchmark; `number` là số lần gọi trong một lần đo.
+    """
+    def decorator(func):
+        BENCHMARKS[name or func.__name__.removeprefix("bench_")] = {
+            "func": func, "setup": setup, "number": number,
+        }
+        return func
+    return decorator
+
+
+# ==========================================================
+# FIXTURES
+# ==========================================================
+# Fixture tổng hợp (viết tay theo markup của thuvienphapluat.vn, nội dung Điều bịa),
+# không phải trang lưu từ web: chỉ dùng so sánh tương đối giữa các lần chạy
+SAMPLE_HTML = FIXTURES / "nghi_dinh_47_2021.html"
+SAMPLE_DOC_NAME = "Nghị định 47/2021/NĐ-CP"
+SAMPLE_PDF = OCR_DATA / "QTQL.KH.5.2 quy trinh KCB BHYT_compressed.pdf"
+OCR_TXT_3500 = OCR_DATA / "Quyet_dinh_3500-QĐ-BYT.txt"
+OCR_TXT_3467 = OCR_DATA / "Quyet_dinh_3467-QD-BYT.txt"
+
+# Trang thật dài hơn fixture nhiều, nhân bản nội dung để có kích thước sát thực tế
+HTML_SCALE = 25
+
+_cache = {}
+
+
+def load_html() -> str:
+    """Fixture HTML với nội dung content1 được nhân bản HTML_SCALE lần."""
+    if "html" not in _cache:
+        html = SAMPLE_HTML.read_text(encoding="utf-8")
+        start = html.index('<div class="content1">') + len('<div class="content1">')
+        end = html.index('<div class="tt_')
+        body = html[start:end]
+        _cache["html"] = html[:start] + body * HTML_SCALE + html[end:]
+    return _cache["html"]
+
+
+def load_content() -> str:
+    """Output của extract_content trên fixture HTML."""
+    if "content" not in _cache:
+        from pipeline import extract_content
+        with contextlib.redirect_stdout(io.StringIO()):
+            _cache["content"] = extract_content(load_html())
+    return _cache["content"]
+
+
+def _tmpdir() -> Path:
+    if "tmpdir" not in _cache:
+        _cache["tmpdir"] = tempfile.TemporaryDirectory(prefix="bench_")
+    return Path(_cache["tmpdir"].name)
+
+
+# ==========================================================
+# BENCHMARKS
+# ==========================================================
+@benchmark(setup=lambda: (load_html(),))
+def bench_extract_content(html):
+    from pipeline import extract_content
+    extract_content(html)
+
+
+@benchmark(setup=lambda: (load_html(),))
+def bench_build_document_tree(html):
+    from legal_tree import build_document_tree
+    build_document_tree(html, SAMPLE_DOC_NAME)
+
+
+@benchmark(setup=lambda: (load_content(),), number=5)
+def bench_pipeline_postprocess(content):
+    from pipeline import postprocess
+    postprocess(content, SAMPLE_DOC_NAME)
+
+
+def _setup_postprocess_file():
+    input_file = _tmpdir() / "output.txt"
+    input_file.write_text(load_content(), encoding="utf-8")
+    return str(input_file), str(_tmpdir() / "output_processed.txt")
+
+
+@benchmark(setup=_setup_postprocess_file, number=5)
+def bench_postprocess_file(input_file, output_file):
+    from postprocess import postprocess
+    postprocess(input_file, output_file, SAMPLE_DOC_NAME)
+
+
+@benchmark(setup=lambda: (OCR_TXT_3500.read_text(encoding="utf-8"),))
+def bench_format_ocr_3500(text):
+    from format_ocr_image_2 import process_file
+    process_file(text)
+
+
+@benchmark(setup=lambda: (OCR_TXT_3467.read_text(encoding="utf-8"),))
+def bench_format_ocr_3467(text):
+    from format_ocr_image_2 import process_file
+    process_file(text)
+
+
+@benchmark(setup=lambda: (str(SAMPLE_PDF), str(_tmpdir() / "tables.md")))
+def bench_extract_tables_pdf(pdf_path, output_path):
+    from extract_tables import extract_tables
+    extract_tables(pdf_path, output_path)
+
+
+# ==========================================================
+# IMPORT-TIME BUDGET
+# ==========================================================
+# Các lệnh chỉ cần khởi động nhanh (--help, postprocess) không được kéo theo
+# Playwright / fitz / openai / pandas. Budget tính trên tổng cumulative của các
+# import top-level do `python -X importtime` báo cáo, trừ các module mà
+# interpreter rỗng cũng import (site, encodings...).
+STARTUP_CHECKS = [
+    ("pipeline --help", ["pipeline.py", "--help"]),
+    ("import pipeline", ["-c", "import pipeline"]),
+    ("import postprocess", ["-c", "import postprocess"]),
+    ("ocr_pdf --help", ["ocr/ocr_pdf.py", "--help"]),
+    ("ocr_pdf_2 --help", ["ocr/ocr_pdf_2.py", "--help"]),
+    ("extract_tables --help", ["ocr/extract_tables.py", "--help"]),
+    ("format_xls excel --help", ["ocr/format_xls.py", "excel", "--help"]),
+    ("format_doc --help", ["ocr/format_doc.py", "--help"]),
+]
+IMPORT_BUDGET_MS = 300
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Map module top-level → cumulative µs từ output của -X importtime."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):  # import lồng trong module khác
+            continue
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def measure_imports(argv: list) -> tuple:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv],
+                          cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return parse_importtime(proc.stderr), wall
+
+
+def check_import_time(budget_ms: float = IMPORT_BUDGET_MS) -> int:
+    """Chạy STARTUP_CHECKS; trả về số lệnh vượt budget."""
+    baseline, _ = measure_imports(["-c", "pass"])
+    failures = 0
+    for label, argv in STARTUP_CHECKS:
+        modules, wall = measure_imports(argv)
+        own = {name: us for name, us in modules.items() if name not in baseline}
+        total_ms = sum(own.values()) / 1000
+        ok = total_ms <= budget_ms
+        failures += not ok
+        top = sorted(own.items(), key=lambda kv: kv[1], reverse=True)[:3]
+        top_str = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in top)
+        print(f"{'✅' if ok else '❌'} {label:<26} imports {total_ms:6.0f} ms | wall {wall * 1000:5.0f} ms | {top_str}")
+    print("=" * 60)
+    print(f"{'❌' if failures else '✅'} {failures} command(s) over budget ({budget_ms:.0f} ms)")
+    return failures
+
+
+# ==========================================================
+# RUNNER
+# ==========================================================
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_one(name: str, spec: dict, repeat: int) -> dict:
+    args = spec["setup"]() if spec["setup"] else ()
+    number = spec["number"]
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec["func"](*args)  # warmup (import, cache)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                spec["func"](*args)
+            samples.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def run(pattern: str = None, repeat: int = 5, output: str = None) -> Path:
+    selected = {n: s for n, s in BENCHMARKS.items() if not pattern or pattern in n}
+    results = {}
+    for name, spec in selected.items():
+        try:
+            results[name] = run_one(name, spec, repeat)
+        except FileNotFoundError as e:
+            print(f"⚠️ {name}: skipped ({e})")
+            continue
+        r = results[name]
+        print(f"✅ {name:<28} median {r['median'] * 1000:9.2f} ms  "
+              f"(min {r['min'] * 1000:.2f}, ±{r['stdev'] * 1000:.2f})")
+
+    commit = git_commit()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = Path(output) if output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}_{commit}.json"
+    path.write_text(json.dumps({
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }, indent=2), encoding="utf-8")
+    print(f"📝 Saved: {path}")
+    return path
+
+
+def latest_results(count: int) -> list:
+    files = sorted(RESULTS_DIR.glob("*.json"), key=os.path.getmtime)
+    return files[-count:]
+
+
+def compare(base: str = None, head: str = None, threshold: float = 0.10) -> int:
+    """So sánh 2 file kết quả; trả về số benchmark bị chậm hơn ngưỡng."""
+    if base is None or head is None:
+        files = latest_results(2)
+        if len(files) < 2:
+            print("❌ Cần ít nhất 2 lần chạy trong benchmarks/results/")
+            return 1
+        base, head = base or files[0], head or files[1]
+
+    base_data = json.loads(Path(base).read_text(encoding="utf-8"))
+    head_data = json.loads(Path(head).read_text(encoding="utf-8"))
+    print(f"📊 {base_data['commit']} ({Path(base).name}) → {head_data['commit']} ({Path(head).name})")
+    print("=" * 60)
+
+    regressions = 0
+    for name, h in head_data["benchmarks"].items():
+        b = base_data["benchmarks"].get(name)
+        if b is None:
+            print(f"   {name:<28} {h['median'] * 1000:9.2f} ms  (new)")
+            continue
+        ratio = h["median"] / b["median"] if b["median"] else float("inf")
+        mark = "  "
+        if ratio > 1 + threshold:
+            mark = "❌"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            mark = "🚀"
+        print(f"{mark} {name:<28} {b['median'] * 1000:9.2f} → {h['median'] * 1000:9.2f} ms  (x{ratio:.2f})")
+
+    print("=" * 60)
+    print(f"{'❌' if regressions else '✅'} {regressions} regression(s) (threshold {threshold:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite (JSON results, regression compare)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="Liệt kê các benchmark")
+
+    run_parser = sub.add_parser("run", help="Chạy benchmark và lưu JSON")
+    run_parser.add_argument("-k", "--filter", help="Chỉ chạy benchmark có tên chứa chuỗi này")
+    run_parser.add_argument("-r", "--repeat", type=int, default=5, help="Số lần đo (default: 5)")
+    run_parser.add_argument("-o", "--output", help="File JSON output")
+
+    cmp_parser = sub.add_parser("compare", help="So sánh 2 lần chạy (default: 2 lần gần nhất)")
+    cmp_parser.add_argument("base", nargs="?")
+    cmp_parser.add_argument("head", nargs="?")
+    cmp_parser.add_argument("-t", "--threshold", type=float, default=0.10,
+                            help="Ngưỡng chậm hơn được coi là regression (default: 0.10)")
+
+    imp_parser = sub.add_parser("importtime", help="Kiểm tra budget import-time của các CLI")
+    imp_parser.add_argument("-b", "--budget", type=float, default=IMPORT_BUDGET_MS,
+                            help=f"Budget (ms) cho tổng import top-level (default: {IMPORT_BUDGET_MS})")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name in BENCHMARKS:
+            print(name)
+    elif args.command == "run":
+        run(args.filter, args.repeat, args.output)
+    elif args.command == "compare":
+        sys.exit(1 if compare(args.base, args.head, args.threshold) else 0)
+    elif args.command == "importtime":
+        sys.exit(1 if check_import_time(args.budget) else 0)
+
+
+if __name__ == "__main__":
+    main()
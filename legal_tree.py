@@ -0,0 +1,492 @@
+"""
+Trích xuất cấu trúc văn bản pháp luật (Chương / Mục / Điều / Khoản / Điểm)
+trực tiếp từ DOM của thuvienphapluat.vn trong một lần duyệt.
+
+Khác với `pipeline.extract_content` (flatten HTML thành text rồi dùng regex
+khôi phục cấu trúc), module này duyệt `div.content1` theo thứ tự tài liệu,
+mỗi đoạn (block element) được phân loại ngay khi gặp và gắn vào node hiện tại,
+kèm nội dung tooltip / ghi chú (dvNoteDieuKhoan) của đoạn đó.
+
+Sử dụng:
+    doc = build_document_tree(html, "Nghị định 47/2021/NĐ-CP")
+    to_json(doc)        # toàn bộ cây
+    to_jsonl(doc)       # mỗi dòng một Điều, kèm đường dẫn Chương/Mục
+    render_text(doc)    # text theo format của pipeline
+    to_chunks_jsonl(doc)  # chunk theo Điều, id = hash nội dung (index incremental)
+
+So sánh 2 lần crawl để biết chunk nào cần embed lại:
+    python legal_tree.py diff old.chunks.jsonl new.chunks.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, Optional
+
+CHUONG_RE = re.compile(r'^Chương\s+([IVXLCDM]+|\d+)\b\.?\s*(.*)$')
+MUC_RE = re.compile(r'^Mục\s+(\d+)\.?\s*(.*)$')
+DIEU_RE = re.compile(r'^Điều\s+(\d+[a-z]?)\.\s*(.*)$')
+KHOAN_RE = re.compile(r'^(\d+[a-z]?)\.\s+(.*)$')
+DIEM_RE = re.compile(r'^([a-zđ]\d?)\)\s+(.*)$')
+CLOSING_RE = re.compile(r'^(Nơi nhận:|TM\.|KT\.|PHỤ LỤC)')
+
+OPEN_QUOTES = ('"', '“')
+CLOSE_QUOTES = ('"', '”')
+
+BLOCK_TAGS = {
+    'p', 'div', 'table', 'tr', 'td', 'th', 'li', 'ul', 'ol',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'section',
+}
+SKIP_TAGS = {'script', 'style', 'noscript'}
+EMPTY_TOOLTIP = "Click vào để xem nội dung"
+
+# Ước lượng token cho tiếng Việt: mỗi âm tiết / dấu câu ~ 1.5 token với các
+# tokenizer BPE phổ biến (cl100k, o200k). Chỉ dùng để chia batch embedding.
+TOKENS_PER_WORD = 1.5
+WORD_RE = re.compile(r'\w+|[^\w\s]')
+
+
+# ==========================================================
+# MODEL
+# ==========================================================
+@dataclass(slots=True)
+class Diem:
+    label: str
+    text: str
+    notes: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Khoan:
+    number: str
+    text: str
+    notes: list = field(default_factory=list)
+    diem: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Dieu:
+    number: str
+    title: str
+    notes: list = field(default_factory=list)
+    body: list = field(default_factory=list)   # các đoạn trước khoản đầu tiên
+    khoan: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Muc:
+    number: str
+    title: str
+    notes: list = field(default_factory=list)
+    dieu: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Chuong:
+    number: str
+    title: str
+    notes: list = field(default_factory=list)
+    children: list = field(default_factory=list)   # Mục và Điều không thuộc Mục nào, theo thứ tự văn bản
+
+
+@dataclass(slots=True)
+class LegalDocument:
+    name: str
+    preamble: list = field(default_factory=list)
+    chuong: list = field(default_factory=list)
+    dieu: list = field(default_factory=list)   # Điều khi văn bản không chia Chương
+    closing: list = field(default_factory=list)
+
+
+# ==========================================================
+# BUILDER
+# ==========================================================
+class _TreeBuilder:
+    """Nhận từng đoạn (text, notes) theo thứ tự và dựng cây."""
+
+    def __init__(self, name: str):
+        self.doc = LegalDocument(name=name)
+        self.chuong: Optional[Chuong] = None
+        self.muc: Optional[Muc] = None
+        self.dieu: Optional[Dieu] = None
+        self.khoan: Optional[Khoan] = None
+        self.diem: Optional[Diem] = None
+        self.pending_title = None   # Chương/Mục/Điều có tên ở đoạn tiếp theo
+        self.in_quote = False
+        self.closing = False
+
+    def add(self, text: str, notes: list):
+        if not text or text == '.':
+            return
+
+        if self.in_quote:
+            self._append(text, notes)
+            self.in_quote = not text.endswith(CLOSE_QUOTES)
+            return
+
+        if self.closing or (self.dieu is not None and CLOSING_RE.match(text)):
+            self.closing = True
+            self.doc.closing.append(text)
+            return
+
+        pending, self.pending_title = self.pending_title, None
+        if pending is not None and not isinstance(pending, Dieu) and text == text.upper():
+            pending.title = text
+            pending.notes.extend(notes)
+            return
+
+        m = CHUONG_RE.match(text)
+        if m:
+            self.chuong = Chuong(m.group(1), m.group(2), list(notes))
+            self.doc.chuong.append(self.chuong)
+            self.muc = self.dieu = self.khoan = self.diem = None
+            self.pending_title = None if m.group(2) else self.chuong
+            return
+
+        m = MUC_RE.match(text)
+        if m:
+            if self.chuong is None:
+                self.chuong = Chuong('', '')
+                self.doc.chuong.append(self.chuong)
+            self.muc = Muc(m.group(1), m.group(2), list(notes))
+            self.chuong.children.append(self.muc)
+            self.dieu = self.khoan = self.diem = None
+            self.pending_title = None if m.group(2) else self.muc
+            return
+
+        m = DIEU_RE.match(text)
+        if m:
+            self.dieu = Dieu(m.group(1), m.group(2), list(notes))
+            if self.muc is not None:
+                self.muc.dieu.append(self.dieu)
+            elif self.chuong is not None:
+                self.chuong.children.append(self.dieu)
+            else:
+                self.doc.dieu.append(self.dieu)
+            self.khoan = self.diem = None
+            self.pending_title = None if m.group(2) else self.dieu
+            return
+
+        if self.dieu is None:
+            self.doc.preamble.append(text)
+            return
+
+        if isinstance(pending, Dieu) and text[:1].isupper():
+            pending.title = text
+            pending.notes.extend(notes)
+            return
+
+        if text.startswith(OPEN_QUOTES) and not text.endswith(CLOSE_QUOTES):
+            self.in_quote = True
+            self._append(text, notes)
+            return
+
+        m = KHOAN_RE.match(text)
+        if m:
+            self.khoan = Khoan(m.group(1), m.group(2), list(notes))
+            self.dieu.khoan.append(self.khoan)
+            self.diem = None
+            return
+
+        m = DIEM_RE.match(text)
+        if m and self.khoan is not None:
+            self.diem = Diem(m.group(1), m.group(2), list(notes))
+            self.khoan.diem.append(self.diem)
+            return
+
+        self._append(text, notes)
+
+    def add_note(self, text: str, notes: list):
+        """Nội dung bổ sung (ghi chú): gắn vào node đang mở, không nhận dạng cấu trúc."""
+        if not text:
+            return
+        if self.closing:
+            self.doc.closing.append(text)
+        else:
+            self._append(text, notes)
+
+    def _append(self, text: str, notes: list):
+        """Đoạn tiếp nối: gắn vào node sâu nhất đang mở."""
+        node = self.diem or self.khoan
+        if node is not None:
+            node.text = f"{node.text}\n{text}" if node.text else text
+            node.notes.extend(notes)
+        elif self.dieu is not None:
+            self.dieu.body.append(text)
+            self.dieu.notes.extend(notes)
+        else:
+            self.doc.preamble.append(text)
+
+
+class _DomWalker:
+    """Duyệt content1 một lần, cắt thành đoạn theo block element / <br>."""
+
+    def __init__(self, soup, builder: _TreeBuilder):
+        self.builder = builder
+        self.buffer = []
+        self.notes = []
+        # Index tooltip theo class và ghi chú theo id: một lần duyệt thay vì
+        # soup.find() cho từng element có hover.
+        self.tooltips = {}
+        self.note_divs = {}
+        for div in soup.find_all('div'):
+            for cls in div.get('class') or ():
+                self.tooltips.setdefault(cls, div)
+            div_id = div.get('id')
+            if div_id and div_id.startswith('note_'):
+                self.note_divs[div_id] = div
+
+    def walk(self, node):
+        from bs4 import Comment, NavigableString
+
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if not isinstance(child, Comment):
+                    self.buffer.append(str(child))
+                continue
+            name = child.name
+            if name in SKIP_TAGS:
+                continue
+            if name == 'br':
+                self.flush()
+            elif name == 'huongdan' and (child.get('id') or '').startswith('span-note_'):
+                self._emit_note(child)
+            elif name in BLOCK_TAGS:
+                self.flush()
+                self.walk(child)
+                self.flush()
+            else:
+                self.walk(child)
+                tooltip = self._tooltip(child)
+                if tooltip:
+                    self.buffer.append(f" [{tooltip}]")
+                    self.notes.append(tooltip)
+
+    def flush(self):
+        text = ' '.join(''.join(self.buffer).split())
+        self.builder.add(text, self.notes)
+        self.buffer = []
+        self.notes = []
+
+    def _tooltip(self, element) -> str:
+        tooltip_class = None
+        if element.get('atmm'):
+            tooltip_class = element.get('atmm').strip('.')
+        elif element.get('onmouseover') and re.search(r'lqhlTootip', element.get('onmouseover'), re.I):
+            match = re.search(r"['\"]\.([^'\"]+)['\"]", element.get('onmouseover'))
+            if match:
+                tooltip_class = match.group(1)
+        div = self.tooltips.get(tooltip_class) if tooltip_class else None
+        if div is None:
+            return ""
+        text = div.get_text(separator=' ', strip=True)
+        return "" if text == EMPTY_TOOLTIP else text
+
+    def _emit_note(self, element):
+        """<huongdan id="span-note_x"> → nội dung bổ sung, gắn vào node đang mở."""
+        div = self.note_divs.get(element.get('id')[len('span-'):])
+        if div is None:
+            self.walk(element)
+            return
+        self.flush()
+        parts = div.get_text(separator=' ', strip=True).split('|~|')
+        main = ' '.join(parts[0].split())
+        source = parts[1].strip() if len(parts) >= 2 else ""
+        if source:
+            self.builder.add_note(f"{main} [{source}]", [source])
+        else:
+            self.builder.add_note(main, [])
+
+
+def build_document_tree(html: str, doc_name: str) -> LegalDocument:
+    """
+    Dựng cây văn bản từ HTML trang thuvienphapluat.vn.
+
+    Args:
+        html: HTML content
+        doc_name: Tên văn bản pháp luật
+
+    Returns:
+        LegalDocument
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    content_div = soup.find("div", class_="content1")
+    if content_div is None:
+        raise ValueError("Không tìm thấy thẻ <div class='content1'> trên trang")
+
+    builder = _TreeBuilder(doc_name)
+    walker = _DomWalker(soup, builder)
+    walker.walk(content_div)
+    walker.flush()
+    return builder.doc
+
+
+# ==========================================================
+# SERIALIZE / RENDER
+# ==========================================================
+def iter_dieu(doc: LegalDocument) -> Iterator[tuple]:
+    """Duyệt (chuong, muc, dieu) theo thứ tự văn bản; chuong/muc có thể None."""
+    for dieu in doc.dieu:
+        yield None, None, dieu
+    for chuong in doc.chuong:
+        for child in chuong.children:
+            if isinstance(child, Muc):
+                for dieu in child.dieu:
+                    yield chuong, child, dieu
+            else:
+                yield chuong, None, child
+
+
+def to_json(doc: LegalDocument, indent: int = 2) -> str:
+    return json.dumps(asdict(doc), ensure_ascii=False, indent=indent)
+
+
+def to_jsonl(doc: LegalDocument) -> str:
+    """Mỗi dòng một Điều, kèm tên văn bản và Chương/Mục chứa nó."""
+    lines = []
+    for chuong, muc, dieu in iter_dieu(doc):
+        record = {
+            "doc_name": doc.name,
+            "chuong": {"number": chuong.number, "title": chuong.title} if chuong else None,
+            "muc": {"number": muc.number, "title": muc.title} if muc else None,
+            **asdict(dieu),
+        }
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def render_dieu(dieu: Dieu) -> str:
+    """Text của một Điều (tiêu đề, thân, khoản, điểm)."""
+    lines = [f"Điều {dieu.number}. {dieu.title}".rstrip()]
+    lines.extend(dieu.body)
+    for khoan in dieu.khoan:
+        lines.append(f"{khoan.number}. {khoan.text}")
+        for diem in khoan.diem:
+            lines.append(f"{diem.label}) {diem.text}")
+    return '\n'.join(lines)
+
+
+def render_text(doc: LegalDocument) -> str:
+    """Render cây thành text theo format output của pipeline."""
+    name = doc.name
+    out = [name, *doc.preamble]
+
+    def add_dieu(dieu):
+        out.append("")
+        out.append(f"{name}. {render_dieu(dieu)}")
+
+    for dieu in doc.dieu:
+        add_dieu(dieu)
+    for chuong in doc.chuong:
+        if chuong.number:
+            out.append("")
+            out.append(f"{name}. Chương {chuong.number} {chuong.title}".rstrip())
+        for child in chuong.children:
+            if isinstance(child, Muc):
+                out.append("")
+                out.append(f"{name}. Mục {child.number}. {child.title}".rstrip())
+                for dieu in child.dieu:
+                    add_dieu(dieu)
+            else:
+                add_dieu(child)
+    out.extend(doc.closing)
+    return '\n'.join(out) + '\n'
+
+
+# ==========================================================
+# CHUNKS (mỗi Điều một record)
+# ==========================================================
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(WORD_RE.findall(text)) * TOKENS_PER_WORD)
+
+
+def chunk_id(doc_name: str, path: list, text: str) -> str:
+    """Hash nội dung: đổi text / vị trí Chương-Mục thì đổi id, còn lại giữ nguyên."""
+    payload = json.dumps([doc_name, path, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def iter_chunks(doc: LegalDocument) -> Iterator[dict]:
+    """
+    Mỗi Điều một chunk, text có tên văn bản ở đầu và tooltip trong [].
+
+    `key` định danh vị trí (ổn định giữa các lần crawl), `id` định danh nội dung:
+    downstream chỉ cần embed lại các chunk có id mới.
+    """
+    seen = {}
+    for chuong, muc, dieu in iter_dieu(doc):
+        path = []
+        if chuong is not None and chuong.number:
+            path.append(f"Chương {chuong.number} {chuong.title}".rstrip())
+        if muc is not None:
+            path.append(f"Mục {muc.number}. {muc.title}".rstrip())
+
+        key = f"{doc.name}|Điều {dieu.number}"
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:  # số Điều lặp lại (phụ lục đánh số lại)
+            key = f"{key}|{seen[key]}"
+
+        text = f"{doc.name}. {render_dieu(dieu)}"
+        yield {
+            "id": chunk_id(doc.name, path, text),
+            "key": key,
+            "doc_name": doc.name,
+            "path": path,
+            "dieu": dieu.number,
+            "title": dieu.title,
+            "text": text,
+            "notes": list(_dieu_notes(dieu)),
+            "tokens": estimate_tokens(text),
+        }
+
+
+def _dieu_notes(dieu: Dieu) -> Iterator[str]:
+    yield from dieu.notes
+    for khoan in dieu.khoan:
+        yield from khoan.notes
+        for diem in khoan.diem:
+            yield from diem.notes
+
+
+def to_chunks_jsonl(doc: LegalDocument) -> str:
+    lines = [json.dumps(chunk, ensure_ascii=False) for chunk in iter_chunks(doc)]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def diff_chunks(old_path: str, new_path: str) -> dict:
+    """So sánh 2 file chunk JSONL theo id: added / removed / unchanged."""
+    def load(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return {rec["id"]: rec for rec in map(json.loads, filter(str.strip, f))}
+
+    old, new = load(old_path), load(new_path)
+    return {
+        "added": [new[i] for i in new.keys() - old.keys()],
+        "removed": [old[i] for i in old.keys() - new.keys()],
+        "unchanged": len(new.keys() & old.keys()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiện ích cho output chunk JSONL")
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff_parser = sub.add_parser("diff", help="Liệt kê chunk cần embed lại / xóa khỏi index")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    args = parser.parse_args()
+
+    result = diff_chunks(args.old, args.new)
+    for rec in sorted(result["added"], key=lambda r: r["key"]):
+        print(f"+ {rec['id']}  {rec['key']}")
+    for rec in sorted(result["removed"], key=lambda r: r["key"]):
+        print(f"- {rec['id']}  {rec['key']}")
+    print(f"📊 +{len(result['added'])} / -{len(result['removed'])} / ={result['unchanged']}")
+
+
+if __name__ == "__main__":
+    main()
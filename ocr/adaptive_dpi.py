@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Adaptive render resolution: the smallest DPI that keeps a page's small text legible.
+
+150 DPI everywhere wastes pixels (upload bytes, vision tokens) on cover pages
+set in large type and is too coarse for annex tables in 7-8pt. `choose_dpi`
+estimates the height of the page's small text:
+  - born-digital pages: font sizes of the text spans (PyMuPDF), weighted by
+    characters, SMALL_TEXT_PERCENTILE-th percentile
+  - scans: a RASTER_DPI grayscale raster, binarized; ruling lines are masked
+    out and the heights of the inked row runs (text lines) give the same
+    percentile
+and picks the DPI at which that text is TARGET_INK_PX pixels tall, rounded
+to DPI_STEP and clamped to [MIN_DPI, MAX_DPI] (and MAX_PIXELS).
+
+Usage:
+    python ocr/adaptive_dpi.py ocr/data/file.pdf          # chosen DPI per page
+    python ocr/ocr_pdf.py ocr/data/file.pdf --dpi auto
+"""
+
+import argparse
+
+AUTO_DPI = "auto"
+DEFAULT_DPI = 150
+
+MIN_DPI = 100
+MAX_DPI = 300
+DPI_STEP = 25
+MAX_PIXELS = 16_000_000        # cap for oversized pages (A3 plans at 300 DPI)
+
+# Ink height of a text line at which the VLM reads Vietnamese diacritics
+# reliably; small text of a 13pt scan has ~9pt of ink -> 150 DPI
+TARGET_INK_PX = 18
+INK_PER_POINT = 0.78           # ink height of a line / font size
+SMALL_TEXT_PERCENTILE = 20
+MIN_TEXT_CHARS = 50            # below this the text layer says nothing about the scan
+RASTER_DPI = 144               # coarser rasters quantize line heights too much
+
+ROW_INK_MIN = 0.01             # dark share of a pixel row for it to be part of a text line
+RULE_COLUMN_INK = 0.3          # columns darker than this are ruling lines
+MIN_RUN_PT, MAX_RUN_PT = 3, 48  # runs outside this are rules, specks, images or merged lines
+FRAGMENT_RATIO = 0.6           # runs shorter than this x the median are line fragments
+
+
+def _percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def text_layer_ink_height(page):
+    """Small-text ink height in points from the page's text spans, or None."""
+    sizes = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                chars = len(span["text"].strip())
+                if chars and span["size"] > 0:
+                    sizes.extend([span["size"]] * chars)
+    if len(sizes) < MIN_TEXT_CHARS:
+        return None
+    return _percentile(sizes, SMALL_TEXT_PERCENTILE) * INK_PER_POINT
+
+
+def raster_ink_height(page):
+    """(small-text ink height in points, text lines found) from a RASTER_DPI raster."""
+    import fitz  # PyMuPDF
+    from PIL import Image, ImageDraw
+
+    scale = RASTER_DPI / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY)
+    img = Image.frombytes('L', [pix.width, pix.height], pix.samples).point(lambda v: 0 if v < 128 else 255)
+    width, height = img.size
+
+    # Vertical table rules would make every row of a table look inked
+    columns = img.resize((width, 1), Image.BOX).tobytes()
+    draw = ImageDraw.Draw(img)
+    for x, mean in enumerate(columns):
+        if (255 - mean) / 255 > RULE_COLUMN_INK:
+            draw.line([(x, 0), (x, height)], fill=255)
+
+    runs = []
+    run = 0
+    for mean in img.resize((1, height), Image.BOX).tobytes():
+        if (255 - mean) / 255 > ROW_INK_MIN:
+            run += 1
+        elif run:
+            runs.append(run)
+            run = 0
+    runs = [r / scale for r in runs if MIN_RUN_PT <= r / scale <= MAX_RUN_PT]
+    if not runs:
+        return None, 0
+    # Diacritics or underlines separated from their line by a white row are
+    # fragments, not small text
+    median = _percentile(runs, 50)
+    runs = [r for r in runs if r >= median * FRAGMENT_RATIO]
+    return _percentile(runs, SMALL_TEXT_PERCENTILE), len(runs)
+
+
+def choose_dpi(page) -> int:
+    """Smallest DPI (on the DPI_STEP grid) at which the page's small text is legible."""
+    return estimate(page)[0]
+
+
+def estimate(page) -> tuple:
+    """(dpi, source, ink height in points, text lines) for a PyMuPDF page."""
+    ink, source, lines = text_layer_ink_height(page), "text", None
+    if ink is None:
+        (ink, lines), source = raster_ink_height(page), "raster"
+    if ink is None:
+        return MIN_DPI, "blank", None, 0  # nothing to read; the lowest resolution will do
+
+    dpi = round(72 * TARGET_INK_PX / ink / DPI_STEP) * DPI_STEP
+    dpi = max(MIN_DPI, min(MAX_DPI, dpi))
+    # Keep oversized pages under the pixel cap
+    area_in = page.rect.width * page.rect.height / 72 / 72
+    while dpi > MIN_DPI and area_in * dpi * dpi > MAX_PIXELS:
+        dpi -= DPI_STEP
+    return dpi, source, ink, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the adaptive DPI chosen for each PDF page")
+    parser.add_argument("pdf_path", help="Path to PDF file")
+    parser.add_argument("-s", "--start", type=int, default=0, help="Start page (0-indexed)")
+    parser.add_argument("-e", "--end", type=int, help="End page (exclusive)")
+    args = parser.parse_args()
+
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(args.pdf_path)
+    end = args.end if args.end is not None else len(doc)
+    pixels = fixed_pixels = 0
+    for page_num in range(args.start, end):
+        page = doc.load_page(page_num)
+        dpi, source, ink, lines = estimate(page)
+        area_in = page.rect.width * page.rect.height / 72 / 72
+        pixels += area_in * dpi * dpi
+        fixed_pixels += area_in * DEFAULT_DPI * DEFAULT_DPI
+        ink_text = f"{ink:4.1f}pt" if ink is not None else "   - "
+        lines_text = f" | lines {lines}" if lines is not None else ""
+        print(f"Page {page_num + 1:>4} | {source:<6} | small text ink {ink_text} | DPI {dpi}{lines_text}")
+    doc.close()
+    if fixed_pixels:
+        print(f"📐 Pixels vs fixed {DEFAULT_DPI} DPI: {pixels / fixed_pixels:.0%}")
+
+
+if __name__ == "__main__":
+    main()
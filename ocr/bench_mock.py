@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark of ocr_pdf.py against mock_server.py.
+
+Starts a mock server process (or uses --server), then OCRs the same pages of
+a PDF once per -j concurrency level, each run a full ocr_pdf() run (render
+workers, pool, journal, output) into a temp directory without the cache.
+Per level it prints:
+
+  pages/s      pages written / wall time
+  speedup      pages/s relative to the first level
+  efficiency   speedup / (concurrency ratio): 100% = perfect scaling
+  busy         average requests being generated on the server (its busy
+               seconds / wall time); well below -j means the client side
+               (rendering, encoding, retries) or --slots is the bottleneck
+  errors / truncated   failures the run had to retry or split
+
+With --slots S the server generates at most S requests at once, so pages/s
+should flatten once -j passes S, like a saturated GPU endpoint.
+
+Usage:
+    python ocr/bench_mock.py ocr/data/file.pdf -n 24 -j 1,2,4,8,16
+    python ocr/bench_mock.py ocr/data/file.pdf -j 4,8,16 --slots 8 --latency lognormal:2,0.4
+    python ocr/bench_mock.py ocr/data/file.pdf -j 8 --error-rate 0.05 --truncate-rate 0.05 --stream
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from mock_server import add_mock_args, mock_argv
+
+READY_TIMEOUT = 15.0
+
+
+def fetch_stats(base_url: str) -> dict:
+    root = base_url.rstrip("/").rsplit("/v1", 1)[0]
+    with urllib.request.urlopen(root + "/stats", timeout=5) as response:
+        return json.load(response)
+
+
+def start_server(args) -> tuple:
+    """(process, base URL) of a mock server on a free port, once it answers."""
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_server.py")
+    process = subprocess.Popen([sys.executable, script, "--port", str(port)] + mock_argv(args),
+                               stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}/v1/"
+    deadline = time.time() + READY_TIMEOUT
+    while True:
+        try:
+            fetch_stats(base_url)
+            return process, base_url
+        except OSError:
+            if process.poll() is not None or time.time() > deadline:
+                process.kill()
+                raise RuntimeError(f"Mock server did not start on port {port}")
+            time.sleep(0.1)
+
+
+def run_level(pdf_path: str, start: int, end: int, concurrency: int, base_url: str, workdir: str,
+              **ocr_kwargs) -> dict:
+    """One ocr_pdf() run at `concurrency`; its output is discarded."""
+    from ocr_batch import pages_done
+    from ocr_client import EndpointPool, get_endpoint
+    from ocr_pdf import ocr_pdf
+
+    pool = EndpointPool([get_endpoint("mock", base_url=base_url, max_concurrency=concurrency)])
+    output = os.path.join(workdir, f"j{concurrency}.txt")
+    before = fetch_stats(base_url)
+    started = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ocr_pdf(pdf_path, output, start, end, concurrency=concurrency, pool=pool, cache=None, **ocr_kwargs)
+    seconds = time.time() - started
+    after = fetch_stats(base_url)
+    delta = {k: after.get(k, 0) - before.get(k, 0) for k in ("requests", "errors", "truncated", "busy_ms")}
+    return {
+        "concurrency": concurrency,
+        "pages": pages_done(output),
+        "seconds": seconds,
+        "requests": delta["requests"],
+        "errors": delta["errors"],
+        "truncated": delta["truncated"],
+        "busy": delta["busy_ms"] / 1000 / seconds if seconds else 0.0,
+    }
+
+
+def main():
+    from image_encoding import PROFILES
+    from ocr_pdf import positive_int
+
+    parser = argparse.ArgumentParser(description="Throughput / concurrency scaling of ocr_pdf.py on a mock server")
+    parser.add_argument("pdf_path", help="Path to PDF file")
+    parser.add_argument("-s", "--start", type=int, default=0, help="Start page (0-indexed)")
+    parser.add_argument("-n", "--pages", dest="count", type=int, default=16, help="Pages per run (default: 16)")
+    parser.add_argument("-j", "--concurrency", default="1,2,4,8",
+                        help="Comma-separated concurrency levels (default: 1,2,4,8)")
+    parser.add_argument("--server", metavar="URL", help="Use a running mock server (http://host:port/v1/)")
+    parser.add_argument("--stream", action="store_true", help="Stream responses")
+    parser.add_argument("-k", "--pages-per-request", type=positive_int, default=1,
+                        help="Pages per request (default: 1)")
+    parser.add_argument("--encoding", choices=list(PROFILES), help="Page image encoding profile (default: png)")
+    parser.add_argument("--render-workers", type=positive_int, help="Render processes (default: ocr_pdf's)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    add_mock_args(parser)
+    args = parser.parse_args()
+
+    import fitz  # PyMuPDF
+
+    with fitz.open(args.pdf_path) as doc:
+        end = min(len(doc), args.start + args.count)
+    levels = [int(j) for j in args.concurrency.split(",") if j]
+    if args.server:
+        process, base_url = None, args.server
+    else:
+        process, base_url = start_server(args)
+
+    print(f"📄 {os.path.basename(args.pdf_path)} pages {args.start + 1}-{end} | 🧪 {base_url}")
+    if not args.server:
+        print(f"   latency {args.latency}" + (f" + {args.per_token:g}s/token" if args.per_token else "")
+              + (f" | {args.slots} slots" if args.slots else "")
+              + (f" | errors {args.error_rate:.0%}" if args.error_rate else "")
+              + (f" | truncate {args.truncate_rate:.0%}" if args.truncate_rate else ""))
+    print(f"{'-j':>4} | {'pages':>5} | {'seconds':>8} | {'pages/s':>7} | {'speedup':>7} | "
+          f"{'efficiency':>10} | {'busy':>5} | {'requests':>8} | {'errors':>6} | {'truncated':>9}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_mock_") as workdir:
+            for concurrency in levels:
+                result = run_level(args.pdf_path, args.start, end, concurrency, base_url, workdir,
+                                   stream=args.stream, pages_per_request=args.pages_per_request,
+                                   encoding=args.encoding, render_workers=args.render_workers)
+                result["pages_per_second"] = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+                base = results[0] if results else result
+                result["speedup"] = result["pages_per_second"] / base["pages_per_second"] if base["pages_per_second"] else 0.0
+                result["efficiency"] = result["speedup"] / (concurrency / base["concurrency"])
+                results.append(result)
+                print(f"{concurrency:>4} | {result['pages']:>5} | {result['seconds']:>8.2f} | "
+                      f"{result['pages_per_second']:>7.2f} | {result['speedup']:>6.2f}x | "
+                      f"{result['efficiency']:>10.0%} | {result['busy']:>5.1f} | {result['requests']:>8} | "
+                      f"{result['errors']:>6} | {result['truncated']:>9}", flush=True)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to: {args.json}")
+    best = max(results, key=lambda r: r["pages_per_second"], default=None)
+    if best:
+        print(f"🚀 Best: -j {best['concurrency']} at {best['pages_per_second']:.2f} pages/s "
+              f"({best['pages_per_second'] * 3600:.0f} pages/hour)")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,31 @@ Supports:
 
 import argparse
 import os
+import sys
 
-import pdfplumber
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiling import Profiler, add_profiling_args, profiler_from_args
+
+
+def table_to_markdown(table: list) -> str:
+    """Convert a pdfplumber table (list of rows) to a markdown table."""
+    lines = []
+    header = table[0]
+    if header:
+        # Filter out empty columns
+        clean_row = [str(c).replace("\n", " ").strip() if c else "" for c in header]
+        lines.append("| " + " | ".join(clean_row) + " |")
+        lines.append("|" + "|".join(["---"] * len(header)) + "|")
+    
+    for row in table[1:]:
+        if row:
+            clean_row = [str(c).replace("\n", " ").strip() if c else "" for c in row]
+            lines.append("| " + " | ".join(clean_row) + " |")
+    return "".join(line + "\n" for line in lines)
 
 
 def extract_tables(pdf_path: str, output_path: str = None, start_page: int = 1, 
-                   end_page: int = None, text_strategy: bool = False):
+                   end_page: int = None, text_strategy: bool = False, profiler: Profiler = None):
     """
     Extract tables from PDF and save as markdown.
     
@@ -25,6 +44,7 @@ def extract_tables(pdf_path: str, output_path: str = None, start_page: int = 1,
         start_page: Start page (1-indexed, default: 1)
         end_page: End page (inclusive, default: last page)
         text_strategy: Use text-based table detection for borderless tables
+        profiler: Per-stage profiler (extract / write)
     """
     if not os.path.exists(pdf_path):
         print(f"❌ PDF not found: {pdf_path}")
@@ -32,6 +52,8 @@ def extract_tables(pdf_path: str, output_path: str = None, start_page: int = 1,
     
     if output_path is None:
         output_path = os.path.splitext(pdf_path)[0] + "_tables.md"
+    if profiler is None:
+        profiler = Profiler(os.path.splitext(output_path)[0])
     
     # Table settings
     table_settings = {}
@@ -43,6 +65,8 @@ def extract_tables(pdf_path: str, output_path: str = None, start_page: int = 1,
             'join_tolerance': 3,
         }
     
+    import pdfplumber  # imported lazily: keeps --help instant
+
     with pdfplumber.open(pdf_path) as pdf:
         total_pages = len(pdf.pages)
         start_idx = start_page - 1  # Convert to 0-indexed
@@ -66,32 +90,22 @@ def extract_tables(pdf_path: str, output_path: str = None, start_page: int = 1,
                 page = pdf.pages[page_num]
                 
                 # Auto-detect: if no lines, try text strategy
-                if not text_strategy and len(page.lines) == 0:
-                    tables = page.extract_tables(table_settings={
-                        'vertical_strategy': 'text',
-                        'horizontal_strategy': 'text'
-                    })
-                else:
-                    tables = page.extract_tables(table_settings=table_settings)
+                with profiler.stage("extract"):
+                    if not text_strategy and len(page.lines) == 0:
+                        tables = page.extract_tables(table_settings={
+                            'vertical_strategy': 'text',
+                            'horizontal_strategy': 'text'
+                        })
+                    else:
+                        tables = page.extract_tables(table_settings=table_settings)
                 
-                if tables:
-                    for table in tables:
-                        if table and len(table) > 1:
-                            f.write(f"\n<!-- Page {page_num + 1} -->\n")
-                            
-                            header = table[0]
-                            if header:
-                                # Filter out empty columns
-                                clean_row = [str(c).replace("\n", " ").strip() if c else "" for c in header]
-                                f.write("| " + " | ".join(clean_row) + " |\n")
-                                f.write("|" + "|".join(["---"] * len(header)) + "|\n")
-                            
-                            for row in table[1:]:
-                                if row:
-                                    clean_row = [str(c).replace("\n", " ").strip() if c else "" for c in row]
-                                    f.write("| " + " | ".join(clean_row) + " |\n")
-                            
-                            table_count += 1
+                with profiler.stage("write"):
+                    if tables:
+                        for table in tables:
+                            if table and len(table) > 1:
+                                f.write(f"\n<!-- Page {page_num + 1} -->\n")
+                                f.write(table_to_markdown(table))
+                                table_count += 1
                 
                 if (page_num + 1) % 100 == 0:
                     print(f"✅ Page {page_num + 1}/{end_idx}")
@@ -99,6 +113,7 @@ def extract_tables(pdf_path: str, output_path: str = None, start_page: int = 1,
         print("\n" + "=" * 60)
         print(f"✅ Done! Extracted {table_count} table segments")
         print(f"📝 Saved to: {output_path}")
+    profiler.close()
 
 
 def main():
@@ -113,9 +128,12 @@ def main():
                         help="End page (inclusive, default: last page)")
     parser.add_argument("-t", "--text-strategy", action="store_true",
                         help="Use text-based detection for borderless tables")
+    add_profiling_args(parser)
     
     args = parser.parse_args()
-    extract_tables(args.pdf_path, args.output, args.start, args.end, args.text_strategy)
+    output_path = args.output or os.path.splitext(args.pdf_path)[0] + "_tables.md"
+    profiler = profiler_from_args(args, os.path.splitext(output_path)[0])
+    extract_tables(args.pdf_path, output_path, args.start, args.end, args.text_strategy, profiler)
 
 
 if __name__ == "__main__":
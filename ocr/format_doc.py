@@ -9,9 +9,13 @@ DOC (.doc) → DOCX → TXT (Markdown, LEGAL AWARE)
 """
 
 import argparse
+import os
 import subprocess
+import sys
 from pathlib import Path
-from docx import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiling import Profiler, add_profiling_args, profiler_from_args
 
 # ==========================================================
 # CONFIG
@@ -149,10 +153,14 @@ def write_chunk(f, headers, rows, annex, section):
 # MAIN PIPELINE
 # ==========================================================
 
-def process_folder(input_dir, output_dir):
+def process_folder(input_dir, output_dir, profiler: Profiler = None):
+    from docx import Document
+
     input_dir = Path(input_dir)
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
+    if profiler is None:
+        profiler = Profiler(str(output_dir / "profile"))
 
     tmp_docx = output_dir / "_docx"
     tmp_docx.mkdir(exist_ok=True)
@@ -160,45 +168,50 @@ def process_folder(input_dir, output_dir):
     for doc_file in input_dir.glob("*.doc"):
         print(f"📄 {doc_file.name}")
 
-        docx_file = convert_doc_to_docx(doc_file, tmp_docx)
-        doc = Document(docx_file)
+        with profiler.stage("convert"):
+            docx_file = convert_doc_to_docx(doc_file, tmp_docx)
+        with profiler.stage("parse"):
+            doc = Document(docx_file)
 
         annex = extract_annex_title(doc.paragraphs)
         out_txt = output_dir / f"{doc_file.stem}.txt"
 
-        with open(out_txt, "w", encoding="utf-8") as f:
-            for table in doc.tables:
-                rows = [
-                    [normalize_text(c.text) for c in r.cells]
-                    for r in table.rows
-                ]
-
-                header_idx = detect_header_row(rows)
-                if header_idx is None:
-                    continue
-
-                headers = rows[header_idx]
-                data = rows[header_idx + 1:]
-
-                section = None
-                buffer = []
-
-                for row in data:
-                    if is_section_header_row(row):
-                        if buffer:
-                            for chunk in chunk_rows(buffer, CHUNK_ROW_SIZE):
-                                write_chunk(f, headers, chunk, annex, section)
-                            buffer = []
-                        section = extract_section_title(row)
-                    elif any(c.strip() for c in row):
-                        buffer.append(row)
-
-                if buffer:
-                    for chunk in chunk_rows(buffer, CHUNK_ROW_SIZE):
-                        write_chunk(f, headers, chunk, annex, section)
+        with profiler.stage("write"):
+            with open(out_txt, "w", encoding="utf-8") as f:
+                for table in doc.tables:
+                    rows = [
+                        [normalize_text(c.text) for c in r.cells]
+                        for r in table.rows
+                    ]
+
+                    header_idx = detect_header_row(rows)
+                    if header_idx is None:
+                        continue
+
+                    headers = rows[header_idx]
+                    data = rows[header_idx + 1:]
+
+                    section = None
+                    buffer = []
+
+                    for row in data:
+                        if is_section_header_row(row):
+                            if buffer:
+                                for chunk in chunk_rows(buffer, CHUNK_ROW_SIZE):
+                                    write_chunk(f, headers, chunk, annex, section)
+                                buffer = []
+                            section = extract_section_title(row)
+                        elif any(c.strip() for c in row):
+                            buffer.append(row)
+
+                    if buffer:
+                        for chunk in chunk_rows(buffer, CHUNK_ROW_SIZE):
+                            write_chunk(f, headers, chunk, annex, section)
 
         print(f"✅ Saved: {out_txt}")
 
+    profiler.close()
+
 # ==========================================================
 # CLI
 # ==========================================================
@@ -207,9 +220,12 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("input", help="Folder chứa file .doc")
     ap.add_argument("-o", "--output", default="output_txt")
+    add_profiling_args(ap)
     args = ap.parse_args()
 
-    process_folder(args.input, args.output)
+    Path(args.output).mkdir(parents=True, exist_ok=True)
+    profiler = profiler_from_args(args, os.path.join(args.output, "profile"))
+    process_folder(args.input, args.output, profiler)
 
 if __name__ == "__main__":
     main()
@@ -7,10 +7,14 @@ Extract tables from PDF or Excel to Markdown.
 
 import argparse
 import os
+import sys
 from pathlib import Path
 
-import pdfplumber
-import pandas as pd
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiling import Profiler, add_profiling_args, profiler_from_args
+
+# pdfplumber (pdf) và pandas (excel) được import trong từng handler,
+# subcommand nào chỉ load thư viện của subcommand đó.
 
 DOCUMENT_TITLE = ("""Quyết định 7603/QĐ-BYT năm 2018 về Bộ mã danh mục dùng chung áp dụng trong quản lý khám bệnh, chữa bệnh và thanh toán bảo hiểm y tế (phiên bản số 6) do Bộ trưởng Bộ Y tế ban hành""")
 CHUNK_ROW_SIZE = 30
@@ -25,6 +29,8 @@ def extract_annex_title(df, max_rows=6):
     """
     Extract annex title from top rows (merged cells).
     """
+    import pandas as pd
+
     lines = []
     for i in range(min(len(df), max_rows)):
         row = df.iloc[i]
@@ -44,6 +50,7 @@ def detect_header_row(df, scan_rows=20):
     2. Fallback: row index 1 or 2
     3. Fallback: dense string row
     """
+    import pandas as pd
 
     # -------- TIER 1: regex STT --------
     for i in range(min(len(df), scan_rows)):
@@ -85,6 +92,8 @@ def normalize_cell_text(value):
     - Gộp các dòng trong ô thành 1 dòng
     - Xóa khoảng trắng thừa
     """
+    import pandas as pd
+
     if pd.isna(value):
         return ""
 
@@ -102,7 +111,8 @@ def normalize_cell_text(value):
 # PDF HANDLER
 # ==========================================================
 def extract_tables_from_pdf(pdf_path: str, output_path: str = None,
-                            start_page: int = 1, end_page: int = None):
+                            start_page: int = 1, end_page: int = None,
+                            profiler: Profiler = None):
 
     if not os.path.exists(pdf_path):
         print(f"❌ PDF not found: {pdf_path}")
@@ -110,6 +120,10 @@ def extract_tables_from_pdf(pdf_path: str, output_path: str = None,
 
     if output_path is None:
         output_path = os.path.splitext(pdf_path)[0] + "_tables.md"
+    if profiler is None:
+        profiler = Profiler(os.path.splitext(output_path)[0])
+
+    import pdfplumber
 
     with pdfplumber.open(pdf_path) as pdf:
         total_pages = len(pdf.pages)
@@ -130,34 +144,38 @@ def extract_tables_from_pdf(pdf_path: str, output_path: str = None,
             table_count = 0
             for page_num in range(start_idx, end_idx):
                 page = pdf.pages[page_num]
-                tables = page.extract_tables()
+                with profiler.stage("extract"):
+                    tables = page.extract_tables()
 
                 if not tables:
                     continue
 
-                for table in tables:
-                    if not table or len(table) < 2:
-                        continue
+                with profiler.stage("write"):
+                    for table in tables:
+                        if not table or len(table) < 2:
+                            continue
 
-                    f.write(f"\n<!-- Page {page_num + 1} -->\n")
+                        f.write(f"\n<!-- Page {page_num + 1} -->\n")
 
-                    header = table[0]
-                    f.write("| " + " | ".join(str(c or "").replace("\n", " ") for c in header) + " |\n")
-                    f.write("|" + "|".join(["---"] * len(header)) + "|\n")
+                        header = table[0]
+                        f.write("| " + " | ".join(str(c or "").replace("\n", " ") for c in header) + " |\n")
+                        f.write("|" + "|".join(["---"] * len(header)) + "|\n")
 
-                    for row in table[1:]:
-                        f.write("| " + " | ".join(str(c or "").replace("\n", " ") for c in row) + " |\n")
+                        for row in table[1:]:
+                            f.write("| " + " | ".join(str(c or "").replace("\n", " ") for c in row) + " |\n")
 
-                    table_count += 1
+                        table_count += 1
 
         print(f"✅ Done! Extracted {table_count} tables")
         print(f"📝 Saved to: {output_path}")
+    profiler.close()
 
 
 # ==========================================================
 # EXCEL HANDLER (LEGAL ANNEX AWARE)
 # ==========================================================
-def extract_tables_from_excel_folder(input_folder: str, output_folder: str = None):
+def extract_tables_from_excel_folder(input_folder: str, output_folder: str = None,
+                                     profiler: Profiler = None):
     input_path = Path(input_folder)
 
     if not input_path.exists():
@@ -166,6 +184,10 @@ def extract_tables_from_excel_folder(input_folder: str, output_folder: str = Non
 
     output_folder = Path(output_folder) if output_folder else input_path / "output_txt"
     output_folder.mkdir(parents=True, exist_ok=True)
+    if profiler is None:
+        profiler = Profiler(str(output_folder / "profile"))
+
+    import pandas as pd
 
     excel_files = list(input_path.glob("*.xls")) + list(input_path.glob("*.xlsx"))
 
@@ -179,11 +201,12 @@ def extract_tables_from_excel_folder(input_folder: str, output_folder: str = Non
         out_file = output_folder / f"{excel_file.stem}.txt"
 
         try:
-            sheets_raw = pd.read_excel(
-                excel_file,
-                sheet_name=None,
-                header=None
-            )
+            with profiler.stage("read"):
+                sheets_raw = pd.read_excel(
+                    excel_file,
+                    sheet_name=None,
+                    header=None
+                )
         except Exception as e:
             print(f"❌ Failed to read {excel_file.name}: {e}")
             continue
@@ -195,52 +218,55 @@ def extract_tables_from_excel_folder(input_folder: str, output_folder: str = Non
                 if raw_df.empty:
                     continue
 
-                # 1. Annex title
-                annex_title = extract_annex_title(raw_df)
+                with profiler.stage("transform"):
+                    # 1. Annex title
+                    annex_title = extract_annex_title(raw_df)
 
-                # 2. Detect header
-                header_row = detect_header_row(raw_df)
-                if header_row is None:
-                    print(f"⚠️ No header detected: {excel_file.name} / {sheet_name}")
-                    continue
+                    # 2. Detect header
+                    header_row = detect_header_row(raw_df)
+                    if header_row is None:
+                        print(f"⚠️ No header detected: {excel_file.name} / {sheet_name}")
+                        continue
 
-                # 3. Build dataframe
-                df = raw_df.iloc[header_row + 1:].copy()
-                df.columns = raw_df.iloc[header_row].astype(str).str.strip()
-                df = df.reset_index(drop=True)
+                    # 3. Build dataframe
+                    df = raw_df.iloc[header_row + 1:].copy()
+                    df.columns = raw_df.iloc[header_row].astype(str).str.strip()
+                    df = df.reset_index(drop=True)
 
-                # drop empty / unnamed columns
-                df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
-                df = df.applymap(normalize_cell_text)
-                if df.empty:
-                    continue
-                # 4. Write chunks (CHUẨN LLM)
-                headers = df.columns.tolist()
-                rows = df.values.tolist()
-
-                row_chunks = list(chunk_rows(rows, CHUNK_ROW_SIZE))
-
-                for idx, chunk in enumerate(row_chunks):
-                    # ===== 1. TITLE CHUNG CỦA VĂN BẢN =====
-                    f.write(DOCUMENT_TITLE.strip() + "\n")
-                    # ===== 2. TÊN PHỤ LỤC =====
-                    if annex_title:
-                        f.write(annex_title.strip() + "\n")
-                    # ===== 3. HEADER =====
-                    f.write("| " + " | ".join(headers) + " |\n")
-                    f.write("|" + "|".join(["---"] * len(headers)) + "|\n")
-                    # ===== 4. NỘI DUNG =====
-                    for row in chunk:
-                        f.write("| " + " | ".join(map(str, row)) + " |\n")
-                    # ===== 5. DÒNG TRỐNG GIỮA CÁC CHUNK =====
-                    if not (
-                        sheet_name == list(sheets_raw.keys())[-1]
-                        and idx == len(row_chunks) - 1
-                    ):
-                        f.write("\n")
+                    # drop empty / unnamed columns
+                    df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
+                    df = df.applymap(normalize_cell_text)
+                    if df.empty:
+                        continue
+                with profiler.stage("write"):
+                    # 4. Write chunks (CHUẨN LLM)
+                    headers = df.columns.tolist()
+                    rows = df.values.tolist()
+
+                    row_chunks = list(chunk_rows(rows, CHUNK_ROW_SIZE))
+
+                    for idx, chunk in enumerate(row_chunks):
+                        # ===== 1. TITLE CHUNG CỦA VĂN BẢN =====
+                        f.write(DOCUMENT_TITLE.strip() + "\n")
+                        # ===== 2. TÊN PHỤ LỤC =====
+                        if annex_title:
+                            f.write(annex_title.strip() + "\n")
+                        # ===== 3. HEADER =====
+                        f.write("| " + " | ".join(headers) + " |\n")
+                        f.write("|" + "|".join(["---"] * len(headers)) + "|\n")
+                        # ===== 4. NỘI DUNG =====
+                        for row in chunk:
+                            f.write("| " + " | ".join(map(str, row)) + " |\n")
+                        # ===== 5. DÒNG TRỐNG GIỮA CÁC CHUNK =====
+                        if not (
+                            sheet_name == list(sheets_raw.keys())[-1]
+                            and idx == len(row_chunks) - 1
+                        ):
+                            f.write("\n")
         print(f"✅ Saved: {out_file}")
 
     print("\n🎉 Done extracting Excel tables!")
+    profiler.close()
 
 
 # ==========================================================
@@ -265,15 +291,23 @@ def main():
     excel_parser.add_argument("folder", help="Folder containing xls/xlsx files")
     excel_parser.add_argument("-o", "--output", help="Output folder")
 
+    for sub in (pdf_parser, excel_parser):
+        add_profiling_args(sub)
+
     args = parser.parse_args()
 
     if args.mode == "pdf":
+        output_path = args.output or os.path.splitext(args.pdf_path)[0] + "_tables.md"
+        profiler = profiler_from_args(args, os.path.splitext(output_path)[0])
         extract_tables_from_pdf(
-            args.pdf_path, args.output, args.start, args.end
+            args.pdf_path, output_path, args.start, args.end, profiler
         )
     elif args.mode == "excel":
+        output_folder = args.output or os.path.join(args.folder, "output_txt")
+        os.makedirs(output_folder, exist_ok=True)
+        profiler = profiler_from_args(args, os.path.join(output_folder, "profile"))
         extract_tables_from_excel_folder(
-            args.folder, args.output
+            args.folder, output_folder, profiler
         )
 
 
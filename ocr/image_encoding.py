@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Image encoding profiles for OCR payloads.
+
+Pages used to be rendered RGB and saved as PNG with optimize=True: slow to
+encode and large once base64'd. A profile picks the colour mode (scans of
+legal documents are black on white, so grayscale or 1-bit loses nothing the
+model needs), the format and its quality:
+
+    png           RGB PNG, optimize=True (the original encoding)
+    png-fast      RGB PNG, zlib level 1, no optimize
+    gray-png      grayscale PNG, zlib level 1
+    gray-q16      grayscale quantized to 16 levels, 4-bit PNG
+    bw-png        1-bit PNG (fixed threshold, no dithering)
+    jpeg-90/75/60 grayscale JPEG at that quality
+    webp-90/75    grayscale WebP at that quality
+
+Endpoints choose one with `image_profile` (see ocr_client.Endpoint); ocr_pdf.py
+takes --encoding. Compare them on real pages (encode time, payload size,
+request latency and similarity of the text to a reference profile's):
+
+    python ocr/image_encoding.py ocr/data/file.pdf -n 5
+    python ocr/image_encoding.py ocr/data/file.pdf -n 5 --profiles png,gray-png,jpeg-75 --endpoint gpt-4.1-mini
+    python ocr/image_encoding.py ocr/data/file.pdf --no-ocr     # encode time / size only
+"""
+
+import argparse
+import base64
+import difflib
+import io
+import sys
+import time
+from dataclasses import dataclass
+
+BW_THRESHOLD = 160  # gray level above which a pixel is white in bw-png
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    name: str
+    format: str = "PNG"          # PNG / JPEG / WEBP
+    mode: str = "RGB"            # RGB / L (grayscale) / 1 (bilevel) / P (quantized grayscale)
+    quality: int = None          # JPEG / WebP quality
+    optimize: bool = False       # PNG optimize (slow)
+    compress_level: int = 1      # PNG zlib level when not optimizing
+    colors: int = 16             # palette size for mode P
+
+    @property
+    def mime(self) -> str:
+        return f"image/{self.format.lower()}"
+
+
+PROFILES = {p.name: p for p in [
+    EncodingProfile("png", optimize=True),
+    EncodingProfile("png-fast"),
+    EncodingProfile("gray-png", mode="L"),
+    EncodingProfile("gray-q16", mode="P"),
+    EncodingProfile("bw-png", mode="1"),
+    EncodingProfile("jpeg-90", format="JPEG", mode="L", quality=90),
+    EncodingProfile("jpeg-75", format="JPEG", mode="L", quality=75),
+    EncodingProfile("jpeg-60", format="JPEG", mode="L", quality=60),
+    EncodingProfile("webp-90", format="WEBP", mode="L", quality=90),
+    EncodingProfile("webp-75", format="WEBP", mode="L", quality=75),
+]}
+DEFAULT_PROFILE = "png"
+
+
+def get_profile(name: str) -> EncodingProfile:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown encoding profile {name!r}; choose from {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def encode_image(img, profile: EncodingProfile) -> bytes:
+    """Encode a PIL image (RGB or L) with the profile."""
+    if profile.mode == "1":
+        img = img.convert("L").point(lambda v: 255 if v > BW_THRESHOLD else 0, mode="1")
+    elif profile.mode == "P":
+        img = img.convert("L").quantize(colors=profile.colors)
+    elif img.mode != profile.mode:
+        img = img.convert(profile.mode)
+
+    options = {}
+    if profile.format == "PNG":
+        options = {"optimize": True} if profile.optimize else {"compress_level": profile.compress_level}
+        if profile.mode == "P" and profile.colors <= 16:
+            options["bits"] = 4
+    else:
+        options = {"quality": profile.quality}
+    buffer = io.BytesIO()
+    img.save(buffer, format=profile.format, **options)
+    return buffer.getvalue()
+
+
+def render_image(doc, page_num: int, dpi: int = 150, mode: str = "RGB"):
+    """Render one PyMuPDF page to a PIL image, RGB or L (grayscale)."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    page = doc.load_page(page_num)
+    mat = fitz.Matrix(dpi / 72, dpi / 72)
+    if mode == "RGB":
+        pix = page.get_pixmap(matrix=mat)
+        return Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
+    pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY)
+    return Image.frombytes('L', [pix.width, pix.height], pix.samples)
+
+
+def render_page(doc, page_num: int, dpi: int = 150, profile: str = DEFAULT_PROFILE) -> bytes:
+    """Render one PyMuPDF page and encode it with the named profile."""
+    profile = get_profile(profile)
+    # Non-RGB profiles render gray directly: a third of the pixels to convert and encode
+    img = render_image(doc, page_num, dpi, "RGB" if profile.mode == "RGB" else "L")
+    return encode_image(img, profile)
+
+
+def similarity(text: str, reference: str) -> float:
+    """Character-level similarity (difflib ratio) of an OCR text to the reference."""
+    if not text and not reference:
+        return 1.0
+    return difflib.SequenceMatcher(None, text, reference, autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare image encoding profiles for OCR")
+    parser.add_argument("pdf_path", help="Path to PDF file")
+    parser.add_argument("-s", "--start", type=int, default=0, help="First page (0-indexed)")
+    parser.add_argument("-n", "--pages", type=int, default=5, help="Pages to test (default: 5)")
+    parser.add_argument("--dpi", type=int, default=150, help="Render DPI (default: 150)")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help="Comma-separated profiles (default: all)")
+    parser.add_argument("--reference", default=DEFAULT_PROFILE,
+                        help=f"Profile whose text the others are compared to (default: {DEFAULT_PROFILE})")
+    parser.add_argument("--endpoint", default="qwen", help="Endpoint preset to OCR with (default: qwen)")
+    parser.add_argument("--no-ocr", action="store_true", help="Only measure encode time and payload size")
+    args = parser.parse_args()
+
+    import fitz  # PyMuPDF
+
+    names = [name.strip() for name in args.profiles.split(",") if name.strip()]
+    if not args.no_ocr and args.reference not in names:
+        names.insert(0, args.reference)
+    profiles = [get_profile(name) for name in names]
+
+    doc = fitz.open(args.pdf_path)
+    pages = list(range(args.start, min(args.start + args.pages, len(doc))))
+    if args.start < 0 or not pages:
+        print(f"❌ No pages to test: --start {args.start}, --pages {args.pages} (PDF has {len(doc)} pages)")
+        doc.close()
+        sys.exit(1)
+    client = None
+    if not args.no_ocr:
+        from ocr_client import DEFAULT_PROMPT, get_endpoint, get_ocr_client
+        client = get_ocr_client(get_endpoint(args.endpoint))
+
+    print(f"📄 {args.pdf_path}: pages {pages[0] + 1}-{pages[-1] + 1} at {args.dpi} DPI")
+    print("=" * 78)
+    stats = {}
+    texts = {}
+    for profile in profiles:
+        encode_times, sizes, latencies = [], [], []
+        texts[profile.name] = []
+        futures = []
+        for page_num in pages:
+            start = time.time()
+            payload = render_page(doc, page_num, args.dpi, profile.name)
+            encode_times.append(time.time() - start)
+            sizes.append(len(base64.b64encode(payload)))
+            if client:
+                futures.append(client.submit(payload, DEFAULT_PROMPT, mime=profile.mime))
+        for future in futures:
+            try:
+                result = future.result()
+                latencies.append(result.latency)
+                texts[profile.name].append(result.text)
+            except Exception as e:
+                print(f"    ❌ {profile.name}: {e}")
+                texts[profile.name].append("")
+        stats[profile.name] = (encode_times, sizes, latencies)
+    doc.close()
+
+    reference = texts.get(args.reference)
+    print(f"{'profile':<10} | {'payload KB':>10} | {'render+encode':>13} | {'latency':>8} | {'similarity':>10}")
+    print("-" * 78)
+    for profile in profiles:
+        encode_times, sizes, latencies = stats[profile.name]
+        latency = f"{sum(latencies) / len(latencies):.1f}s" if latencies else "-"
+        if client and reference:
+            scores = [similarity(t, r) for t, r in zip(texts[profile.name], reference)]
+            sim = f"{sum(scores) / len(scores):.1%}"
+        else:
+            sim = "-"
+        print(f"{profile.name:<10} | {sum(sizes) / len(sizes) / 1024:>10.0f} | "
+              f"{sum(encode_times) / len(encode_times) * 1000:>11.0f}ms | {latency:>8} | {sim:>10}")
+    print("=" * 78)
+    print("payload = base64 request size per page; similarity vs the "
+          f"{args.reference!r} text (difflib ratio)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible vision server for offline OCR benchmarks.
+
+Throughput work on ocr_pdf.py (concurrency, render workers, batching,
+streaming) needs many runs against a server that behaves the same every
+time; the real endpoints are slow, cost money and change under load. This
+server answers POST /v1/chat/completions like vLLM / TGI would:
+
+  - text: canned OCR output from ocr/data/sample_ocr*/page_*.md, picked by a
+    hash of the image, so the same page always gets the same text. A request
+    with k images gets k pages framed with <<<PAGE i>>> lines (page_batch.py).
+  - latency: drawn from --latency (fixed:S, uniform:A,B, normal:MEAN,SD,
+    lognormal:MEDIAN,SIGMA, exp:MEAN) plus --per-token seconds per completion
+    token. --slots N simulates a GPU that decodes N requests at once: more
+    requests queue for a slot, as on a saturated endpoint.
+  - failures: --error-rate of the requests get one of --error-codes (429 / 503
+    with Retry-After), --cold-start S answers 503 for the first S seconds
+    (scale-to-zero), --truncate-rate of the responses are cut off with
+    finish_reason "length"; max_tokens is honoured the same way.
+  - stream=True answers with server-sent events, including the usage chunk
+    when stream_options.include_usage is set.
+
+GET /v1/models lists the model, GET /stats returns request / error / token
+counters and the busy seconds of the slots (see bench_mock.py).
+
+Usage:
+    python ocr/mock_server.py --port 8000 --latency lognormal:2,0.3 --slots 8
+    MOCK_OCR_URL=http://127.0.0.1:8000/v1/ python ocr/ocr_pdf.py ocr/data/file.pdf --endpoints mock -j 8
+"""
+
+import argparse
+import base64
+import glob
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8000
+DEFAULT_MODEL = "mock-vl"
+DEFAULT_LATENCY = "lognormal:2,0.3"
+SAMPLE_GLOB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_ocr*", "page_*.md")
+CHARS_PER_TOKEN = 3            # Vietnamese text with the Qwen tokenizer, roughly
+IMAGE_PATCH = 28               # px per vision token side (Qwen-VL)
+STREAM_CHUNK = 12              # chars per streamed chunk (~4 tokens)
+TRUNCATE_RANGE = (0.3, 0.9)    # share of the text kept by --truncate-rate
+
+HEADING_RE = re.compile(r"\A# Page \d+.*\n+")   # added by the sample_ocr_*.py scripts
+
+
+def parse_latency(spec: str):
+    """Latency sampler `f(rng) -> seconds` for a --latency spec."""
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    try:
+        values = [float(v) for v in args.split(",")]
+    except ValueError:
+        raise ValueError(f"Bad latency '{spec}'") from None
+    samplers = {
+        "fixed": (1, lambda rng, s: s),
+        "uniform": (2, lambda rng, a, b: rng.uniform(a, b)),
+        "normal": (2, lambda rng, mean, sd: max(0.0, rng.gauss(mean, sd))),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        "exp": (1, lambda rng, mean: rng.expovariate(1 / mean)),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise ValueError(f"Bad latency '{spec}', expected one of: fixed:S, uniform:A,B, normal:MEAN,SD, "
+                         f"lognormal:MEDIAN,SIGMA, exp:MEAN")
+    sample = samplers[kind][1]
+    return lambda rng: sample(rng, *values)
+
+
+def load_pages(pattern: str = SAMPLE_GLOB) -> list:
+    texts = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding='utf-8') as f:
+            text = HEADING_RE.sub("", f.read()).strip()
+        if text:
+            texts.append(text)
+    if not texts:
+        raise FileNotFoundError(f"No canned pages match {pattern}")
+    return texts
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def image_tokens(data: bytes) -> int:
+    """Vision tokens of an image, as a Qwen-VL server would count them."""
+    from PIL import Image
+    try:
+        width, height = Image.open(io.BytesIO(data)).size
+    except Exception:
+        return 0
+    return math.ceil(width / IMAGE_PATCH) * math.ceil(height / IMAGE_PATCH)
+
+
+class MockBackend:
+    """Canned pages, latency / failure model and counters shared by the handler threads."""
+
+    def __init__(self, pages: list, latency: str = DEFAULT_LATENCY, per_token: float = 0.0,
+                 slots: int = 0, error_rate: float = 0.0, error_codes=(503,), retry_after: float = 1.0,
+                 cold_start: float = 0.0, truncate_rate: float = 0.0, model: str = DEFAULT_MODEL,
+                 seed: int = None):
+        self.pages = pages
+        self.latency = parse_latency(latency)
+        self.per_token = per_token
+        self.slots = threading.Semaphore(slots) if slots > 0 else None
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.model = model
+        self.rng = random.Random(seed)
+        self.started = time.time()
+        self.cold_until = self.started + cold_start
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.in_flight = 0
+
+    def random(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def page_text(self, image: bytes) -> str:
+        digest = hashlib.sha1(image).digest()
+        return self.pages[int.from_bytes(digest[:8], "big") % len(self.pages)]
+
+    def failure(self):
+        """(status, message) of a simulated failure for this request, or None."""
+        if time.time() < self.cold_until:
+            return 503, "Service Unavailable: endpoint is scaling up"
+        if self.error_codes and self.random() < self.error_rate:
+            with self.lock:
+                status = self.rng.choice(self.error_codes)
+            return status, "Simulated failure"
+        return None
+
+    def complete(self, images: list, max_tokens: int) -> tuple:
+        """(text, finish_reason, completion tokens, generation seconds) for the request's images."""
+        if len(images) == 1:
+            text = self.page_text(images[0])
+        else:
+            text = "\n".join(f"<<<PAGE {i}>>>\n{self.page_text(image)}" for i, image in enumerate(images, 1))
+        finish_reason = "stop"
+        if self.truncate_rate and self.random() < self.truncate_rate:
+            with self.lock:
+                keep = self.rng.uniform(*TRUNCATE_RANGE)
+            text, finish_reason = text[:int(len(text) * keep)], "length"
+        if max_tokens and estimate_tokens(text) > max_tokens:
+            text, finish_reason = text[:max_tokens * CHARS_PER_TOKEN], "length"
+        tokens = estimate_tokens(text)
+        with self.lock:
+            seconds = self.latency(self.rng) + tokens * self.per_token
+        return text, finish_reason, tokens, seconds
+
+    def acquire(self):
+        if self.slots:
+            self.slots.acquire()
+        with self.lock:
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+
+    def release(self, busy: float):
+        with self.lock:
+            self.in_flight -= 1
+            self.stats["busy_ms"] += int(busy * 1000)
+        if self.slots:
+            self.slots.release()
+
+    def count(self, **counts):
+        with self.lock:
+            self.stats.update(counts)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {**self.stats, "in_flight": self.in_flight, "uptime": round(time.time() - self.started, 3)}
+
+
+def _decode_images(messages: list) -> list:
+    images = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                url = part["image_url"]["url"]
+                images.append(base64.b64decode(url.partition(",")[2]) if url.startswith("data:") else url.encode())
+    return images
+
+
+def _prompt_text(messages: list) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if p.get("type") == "text")
+    return "\n".join(parts)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real servers
+    backend: MockBackend = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path in ("/v1/models", "/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": self.backend.model, "object": "model", "owned_by": "mock"}]})
+        elif path == "/stats":
+            self._send_json(200, self.backend.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+            return
+        backend = self.backend
+        messages = body.get("messages", [])
+        images = _decode_images(messages)
+        backend.count(requests=1, images=len(images))
+        if not images:
+            backend.count(errors=1)
+            self._send_json(400, {"error": {"message": "No image in the request", "type": "invalid_request_error"}})
+            return
+
+        failure = backend.failure()
+        if failure:
+            status, message = failure
+            backend.count(errors=1, **{f"status_{status}": 1})
+            headers = {"Retry-After": f"{backend.retry_after:g}"} if status in (429, 503) else None
+            self._send_json(status, {"error": {"message": message, "type": "server_error", "code": status}}, headers)
+            return
+
+        text, finish_reason, tokens, seconds = backend.complete(images, body.get("max_tokens"))
+        usage = {
+            "prompt_tokens": estimate_tokens(_prompt_text(messages)) + sum(image_tokens(i) for i in images),
+            "completion_tokens": tokens,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        backend.count(pages=len(images), truncated=int(finish_reason == "length"),
+                      prompt_tokens=usage["prompt_tokens"], completion_tokens=tokens)
+
+        backend.acquire()
+        start = time.time()
+        try:
+            if body.get("stream"):
+                include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+                self._stream(text, finish_reason, usage if include_usage else None, seconds)
+            else:
+                time.sleep(seconds)
+                self._send_json(200, {
+                    "id": f"chatcmpl-mock-{time.time_ns()}", "object": "chat.completion",
+                    "created": int(time.time()), "model": backend.model,
+                    "choices": [{"index": 0, "finish_reason": finish_reason,
+                                 "message": {"role": "assistant", "content": text}}],
+                    "usage": usage,
+                })
+        except (BrokenPipeError, ConnectionResetError):
+            backend.count(disconnects=1)   # client aborted (repetition loop, timeout)
+        finally:
+            backend.release(time.time() - start)
+
+    def _stream(self, text: str, finish_reason: str, usage: dict, seconds: float):
+        """Server-sent events, the generation time spread evenly over the chunks."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": f"chatcmpl-mock-{time.time_ns()}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": self.backend.model}
+
+        def send(event):
+            data = ("data: " + (event if isinstance(event, str) else json.dumps(event, ensure_ascii=False))
+                    + "\n\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        pieces = [text[i:i + STREAM_CHUNK] for i in range(0, len(text), STREAM_CHUNK)]
+        pause = seconds / max(1, len(pieces))
+        for piece in pieces:
+            time.sleep(pause)
+            send({**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        send({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        if usage:
+            send({**base, "choices": [], "usage": usage})
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(host: str = "127.0.0.1", port: int = DEFAULT_PORT, backend: MockBackend = None):
+    """ThreadingHTTPServer (not started) serving `backend`; port 0 picks a free port."""
+    handler = type("Handler", (MockHandler,), {"backend": backend or MockBackend(load_pages())})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_mock_args(parser: argparse.ArgumentParser):
+    """Latency / failure options, shared with bench_mock.py."""
+    parser.add_argument("--latency", default=DEFAULT_LATENCY,
+                        help="Per-request latency: fixed:S, uniform:A,B, normal:MEAN,SD, "
+                             f"lognormal:MEDIAN,SIGMA or exp:MEAN (default: {DEFAULT_LATENCY})")
+    parser.add_argument("--per-token", type=float, default=0.0,
+                        help="Extra seconds per completion token (default: 0)")
+    parser.add_argument("--slots", type=int, default=0,
+                        help="Requests generated at once, the rest queue (default: 0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail (default: 0)")
+    parser.add_argument("--error-codes", default="503",
+                        help="Comma-separated HTTP statuses of the failures (default: 503)")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="Retry-After seconds on 429 / 503 (default: 1)")
+    parser.add_argument("--cold-start", type=float, default=0.0,
+                        help="Answer 503 for this many seconds after start (default: 0)")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Share of responses cut off with finish_reason length (default: 0)")
+    parser.add_argument("--canned", default=SAMPLE_GLOB, help="Glob of the canned page texts")
+    parser.add_argument("--seed", type=int, help="Random seed for latencies and failures")
+
+
+def mock_argv(args) -> list:
+    """Command-line options reproducing the add_mock_args values (to start a server process)."""
+    argv = ["--latency", args.latency, "--per-token", str(args.per_token), "--slots", str(args.slots),
+            "--error-rate", str(args.error_rate), "--error-codes", args.error_codes,
+            "--retry-after", str(args.retry_after), "--cold-start", str(args.cold_start),
+            "--truncate-rate", str(args.truncate_rate), "--canned", args.canned]
+    if args.seed is not None:
+        argv += ["--seed", str(args.seed)]
+    return argv
+
+
+def backend_from_args(args) -> MockBackend:
+    return MockBackend(
+        load_pages(args.canned), latency=args.latency, per_token=args.per_token, slots=args.slots,
+        error_rate=args.error_rate, error_codes=[int(c) for c in args.error_codes.split(",") if c],
+        retry_after=args.retry_after, cold_start=args.cold_start, truncate_rate=args.truncate_rate,
+        model=args.model, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible vision server for OCR benchmarks")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Model name reported (default: {DEFAULT_MODEL})")
+    add_mock_args(parser)
+    args = parser.parse_args()
+
+    try:
+        backend = backend_from_args(args)
+    except (ValueError, FileNotFoundError) as e:
+        parser.error(str(e))
+    server = make_server(args.host, args.port, backend)
+    host, port = server.server_address[:2]
+    print(f"🧪 Mock OCR server on http://{host}:{port}/v1/ | {len(backend.pages)} canned pages | "
+          f"latency {args.latency}" + (f" + {args.per_token:g}s/token" if args.per_token else "")
+          + (f" | {args.slots} slots" if args.slots else "")
+          + (f" | errors {args.error_rate:.0%} ({args.error_codes})" if args.error_rate else "")
+          + (f" | truncate {args.truncate_rate:.0%}" if args.truncate_rate else ""), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📊 {json.dumps(backend.snapshot())}")
+
+
+if __name__ == "__main__":
+    main()
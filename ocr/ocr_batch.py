@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+OCR a folder of PDFs through one shared endpoint pool.
+
+Running ocr_pdf.py once per document leaves the endpoints idle while one run
+drains its last pages and the next one starts rendering. Here up to
+--documents PDFs run at once (each is a normal ocr_pdf() run with its own
+output, journal and render workers), all sending pages through the same
+EndpointPool:
+
+  - priority: documents are ranked (--order small: fewest remaining pages
+    first; deadline: earliest deadline from --deadlines first; name) and the
+    rank is the priority of their requests. The pool serves the most urgent
+    waiting request first, so the top document runs at full speed and the
+    others only take slots it leaves free.
+  - resume: finished documents are skipped; unfinished ones continue from
+    their progress journal like a rerun of ocr_pdf.py.
+  - progress: one line per page with the aggregate pages done, throughput
+    and ETA over all documents; each document's own output goes to
+    <output>.log.
+
+--deadlines is a JSON file mapping PDF file names to dates:
+
+    {"Quyet_dinh_3467-QD-BYT.pdf": "2026-10-20", "652289.pdf": "2026-10-25"}
+
+Usage:
+    python ocr/ocr_batch.py ocr/data/                          # every PDF in the folder
+    python ocr/ocr_batch.py "ocr/data/**/*.pdf" -j 8 --documents 4
+    python ocr/ocr_batch.py ocr/data/ --order deadline --deadlines deadlines.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from ocr_cache import OCRCache
+from ocr_pdf import (add_ocr_args, default_render_workers, format_time, ocr_kwargs_from_args, ocr_pdf,
+                     pool_from_args, positive_int)
+from page_index import load_index
+from progress_journal import ProgressJournal
+
+DEFAULT_DOCUMENTS = 3
+DEFAULT_CONCURRENCY = 4
+ORDERS = ("small", "deadline", "name")
+
+
+@dataclass
+class Document:
+    pdf_path: str
+    output_path: str
+    pages: int
+    done: int                  # pages already in the output
+    deadline: str = None
+    priority: int = 0
+    status: str = "queued"
+    seconds: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.pdf_path)
+
+    @property
+    def remaining(self) -> int:
+        return self.pages - self.done
+
+
+def find_pdfs(inputs: list) -> list:
+    """PDF paths from directories (their *.pdf) and glob patterns, without duplicates."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "*.pdf")) + glob.glob(os.path.join(item, "*.PDF"))
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths.extend(sorted(p for p in matches if p.lower().endswith(".pdf") and os.path.isfile(p)))
+    return list(dict.fromkeys(paths))
+
+
+def pages_done(output_path: str) -> int:
+    """Pages of an earlier run found in the output (journal, or index of a finished run)."""
+    journal_file = output_path + ".progress.jsonl"
+    if os.path.exists(journal_file):
+        return len(ProgressJournal(journal_file).pages)
+    if os.path.exists(output_path):
+        return len(load_index(output_path))
+    return 0
+
+
+def output_path_for(pdf_path: str, output_dir: str = None) -> str:
+    if output_dir:
+        return os.path.join(output_dir, os.path.splitext(os.path.basename(pdf_path))[0] + ".txt")
+    return os.path.splitext(pdf_path)[0] + ".txt"
+
+
+def output_collisions(pdf_paths: list, output_dir: str = None) -> dict:
+    """{output path: [PDFs]} for outputs more than one PDF would write (same name in -o DIR)."""
+    by_output = {}
+    for pdf_path in pdf_paths:
+        by_output.setdefault(os.path.normcase(output_path_for(pdf_path, output_dir)), []).append(pdf_path)
+    return {output: pdfs for output, pdfs in by_output.items() if len(pdfs) > 1}
+
+
+def load_document(pdf_path: str, output_dir: str = None) -> Document:
+    import fitz  # PyMuPDF
+
+    output_path = output_path_for(pdf_path, output_dir)
+    with fitz.open(pdf_path) as doc:
+        pages = len(doc)
+    return Document(pdf_path, output_path, pages, min(pages, pages_done(output_path)))
+
+
+def order_documents(documents: list, order: str = "small", deadlines: dict = None) -> list:
+    """Sort documents by the --order policy and number their priorities 0, 1, ..."""
+    for document in documents:
+        document.deadline = (deadlines or {}).get(document.name)
+    if order == "small":
+        key = lambda d: (d.remaining, d.name)
+    elif order == "deadline":
+        # Documents without a deadline go last, smallest first
+        key = lambda d: (d.deadline is None, d.deadline or "", d.remaining, d.name)
+    else:
+        key = lambda d: d.name
+    documents = sorted(documents, key=key)
+    for priority, document in enumerate(documents):
+        document.priority = priority
+    return documents
+
+
+class _DocumentLogs:
+    """sys.stdout replacement that sends each document thread's prints to its own log file."""
+
+    def __init__(self, console):
+        self.console = console
+        self.files = {}        # thread ident -> log file
+
+    def open(self, path: str):
+        self.files[threading.get_ident()] = open(path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.files.pop(threading.get_ident()).close()
+
+    def write(self, text: str):
+        return self.files.get(threading.get_ident(), self.console).write(text)
+
+    def flush(self):
+        self.files.get(threading.get_ident(), self.console).flush()
+
+
+def run_batch(documents: list, pool, concurrency: int, parallel_documents: int = DEFAULT_DOCUMENTS,
+              **ocr_kwargs) -> tuple:
+    """OCR the documents (already ordered) through `pool`; returns (seconds, pages written)."""
+    todo = [d for d in documents if d.remaining > 0]
+    for document in documents:
+        if not document.remaining:
+            document.status = "done earlier"
+    total = sum(d.remaining for d in todo)
+    counts = {"pages": 0}
+    lock = threading.Lock()
+    logs = _DocumentLogs(sys.stdout)
+    console = sys.stdout
+    start = time.time()
+
+    def say(text: str):
+        with lock:
+            console.write(text + "\n")
+            console.flush()
+
+    def progress(document: Document, page_num: int):
+        with lock:
+            counts["pages"] += 1
+            done = counts["pages"]
+        elapsed = time.time() - start
+        eta = elapsed / done * (total - done)
+        say(f"✅ {document.name} p{page_num + 1}/{document.pages} | {done}/{total} pages | "
+            f"{done / elapsed * 3600:.0f} pages/hour | Elapsed: {format_time(elapsed)} | "
+            f"ETA: {format_time(eta)}")
+
+    def run(document: Document):
+        document.status = "running"
+        say(f"▶️  {document.name}: {document.remaining} pages (priority {document.priority}) "
+            f"→ {document.output_path}")
+        doc_start = time.time()
+        logs.open(document.output_path + ".log")
+        try:
+            ocr_pdf(document.pdf_path, document.output_path, concurrency=concurrency, pool=pool,
+                    priority=document.priority, on_page=lambda p, _: progress(document, p), **ocr_kwargs)
+            left = document.pages - pages_done(document.output_path)
+            document.status = "done" if not left else f"{left} pages failed"
+        except Exception as e:
+            document.status = f"error: {e}"
+        finally:
+            logs.close()
+            document.seconds = time.time() - doc_start
+        say(f"{'🏁' if document.status == 'done' else '❌'} {document.name}: {document.status} "
+            f"in {format_time(document.seconds)}")
+
+    sys.stdout = logs
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, parallel_documents)) as executor:
+            # Documents start in priority order as threads free up
+            for future in [executor.submit(run, d) for d in todo]:
+                future.result()
+    finally:
+        sys.stdout = console
+    return time.time() - start, counts["pages"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR many PDFs through one shared endpoint pool")
+    parser.add_argument("inputs", nargs="+", help="Directories (their *.pdf) and/or glob patterns")
+    parser.add_argument("-o", "--output-dir", help="Write outputs here (default: next to each PDF)")
+    parser.add_argument("--documents", type=positive_int, default=DEFAULT_DOCUMENTS,
+                        help=f"Documents processed at once (default: {DEFAULT_DOCUMENTS})")
+    parser.add_argument("--order", choices=ORDERS, default="small",
+                        help="Priority: fewest remaining pages first, earliest --deadlines first, "
+                             "or by file name (default: small)")
+    parser.add_argument("--deadlines", help="JSON file {\"file.pdf\": \"YYYY-MM-DD\", ...} for --order deadline")
+    add_ocr_args(parser, default_concurrency=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    pdfs = find_pdfs(args.inputs)
+    if not pdfs:
+        print(f"❌ No PDFs found in {', '.join(args.inputs)}")
+        sys.exit(1)
+    collisions = output_collisions(pdfs, args.output_dir)
+    if collisions:
+        # Two documents writing one output and journal would corrupt both
+        for output, paths in sorted(collisions.items()):
+            print(f"❌ {', '.join(paths)} would all write {output}")
+        print("   Rename them or run each folder with its own --output-dir")
+        sys.exit(1)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    deadlines = None
+    if args.deadlines:
+        with open(args.deadlines, 'r', encoding='utf-8') as f:
+            deadlines = json.load(f)
+    elif args.order == "deadline":
+        print("⚠️ --order deadline without --deadlines: ordering by size")
+
+    documents = order_documents([load_document(p, args.output_dir) for p in pdfs], args.order, deadlines)
+    pool, concurrency = pool_from_args(args, DEFAULT_CONCURRENCY)
+    kwargs = ocr_kwargs_from_args(args)
+    if kwargs["render_workers"] is None:
+        # The documents share the CPUs
+        kwargs["render_workers"] = max(1, default_render_workers() // max(1, args.documents))
+    cache = None if args.no_cache else OCRCache(args.cache)
+
+    total = sum(d.remaining for d in documents)
+    print(f"📚 {len(documents)} PDFs, {total} pages to OCR "
+          f"({sum(d.done for d in documents)} done earlier)")
+    print(f"🤖 Model: {', '.join(pool.models)} | 🔀 Concurrency: {concurrency} | "
+          f"📑 Documents at once: {args.documents} | Order: {args.order}")
+    for document in documents:
+        deadline = f" | deadline {document.deadline}" if document.deadline else ""
+        print(f"   {document.priority + 1:>3}. {document.name}: {document.remaining}/{document.pages} pages{deadline}")
+    print("=" * 60)
+
+    try:
+        elapsed, written = run_batch(documents, pool, concurrency, args.documents, cache=cache, **kwargs)
+    finally:
+        if cache:
+            cache.evict()
+            cache.close()
+
+    unfinished = [d for d in documents if d.status not in ("done", "done earlier")]
+    print("\n" + "=" * 60)
+    print("✅ Batch complete!" if not unfinished else f"⚠️ Batch finished: {len(unfinished)} documents not done")
+    for document in documents:
+        print(f"   {document.name}: {document.status}"
+              + (f" in {format_time(document.seconds)}" if document.seconds else ""))
+    print(f"⏱️  Total time: {format_time(elapsed)}")
+    if written and elapsed:
+        print(f"🚀 Throughput: {written / elapsed * 3600:.0f} pages/hour (all documents)")
+    if len(pool.members) > 1:
+        print("🌐 Per endpoint:")
+        pool.report(elapsed)
+    if unfinished:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
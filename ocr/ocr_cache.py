@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for OCR results (SQLite).
+
+Key = sha256 of (page image sha256, model, prompt sha256, decoding params), so
+a page is paid for once regardless of output path, script (ocr_pdf.py /
+ocr_pdf_2.py with its own prompt gets its own entries) or source PDF:
+identical pages such as repeated annex templates hit the same entry.
+
+Entries are evicted by age and, least recently used first, by total size.
+
+Usage:
+    python ocr/ocr_cache.py stats
+    python ocr/ocr_cache.py evict --max-mb 500 --max-age-days 30
+    python ocr/ocr_cache.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'OCR_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'thuvienphapluat-crawler', 'ocr_cache.sqlite'),
+)
+DEFAULT_MAX_MB = 1024
+DEFAULT_MAX_AGE_DAYS = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    model TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def cache_key(image_bytes: bytes, model: str, prompt: str, params: dict = None) -> str:
+    """Content address of one OCR request."""
+    parts = [
+        hashlib.sha256(image_bytes).hexdigest(),
+        model,
+        hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+        params or {},
+    ]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class OCRCache:
+    """
+    SQLite-backed OCR cache; `hits` / `misses` count this session's lookups.
+    One instance can be shared by threads (ocr_batch.py runs one document per
+    thread): the connection is serialized by a lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, *keys: str):
+        """Cached text for the first key present (one key per candidate model), or None."""
+        with self._lock:
+            for key in keys:
+                row = self.conn.execute('SELECT text FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    self.conn.execute('UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?',
+                                      (time.time(), key))
+                    self.conn.commit()
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str, model: str):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries (key, text, model, size, created, last_used, hits) '
+                'VALUES (?, ?, ?, ?, ?, ?, 0)',
+                (key, text, model, len(text.encode('utf-8')), now, now),
+            )
+            self.conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def evict(self, max_mb: float = DEFAULT_MAX_MB, max_age_days: float = DEFAULT_MAX_AGE_DAYS) -> int:
+        """Drop entries unused for max_age_days, then LRU entries beyond max_mb. Returns count."""
+        with self._lock:
+            removed = self.conn.execute('DELETE FROM entries WHERE last_used < ?',
+                                        (time.time() - max_age_days * 86400,)).rowcount
+            max_bytes = max_mb * 1024 * 1024
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > max_bytes:
+                for key, size in self.conn.execute(
+                        'SELECT key, size FROM entries ORDER BY last_used').fetchall():
+                    if total <= max_bytes:
+                        break
+                    self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    total -= size
+                    removed += 1
+            self.conn.commit()
+            return removed
+
+    def stats(self) -> dict:
+        entries, size = self.conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        counters = dict(self.conn.execute('SELECT name, value FROM counters'))
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        return {
+            'entries': entries,
+            'size_mb': size / 1024 / 1024,
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'hit_rate': counters.get('hits', 0) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Add this session's hits/misses to the lifetime counters and close."""
+        with self._lock:
+            for name, value in (('hits', self.hits), ('misses', self.misses)):
+                self.conn.execute(
+                    'INSERT INTO counters (name, value) VALUES (?, ?) '
+                    'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                    (name, value),
+                )
+            self.conn.commit()
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect / trim the OCR result cache")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help=f"Cache file (default: {DEFAULT_CACHE_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Entries, size and lifetime hit rate")
+    evict = sub.add_parser("evict", help="Drop old / least recently used entries")
+    evict.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB)
+    evict.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+    sub.add_parser("clear", help="Remove every entry")
+    args = parser.parse_args()
+
+    cache = OCRCache(args.cache)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"📦 Cache: {args.cache}")
+        print(f"   Entries: {stats['entries']:,} ({stats['size_mb']:.1f} MB)")
+        print(f"   Lookups: {stats['hits']:,} hits / {stats['misses']:,} misses "
+              f"(hit rate {stats['hit_rate']:.0%})")
+    elif args.command == "evict":
+        removed = cache.evict(args.max_mb, args.max_age_days)
+        print(f"🧹 Evicted {removed} entries")
+    else:
+        removed = cache.conn.execute('DELETE FROM entries').rowcount
+        cache.conn.commit()
+        print(f"🧹 Cleared {removed} entries")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
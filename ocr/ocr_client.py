@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+"""
+Async OCR client shared by the OCR scripts.
+
+One OCRClient per OpenAI-compatible endpoint: requests go through AsyncOpenAI
+on a single pooled httpx.AsyncClient (keep-alive connections), capped at
+`endpoint.max_concurrency` in flight, with connect/read timeouts.
+
+Clients run on one shared event loop on a background thread, so both styles work:
+
+    client = get_ocr_client(get_endpoint("qwen"))
+    future = client.submit(png_bytes, DEFAULT_PROMPT)   # concurrent.futures.Future
+    result = client.ocr(png_bytes, DEFAULT_PROMPT)      # blocking
+    result = await client.aocr(png_bytes, DEFAULT_PROMPT)  # on the shared loop only
+
+stream=True streams the response (on_delta gets each piece) and aborts as soon
+as the output falls into a repetition loop (see repetition.py).
+
+EndpointPool spreads requests over several endpoints (see load_endpoint_pool).
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_PROMPT = """Trích xuất toàn bộ text từ hình ảnh này. 
+Đây là văn bản pháp luật Việt Nam, có thể chứa bảng.
+Nếu có bảng, hãy format thành markdown table với đầy đủ các cột.
+Giữ nguyên định dạng và thứ tự của văn bản.
+Không thêm giải thích, chỉ trả về nội dung được trích xuất."""
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """An OpenAI-compatible vision endpoint and its connection limits."""
+    name: str
+    base_url: Optional[str]   # None = api.openai.com
+    api_key: str
+    model: str
+    max_concurrency: int = 4
+    timeout: float = 120.0
+    connect_timeout: float = 10.0
+    keepalive_expiry: float = 60.0
+    image_detail: Optional[str] = None   # "high" for OpenAI models
+    prompt_first: bool = False           # OpenAI scripts send the text part first
+    image_profile: str = "png"           # page encoding, see image_encoding.PROFILES
+
+
+def _presets() -> dict:
+    hf_key = os.getenv('QWEN_API_KEY', os.getenv('HF_API_KEY', ''))
+    openai_key = os.getenv('OPENAI_API_KEY', '')
+    return {
+        # Qwen3 VL 8B on HuggingFace (ocr_pdf.py, sample_ocr_qwen.py)
+        'qwen': Endpoint(
+            'qwen',
+            os.getenv('QWEN_BASE_URL', 'https://jd5nnmh2rciko6ts.us-east-1.aws.endpoints.huggingface.cloud/v1/'),
+            hf_key,
+            os.getenv('QWEN_MODEL', 'unsloth/Qwen3-VL-8B-Instruct-GGUF'),
+        ),
+        'qwen25_32b': Endpoint(
+            'qwen25_32b',
+            os.getenv('QWEN25_BASE_URL', 'https://s70h8y6f6kwesdqi.us-east-1.aws.endpoints.huggingface.cloud/v1/'),
+            hf_key,
+            'Qwen/Qwen2.5-VL-32B-Instruct-AWQ',
+        ),
+        'qwen3_30b': Endpoint(
+            'qwen3_30b',
+            os.getenv('QWEN3_30B_BASE_URL', 'https://b9q7ifg75v5zmz40.us-east-1.aws.endpoints.huggingface.cloud/v1/'),
+            hf_key,
+            'Qwen/Qwen3-VL-30B-A3B-Instruct-FP8',
+        ),
+        'mistral': Endpoint(
+            'mistral',
+            os.getenv('MISTRAL_BASE_URL', 'https://ofkwxswanl1aa1wg.us-east-1.aws.endpoints.huggingface.cloud/v1/'),
+            hf_key,
+            'unsloth/Mistral-Small-3.2-24B-Instruct-2506-GGUF',
+        ),
+        'gpt-4.1-mini': Endpoint('gpt-4.1-mini', None, openai_key, 'gpt-4.1-mini',
+                                 max_concurrency=8, image_detail='high', prompt_first=True),
+        'gpt-4o-mini': Endpoint('gpt-4o-mini', None, openai_key, 'gpt-4o-mini',
+                                max_concurrency=8, image_detail='high', prompt_first=True),
+        # Local mock server for offline benchmarks (mock_server.py)
+        'mock': Endpoint('mock', os.getenv('MOCK_OCR_URL', 'http://127.0.0.1:8000/v1/'), 'mock', 'mock-vl',
+                         max_concurrency=8),
+    }
+
+
+def get_endpoint(name: str, **overrides) -> Endpoint:
+    """Endpoint preset by name (env vars are read at call time)."""
+    presets = _presets()
+    if name not in presets:
+        raise ValueError(f"Unknown endpoint '{name}', expected one of: {', '.join(presets)}")
+    return replace(presets[name], **overrides)
+
+
+@dataclass
+class OCRResult:
+    text: str
+    finish_reason: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    endpoint: str = ""
+    model: str = ""
+    loops_aborted: int = 0   # streamed attempts cut short by a repetition loop
+    tokens_saved: int = 0    # max_tokens not spent on those attempts
+    bands: int = 1           # image bands OCR'd separately (page_split.aocr_split)
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Event loop shared by every client in the process, running on a daemon thread."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ocr-client", daemon=True).start()
+    return _loop
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt n waits uniform(0, min(max_delay,
+    base_delay * 2**n)), or the server's Retry-After when it sends one.
+    Client errors (400/401/403/404/422) are not retried.
+    """
+    max_attempts: int = 5
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, error: Exception = None) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay * 5)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+# Decoding changes for the second try after a streamed repetition loop
+LOOP_RETRY_PARAMS = {"frequency_penalty": 0.5, "temperature": 0.3}
+
+
+def retry_after_seconds(error: Exception):
+    """Seconds from a Retry-After / retry-after-ms header on an API error, or None."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    if headers.get('retry-after-ms'):
+        try:
+            return float(headers['retry-after-ms']) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Connection errors, timeouts, 408/409/429 and 5xx are worth retrying. Other
+    exceptions (4xx, or a bug on our side such as a TypeError) fail at once.
+    """
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    import httpx
+    import openai
+    # APITimeoutError is an APIConnectionError; httpx errors can surface mid-stream
+    return isinstance(error, (openai.APIConnectionError, httpx.TransportError))
+
+
+def build_messages(endpoint: Endpoint, image_bytes, prompt: str,
+                   mime: str = 'image/png') -> list:
+    """One user message with the image (or list of images, in order) and the prompt."""
+    image_parts = []
+    for image in (image_bytes if isinstance(image_bytes, (list, tuple)) else [image_bytes]):
+        base64_image = base64.b64encode(image).decode('utf-8')
+        image_url = {'url': f'data:{mime};base64,{base64_image}'}
+        if endpoint.image_detail:
+            image_url['detail'] = endpoint.image_detail
+        image_parts.append({'type': 'image_url', 'image_url': image_url})
+    text_part = {'type': 'text', 'text': prompt}
+    content = [text_part] + image_parts if endpoint.prompt_first else image_parts + [text_part]
+    return [{'role': 'user', 'content': content}]
+
+
+class OCRClient:
+    """Pooled async client for one endpoint (see module docstring)."""
+
+    def __init__(self, endpoint: Endpoint, retry: RetryPolicy = DEFAULT_RETRY):
+        self.endpoint = endpoint
+        self.retry = retry
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        """Create the HTTP pool lazily, on the loop that will use it."""
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            ep = self.endpoint
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=ep.max_concurrency,
+                    max_keepalive_connections=ep.max_concurrency,
+                    keepalive_expiry=ep.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(ep.timeout, connect=ep.connect_timeout),
+            )
+            self._client = AsyncOpenAI(
+                base_url=ep.base_url,
+                api_key=ep.api_key,
+                http_client=http_client,
+                max_retries=0,  # retries are handled in aocr()
+            )
+            self._semaphore = asyncio.Semaphore(ep.max_concurrency)
+        return self._client
+
+    async def _acomplete(self, messages: list, max_tokens: int, **params) -> OCRResult:
+        async with self._semaphore:
+            start = time.time()
+            response = await self._client.chat.completions.create(
+                model=self.endpoint.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                **params,
+            )
+        choice = response.choices[0]
+        usage = response.usage
+        return OCRResult(
+            text=choice.message.content or "",
+            finish_reason=choice.finish_reason,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            latency=time.time() - start,
+            endpoint=self.endpoint.name,
+            model=self.endpoint.model,
+        )
+
+    async def _astream(self, messages: list, max_tokens: int, on_delta=None, **params) -> OCRResult:
+        """
+        Streamed completion, aborted as soon as the text ends in a repetition
+        loop: the result then has finish_reason "repetition" and the text up
+        to the loop. on_delta(text) is called with each piece as it arrives.
+        """
+        from repetition import RepetitionDetector
+
+        detector = RepetitionDetector()
+        finish_reason = None
+        usage = None
+        chunks = 0
+        async with self._semaphore:
+            start = time.time()
+            stream = await self._client.chat.completions.create(
+                model=self.endpoint.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True},
+                **params,
+            )
+            try:
+                async for chunk in stream:
+                    usage = chunk.usage or usage
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    delta = choice.delta.content if choice.delta else None
+                    if not delta:
+                        continue
+                    chunks += 1
+                    if on_delta is not None:
+                        on_delta(delta)
+                    if detector.feed(delta):
+                        finish_reason = "repetition"
+                        break
+            finally:
+                await stream.close()
+        # Servers stream about one token per chunk; usage is missing when aborted
+        completion_tokens = usage.completion_tokens if usage else chunks
+        return OCRResult(
+            text=detector.truncated(),
+            finish_reason=finish_reason,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=completion_tokens,
+            latency=time.time() - start,
+            endpoint=self.endpoint.name,
+            model=self.endpoint.model,
+            loops_aborted=int(finish_reason == "repetition"),
+            tokens_saved=max(0, max_tokens - completion_tokens) if finish_reason == "repetition" else 0,
+        )
+
+    async def aocr(self, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, mime: str = 'image/png',
+                   max_tokens: int = 4096, max_retries: int = None, stream: bool = False,
+                   on_delta=None, **params) -> OCRResult:
+        """
+        OCR one image (or a list of images sent in one request), retrying per
+        self.retry (max_retries overrides its max_attempts). Raises the last
+        error once retries are exhausted.
+
+        With stream=True the response is streamed and a repetition loop aborts
+        the request; it is retried once with LOOP_RETRY_PARAMS, and if that
+        loops too the text before the loop is returned (finish_reason
+        "repetition").
+        """
+        if max_retries is None:
+            max_retries = self.retry.max_attempts
+        self._ensure_client()
+        messages = build_messages(self.endpoint, image_bytes, prompt, mime)
+
+        loops_aborted = tokens_saved = 0
+        attempt = 0
+        while True:
+            try:
+                if not stream:
+                    return await self._acomplete(messages, max_tokens, **params)
+                result = await self._astream(messages, max_tokens, on_delta, **params)
+                loops_aborted += result.loops_aborted
+                tokens_saved += result.tokens_saved
+                if result.loops_aborted and loops_aborted == 1:
+                    print(f"    🔁 Repetition loop after {result.completion_tokens} tokens, "
+                          f"retrying with {LOOP_RETRY_PARAMS}")
+                    params = {**params, **LOOP_RETRY_PARAMS}
+                    continue
+                result.loops_aborted, result.tokens_saved = loops_aborted, tokens_saved
+                return result
+            except Exception as e:
+                if attempt < max_retries - 1 and is_retryable(e):
+                    delay = self.retry.delay(attempt, e)
+                    print(f"    ⚠️ Retry {attempt + 1}/{max_retries - 1} in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                else:
+                    if max_retries > 1:
+                        print(f"    ❌ Failed after {attempt + 1} attempts: {e}")
+                    raise
+
+    def submit(self, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, **kwargs):
+        """Schedule aocr() on the shared loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(self.aocr(image_bytes, prompt, **kwargs), get_loop())
+
+    def ocr(self, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, **kwargs) -> OCRResult:
+        """Blocking OCR through the shared pool."""
+        return self.submit(image_bytes, prompt, **kwargs).result()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def close(self):
+        """Close the connection pool (the shared loop keeps running)."""
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self.aclose(), get_loop()).result()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_ocr_client(endpoint: Endpoint) -> OCRClient:
+    """Process-wide client per endpoint, so every caller shares one connection pool."""
+    with _clients_lock:
+        client = _clients.get(endpoint)
+        if client is None:
+            client = _clients[endpoint] = OCRClient(endpoint)
+        return client
+
+
+class _PoolMember:
+    """
+    One endpoint in a pool: load, latency estimate and a circuit breaker.
+
+    closed -> open after OPEN_AFTER_ERRORS consecutive failures; open for a
+    cooldown that doubles each time (up to MAX_COOLDOWN); then half-open, where
+    a single probe request decides between closed and open again.
+    """
+
+    EWMA_ALPHA = 0.3
+    OPEN_AFTER_ERRORS = 3
+    BASE_COOLDOWN = 30.0
+    MAX_COOLDOWN = 600.0
+
+    def __init__(self, client: OCRClient):
+        self.client = client
+        self.name = client.endpoint.name
+        self.capacity = client.endpoint.max_concurrency
+        self.in_flight = 0
+        self.latency = None          # EWMA of successful request latency
+        self.state = "closed"
+        self.consecutive_errors = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.cooldown = self.BASE_COOLDOWN
+        self.pages = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        """Can take a request: breaker closed, or cooled down and no probe running."""
+        if self.state == "closed":
+            return True
+        return now >= self.open_until and not self.probing
+
+    def expected_wait(self, default_latency: float) -> float:
+        """Expected time until a new request here completes."""
+        latency = self.latency if self.latency is not None else default_latency
+        return (self.in_flight + 1) * latency / self.capacity
+
+    def record_success(self, latency: float):
+        self.pages += 1
+        self.latency = latency if self.latency is None else (
+            self.EWMA_ALPHA * latency + (1 - self.EWMA_ALPHA) * self.latency)
+        self.state = "closed"
+        self.probing = False
+        self.consecutive_errors = 0
+        self.cooldown = self.BASE_COOLDOWN
+
+    def record_rejected(self):
+        """Count a non-retryable failure: it says nothing about the endpoint's health."""
+        self.errors += 1
+        self.probing = False  # the next request after the cooldown probes again
+
+    def record_error(self) -> bool:
+        """Count a failure; returns True if it (re)opened the breaker."""
+        self.errors += 1
+        if self.probing:
+            self.probing = False
+        elif self.state == "open":
+            return False  # a request that started before the breaker opened
+        else:
+            self.consecutive_errors += 1
+            if self.consecutive_errors < self.OPEN_AFTER_ERRORS:
+                return False
+        self.state = "open"
+        self.open_until = time.time() + self.cooldown
+        self.cooldown = min(self.cooldown * 2, self.MAX_COOLDOWN)
+        return True
+
+
+class EndpointPool:
+    """
+    Spreads OCR requests over several endpoints.
+
+    Each request goes to an available endpoint with free capacity and the lowest
+    expected completion time ((in-flight + 1) x observed latency / capacity),
+    so faster endpoints get proportionally more pages. Endpoints that keep
+    failing (errors, or 503s while a scale-to-zero endpoint is cold) are cut
+    off by their circuit breaker; while every breaker is open the whole run
+    waits. A failed request fails over to an endpoint it has not tried yet, or
+    backs off per the RetryPolicy when there is none.
+
+    Requests carry a priority (lower goes first): while a more urgent request
+    waits for a slot, less urgent ones do not take one. Documents sharing a
+    pool (ocr_batch.py) thereby keep their order without leaving slots idle.
+    """
+
+    def __init__(self, endpoints: list, retry: RetryPolicy = DEFAULT_RETRY):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.members = [_PoolMember(get_ocr_client(ep)) for ep in endpoints]
+        self.retry = retry
+        self._changed = None  # asyncio.Condition, created on the shared loop
+        self._paused = False
+        self._waiting = Counter()  # priority -> requests waiting for a slot
+
+    @property
+    def capacity(self) -> int:
+        return sum(m.capacity for m in self.members)
+
+    @property
+    def models(self) -> list:
+        return list(dict.fromkeys(m.client.endpoint.model for m in self.members))
+
+    @property
+    def image_profile(self) -> str:
+        """The endpoints' common image profile; PNG when they disagree."""
+        profiles = {m.client.endpoint.image_profile for m in self.members}
+        return profiles.pop() if len(profiles) == 1 else "png"
+
+    def _untried(self, exclude: set, now: float) -> list:
+        return [m for m in self.members if m.available(now) and m not in exclude]
+
+    def _pick(self, exclude: set):
+        now = time.time()
+        known = [m.latency for m in self.members if m.latency is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
+        available = [m for m in self.members if m.available(now)]
+        # Retries go to an endpoint not tried yet, waiting for one to free up;
+        # tried ones are reused only when no other endpoint is available
+        untried = self._untried(exclude, now)
+        candidates = [m for m in (untried or available) if m.in_flight < m.capacity]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda m: m.expected_wait(default_latency))
+
+    async def _acquire(self, exclude: set, priority: int = 0) -> _PoolMember:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        async with self._changed:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    member = self._pick(exclude) if priority <= min(self._waiting) else None
+                    if member is not None:
+                        if self._paused:
+                            print("    ▶️ Endpoint available again, resuming")
+                            self._paused = False
+                        if member.state == "open":
+                            member.probing = True  # half-open: this request is the probe
+                        member.in_flight += 1
+                        return member
+                    # Everything busy or open: wake on a release or when a cooldown ends
+                    now = time.time()
+                    open_until = [m.open_until for m in self.members if m.state == "open"]
+                    probing = any(m.probing for m in self.members)
+                    if len(open_until) == len(self.members) and not probing and not self._paused:
+                        print(f"    ⏸️ All endpoints down, pausing for {max(0, min(open_until) - now):.0f}s")
+                        self._paused = True
+                    timeout = max(0.1, min(open_until) - now) if open_until else None
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiting[priority] -= 1
+                if not self._waiting[priority]:
+                    del self._waiting[priority]
+                    self._changed.notify_all()  # less urgent requests may go now
+
+    async def _release(self, member: _PoolMember):
+        async with self._changed:
+            member.in_flight -= 1
+            self._changed.notify_all()
+
+    async def aocr(self, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, max_retries: int = None,
+                   priority: int = 0, **kwargs) -> OCRResult:
+        max_attempts = max_retries or self.retry.max_attempts
+        tried = set()
+        last_error = None
+        for attempt in range(max_attempts):
+            if last_error is not None and not self._untried(tried, time.time()):
+                delay = self.retry.delay(attempt - 1, last_error)
+                print(f"    ⚠️ Retry {attempt}/{max_attempts - 1} in {delay:.1f}s: {last_error}")
+                await asyncio.sleep(delay)
+            member = await self._acquire(tried, priority)
+            tried.add(member)
+            try:
+                result = await member.client.aocr(image_bytes, prompt, max_retries=1, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # A 400 for an oversized image must not pause a healthy endpoint
+                    member.record_rejected()
+                    raise
+                if member.record_error():
+                    print(f"    🚧 Circuit open for {member.name} "
+                          f"({member.open_until - time.time():.0f}s): {e}")
+                if attempt == max_attempts - 1:
+                    raise
+                last_error = e
+            else:
+                member.record_success(result.latency)
+                return result
+            finally:
+                await self._release(member)
+
+    def submit(self, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, **kwargs):
+        return asyncio.run_coroutine_threadsafe(self.aocr(image_bytes, prompt, **kwargs), get_loop())
+
+    def ocr(self, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, **kwargs) -> OCRResult:
+        return self.submit(image_bytes, prompt, **kwargs).result()
+
+    def report(self, elapsed: float):
+        """Print per-endpoint pages, throughput, latency and errors."""
+        for m in self.members:
+            rate = m.pages / elapsed * 3600 if elapsed > 0 else 0
+            latency = f"{m.latency:.1f}s" if m.latency is not None else "-"
+            print(f"   {m.name}: {m.pages} pages | {rate:.0f} pages/hour | "
+                  f"latency {latency} | errors {m.errors}")
+
+
+def load_endpoint_pool(spec: str, max_concurrency: int = None,
+                       retry: RetryPolicy = DEFAULT_RETRY) -> EndpointPool:
+    """
+    Build a pool from a comma-separated list of preset names ("qwen,qwen3_30b")
+    or a JSON file: a list of {"preset": ...} and/or full endpoint objects,
+    each optionally overriding Endpoint fields, e.g.
+
+        [{"preset": "qwen", "max_concurrency": 4, "image_profile": "jpeg-75"},
+         {"name": "qwen-b", "base_url": "https://.../v1/", "api_key_env": "QWEN_API_KEY",
+          "model": "unsloth/Qwen3-VL-8B-Instruct-GGUF"}]
+    """
+    if os.path.exists(spec):
+        with open(spec, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    else:
+        entries = [{"preset": name.strip()} for name in spec.split(",") if name.strip()]
+
+    endpoints = []
+    for entry in entries:
+        entry = dict(entry)
+        preset = entry.pop("preset", None)
+        if "api_key_env" in entry:
+            entry["api_key"] = os.getenv(entry.pop("api_key_env"), "")
+        if max_concurrency is not None:
+            entry.setdefault("max_concurrency", max_concurrency)
+        if preset:
+            endpoints.append(get_endpoint(preset, **entry))
+        else:
+            entry.setdefault("api_key", "")
+            endpoints.append(Endpoint(**entry))
+    return EndpointPool(endpoints, retry)
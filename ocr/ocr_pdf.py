@@ -3,89 +3,178 @@
 Full OCR for PDF using Qwen3-VL-8B.
 Outputs text file with same name as PDF.
 Supports resume from last processed page.
+With --concurrency N, keeps N OCR requests in flight and still writes
+pages to the output in page order.
+Pages are rendered ahead in a process pool (fitz is not thread-safe) into a
+bounded queue, so rendering overlaps with the network calls.
+With --hybrid, pages with a usable text layer skip the VLM (see text_layer.py).
+OCR results are cached by page content + model + prompt (see ocr_cache.py).
 """
 
 import argparse
-import base64
-import io
-import json
 import os
+import sys
 import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import replace
 from datetime import datetime, timedelta
 
-import fitz  # PyMuPDF
-from dotenv import load_dotenv
-from openai import OpenAI
-from PIL import Image
+from ocr_cache import DEFAULT_CACHE_PATH, OCRCache, cache_key
+from ocr_client import DEFAULT_PROMPT, DEFAULT_RETRY, EndpointPool, get_endpoint, load_endpoint_pool
+from page_index import page_block, write_index
+from adaptive_dpi import AUTO_DPI, DEFAULT_DPI, choose_dpi
+from image_encoding import DEFAULT_PROFILE, PROFILES, encode_image, get_profile, render_image, render_page
+from page_batch import submit_batch
+from page_filter import DuplicateIndex, fingerprint, is_blank, manifest_path, write_manifest
+from progress_journal import (ProgressJournal, compact_output, migrate_legacy_progress,
+                              truncate_to_journal)
 
-load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiling import Profiler, add_profiling_args, profiler_from_args
 
-# Qwen3 VL 8B on HuggingFace - Load from .env
-CLIENT = OpenAI(
-    base_url=os.getenv('QWEN_BASE_URL', 'https://jd5nnmh2rciko6ts.us-east-1.aws.endpoints.huggingface.cloud/v1/'),
-    api_key=os.getenv('QWEN_API_KEY', os.getenv('HF_API_KEY', ''))
-)
-MODEL = os.getenv('QWEN_MODEL', 'unsloth/Qwen3-VL-8B-Instruct-GGUF')
+# Qwen3 VL 8B on HuggingFace - Load from .env (see ocr_client.get_endpoint)
+ENDPOINT = get_endpoint('qwen')
+MODEL = ENDPOINT.model
 
-OCR_PROMPT = """Trích xuất toàn bộ text từ hình ảnh này. 
-Đây là văn bản pháp luật Việt Nam, có thể chứa bảng.
-Nếu có bảng, hãy format thành markdown table với đầy đủ các cột.
-Giữ nguyên định dạng và thứ tự của văn bản.
-Không thêm giải thích, chỉ trả về nội dung được trích xuất."""
+# fitz / PIL are imported where they are used so that --help and argument
+# errors do not pay ~1s of import time; openai/httpx load in ocr_client on
+# the first request.
+OCR_PROMPT = DEFAULT_PROMPT
+# Decoding parameters; part of the cache key
+OCR_PARAMS = {'max_tokens': 4096}
 
+# Used to estimate what --hybrid saves (~11s/page on an L40S endpoint at $1.8/h)
+VLM_SECONDS_PER_PAGE = 11
+VLM_COST_PER_HOUR = 1.8
 
-def pdf_page_to_image(doc, page_num: int, dpi: int = 150) -> bytes:
-    """Convert a single PDF page to PNG image bytes."""
-    page = doc.load_page(page_num)
-    mat = fitz.Matrix(dpi / 72, dpi / 72)
-    pix = page.get_pixmap(matrix=mat)
-    img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG', optimize=True)
-    return buffer.getvalue()
+# Passes over failed pages at the end of a run (each page already got the
+# RetryPolicy's attempts); pages still failing are left for the next run
+REQUEUE_PASSES = 2
 
+# Encoding for --preprocess pages (already black and white) unless --encoding is given
+PREPROCESS_ENCODING = "bw-png"
 
-def ocr_image(image_bytes: bytes, max_retries: int = 3) -> str:
-    """OCR image using Qwen3-VL-8B with retry logic."""
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+
+def pdf_page_to_image(doc, page_num: int, dpi=DEFAULT_DPI, encoding: str = DEFAULT_PROFILE,
+                      preprocess: bool = False) -> bytes:
+    """
+    Convert a single PDF page to image bytes (PNG unless another encoding
+    profile is given). dpi="auto" picks it from the page's text size;
+    preprocess cleans the scan first (preprocess.clean_page).
+    """
+    if dpi == AUTO_DPI:
+        dpi = choose_dpi(doc.load_page(page_num))
+    if preprocess:
+        from preprocess import clean_page
+        image, _ = clean_page(render_image(doc, page_num, dpi, "RGB"), dpi)
+        return encode_image(image, get_profile(encoding))
+    return render_page(doc, page_num, dpi, encoding)
+
+
+def page_encoding(pool: EndpointPool, encoding: str = None, preprocess: bool = False) -> str:
+    """Encoding profile of the VLM page images: --encoding, else bw-png with --preprocess, else the pool's."""
+    return encoding or (PREPROCESS_ENCODING if preprocess else pool.image_profile)
+
+
+def cache_params(pages_per_request: int = 1) -> dict:
+    """OCR parameters in the cache key; batched results come from a different prompt, so they are cached apart."""
+    return OCR_PARAMS if pages_per_request == 1 else {**OCR_PARAMS, 'pages_per_request': pages_per_request}
+
+
+# Each render worker process opens its own fitz document once.
+_render_doc = None
+_render_pdf_path = None
+_plumber_pdf = None
+
+
+def _init_render_worker(pdf_path: str):
+    global _render_doc, _render_pdf_path
+    import fitz  # PyMuPDF
+    _render_doc = fitz.open(pdf_path)
+    _render_pdf_path = pdf_path
+    try:
+        import cv2
+        cv2.setNumThreads(1)  # parallelism comes from the worker processes
+    except ImportError:
+        pass
+
+
+def _plumber_page(page_num: int):
+    global _plumber_pdf
+    if _plumber_pdf is None:
+        import pdfplumber
+        _plumber_pdf = pdfplumber.open(_render_pdf_path)
+    return _plumber_pdf.pages[page_num]
+
+
+def _render_page(page_num: int, dpi=DEFAULT_DPI, hybrid: bool = False, encoding: str = DEFAULT_PROFILE,
+                 preprocess: bool = False, prefilter: bool = False) -> tuple:
+    """
+    Prepare one page in a worker process.
     
-    for attempt in range(max_retries):
+    Returns (page_num, route, payload, seconds, info): route is "vlm" with image
+    bytes, "blank" (prefilter) with empty text, or, in hybrid mode, "text" /
+    "table" with the extracted text; info holds the DPI a "vlm" page was
+    rendered at, its prefilter fingerprint, with preprocess the cleanup's
+    time and pixel counts, and always "stages": seconds per step (text_layer,
+    prefilter, dpi, render, preprocess, encode) for the parent's profiler.
+    """
+    start = time.time()
+    stages = {}
+    
+    def timed(name, func, *args):
+        t = time.perf_counter()
         try:
-            response = CLIENT.chat.completions.create(
-                model=MODEL,
-                messages=[{
-                    'role': 'user',
-                    'content': [
-                        {'type': 'image_url', 'image_url': {'url': f'data:image/png;base64,{base64_image}'}},
-                        {'type': 'text', 'text': OCR_PROMPT}
-                    ]
-                }],
-                max_tokens=4096,
-                timeout=120
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            if attempt < max_retries - 1:
-                print(f"    ⚠️ Retry {attempt + 1}/{max_retries}: {e}")
-                time.sleep(5)
-            else:
-                print(f"    ❌ Failed after {max_retries} attempts: {e}")
-                return f"[OCR ERROR: {e}]"
-    return ""
-
-
-def load_progress(progress_file: str) -> dict:
-    """Load progress from file."""
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r') as f:
-            return json.load(f)
-    return {"last_page": -1, "pages_done": []}
-
-
-def save_progress(progress_file: str, progress: dict):
-    """Save progress to file."""
-    with open(progress_file, 'w') as f:
-        json.dump(progress, f)
+            return func(*args)
+        finally:
+            stages[name] = stages.get(name, 0.0) + time.perf_counter() - t
+    
+    if hybrid:
+        from text_layer import page_markdown_with_tables, score_page
+        score, text = timed("text_layer", score_page, _render_doc.load_page(page_num))
+        if score.usable:
+            if score.has_tables:
+                text = timed("text_layer", page_markdown_with_tables, _plumber_page(page_num))
+                return page_num, "table", text, time.time() - start, {"stages": stages}
+            return page_num, "text", text.strip(), time.time() - start, {"stages": stages}
+    info = {"stages": stages}
+    if prefilter:
+        ink, bits, grid = timed("prefilter", fingerprint, _render_doc.load_page(page_num))
+        if is_blank(ink):
+            return page_num, "blank", "", time.time() - start, {"ink": ink, "stages": stages}
+        info["fingerprint"] = (ink, bits, grid)
+    if dpi == AUTO_DPI:
+        dpi = timed("dpi", choose_dpi, _render_doc.load_page(page_num))
+    info["dpi"] = dpi
+    if preprocess:
+        from preprocess import clean_page
+        image = timed("render", render_image, _render_doc, page_num, dpi, "RGB")
+        image, stats = timed("preprocess", clean_page, image, dpi)
+        info.update(prep_seconds=stages["preprocess"],
+                    pixels_in=stats["pixels_in"], pixels_out=stats["pixels_out"])
+        image = timed("encode", encode_image, image, get_profile(encoding))
+    else:
+        # Rasterizing and encoding happen in one call (render_page)
+        image = timed("render", pdf_page_to_image, _render_doc, page_num, dpi, encoding)
+    info["bytes"] = len(image)
+    return page_num, "vlm", image, time.time() - start, info
+
+
+def default_render_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def write_page(f, page_num: int, text: str) -> tuple:
+    """
+    Append one page to the (binary) output with the `# PAGE n` framing.
+    Returns (offset, length) of the block in bytes, for the progress journal.
+    """
+    offset = f.tell()
+    block = page_block(page_num, text)
+    f.write(block)
+    f.flush()
+    return offset, len(block)
 
 
 def format_time(seconds: float) -> str:
@@ -98,7 +187,13 @@ def format_time(seconds: float) -> str:
         return f"{seconds/3600:.1f}h"
 
 
-def ocr_pdf(pdf_path: str, output_path: str = None, start_page: int = 0, end_page: int = None):
+def ocr_pdf(pdf_path: str, output_path: str = None, start_page: int = 0, end_page: int = None,
+            profiler: Profiler = None, concurrency: int = 1, prompt: str = OCR_PROMPT,
+            render_workers: int = None, render_ahead: int = None, hybrid: bool = False,
+            vlm_cost_per_hour: float = VLM_COST_PER_HOUR, cache: OCRCache = None,
+            pool: EndpointPool = None, requeue_passes: int = REQUEUE_PASSES, stream: bool = False,
+            pages_per_request: int = 1, encoding: str = None, dpi=DEFAULT_DPI, preprocess: bool = False,
+            prefilter: bool = False, priority: int = 0, on_page=None):
     """
     OCR entire PDF and save to text file.
     
@@ -107,7 +202,30 @@ def ocr_pdf(pdf_path: str, output_path: str = None, start_page: int = 0, end_pag
         output_path: Output text file path (default: same as PDF with .txt extension)
         start_page: Start page (0-indexed, default: 0)
         end_page: End page (exclusive, default: all pages)
+        profiler: Per-stage profiler (wait / write here; render, encode, preprocess... times
+            are measured in the render workers and added with profiler.add)
+        concurrency: Number of OCR requests kept in flight (default: 1)
+        prompt: OCR prompt sent with every page
+        render_workers: Render processes (default: min(4, cpu_count - 1))
+        render_ahead: Max pages rendering or rendered but not yet sent (default: 2 x concurrency, min 4)
+        hybrid: Use the PDF text layer (PyMuPDF / pdfplumber tables) for pages where it is usable
+        vlm_cost_per_hour: Endpoint cost, for the hybrid savings estimate
+        cache: OCR result cache; hits skip the API (default: no cache)
+        pool: Endpoints to spread pages over (default: the Qwen endpoint with `concurrency` connections)
+        requeue_passes: Extra passes over pages whose OCR failed after all retries
+        stream: Stream responses and abort requests that fall into a repetition loop
+        pages_per_request: VLM pages packed into one request (page_batch; default: 1)
+        encoding: Image encoding profile (image_encoding.PROFILES; default: the endpoints' image_profile)
+        dpi: Render resolution, or "auto" for the smallest legible one per page (adaptive_dpi)
+        preprocess: Clean VLM pages with OpenCV first (preprocess.py: stamps, deskew,
+            binarize, specks, margins); encoding then defaults to PREPROCESS_ENCODING
+        prefilter: Skip blank pages and reuse the text of near-identical earlier
+            pages (page_filter.py); they are listed in <output>.prefilter.json
+        priority: Request priority in a shared pool (lower goes first; ocr_batch.py)
+        on_page: Called as on_page(page_num, seconds) after each page is written
     """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
     if not os.path.exists(pdf_path):
         print(f"❌ PDF not found: {pdf_path}")
         return
@@ -116,108 +234,434 @@ def ocr_pdf(pdf_path: str, output_path: str = None, start_page: int = 0, end_pag
     if output_path is None:
         output_path = os.path.splitext(pdf_path)[0] + ".txt"
     
-    progress_file = output_path + ".progress.json"
+    journal_file = output_path + ".progress.jsonl"
+    if profiler is None:
+        profiler = Profiler(os.path.splitext(output_path)[0])
+    
+    # One pooled client per endpoint; with a single endpoint its connection
+    # limit follows --concurrency
+    if pool is None:
+        pool = EndpointPool([replace(ENDPOINT, max_concurrency=concurrency)])
+    model = ", ".join(pool.models)
+    encoding = page_encoding(pool, encoding, preprocess)
+    mime = get_profile(encoding).mime
     
     print(f"📄 PDF: {pdf_path}")
     print(f"📝 Output: {output_path}")
-    print(f"🤖 Model: {MODEL}")
+    print(f"🤖 Model: {model}")
+    if len(pool.members) > 1:
+        print(f"🌐 Endpoints: {', '.join(m.name for m in pool.members)}")
+    if concurrency > 1:
+        print(f"🔀 Concurrency: {concurrency}")
+    if dpi != DEFAULT_DPI:
+        print(f"📐 DPI: {dpi}")
+    if encoding != DEFAULT_PROFILE:
+        print(f"🖼️  Encoding: {encoding}")
+    if pages_per_request > 1:
+        print(f"📚 Pages per request: {pages_per_request}")
+    if prefilter:
+        print("⏭️  Prefilter: blank pages skipped, duplicate pages reuse earlier OCR")
+    if preprocess:
+        print("🧽 Preprocess: stamps, deskew, binarize, specks, margins (OpenCV)")
+    if hybrid:
+        print("🧬 Hybrid: text layer for born-digital pages, VLM for the rest")
     print("=" * 60)
     
+    if render_workers is None:
+        render_workers = default_render_workers()
+    if render_ahead is None:
+        render_ahead = max(4, 2 * concurrency)
+    
     # Open PDF
+    import fitz  # PyMuPDF
     doc = fitz.open(pdf_path)
     total_pages = len(doc)
     
     if end_page is None:
         end_page = total_pages
     
-    # Load progress
-    progress = load_progress(progress_file)
-    resume_page = max(progress["last_page"] + 1, start_page)
+    # Load progress: exactly the pages missing from the journal are processed
+    journal = ProgressJournal(journal_file)
+    legacy_file = output_path + ".progress.json"
+    if os.path.exists(legacy_file) and not journal.pages:
+        migrate_legacy_progress(legacy_file, output_path, journal)
+    if journal.pages and os.path.exists(output_path):
+        truncate_to_journal(output_path, journal)
+    else:
+        # Output gone (or nothing journaled): start over, and drop the stale
+        # lines too, or the next run would take their pages as done
+        journal.pages = {}
+        journal.remove()
     
-    if resume_page > start_page:
-        print(f"📌 Resuming from page {resume_page + 1}")
+    todo = [p for p in range(start_page, end_page) if p not in journal.pages]
+    if len(todo) < end_page - start_page:
+        print(f"📌 Resuming: {end_page - start_page - len(todo)} pages already done")
     
-    # Open output file in append mode
-    mode = 'a' if resume_page > start_page else 'w'
+    # Append to the existing output when resuming
+    mode = 'ab' if journal.pages else 'wb'
     
-    pages_to_process = end_page - resume_page
+    pages_to_process = len(todo)
     times = []
+    vlm_times = []
+    routes = Counter()
+    failed = []
+    loops = Counter()          # repetition loops aborted / tokens saved (--stream)
+    splits = Counter()         # pages re-OCR'd as bands after hitting max_tokens
+    usage = Counter()          # requests and tokens of VLM pages
+    dpis = Counter()           # VLM pages per render DPI
+    images = Counter()         # image bytes / preprocessing time and pixels of VLM pages
+    duplicates = DuplicateIndex()  # fingerprints of the VLM pages (--prefilter)
+    blank = {}                 # page_num -> ink coverage of pages skipped as blank
+    reused = {}                # page_num -> (source page_num, hash distance)
+    known = {}                 # fingerprinted page_num -> its text once written (None until then)
+    key_params = cache_params(pages_per_request)
     
-    print(f"📊 Processing pages {resume_page + 1} to {end_page} ({pages_to_process} pages)")
+    if todo:
+        print(f"📊 Processing pages {todo[0] + 1} to {todo[-1] + 1} ({pages_to_process} pages)")
     print("=" * 60)
     
     start_time = time.time()
     
-    with open(output_path, mode, encoding='utf-8') as f:
-        if mode == 'w':
-            f.write(f"# OCR Output: {os.path.basename(pdf_path)}\n")
-            f.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"# Model: {MODEL}\n")
-            f.write("=" * 60 + "\n\n")
+    with open(output_path, mode) as f:
+        if mode == 'wb':
+            f.write((f"# OCR Output: {os.path.basename(pdf_path)}\n"
+                     f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                     f"# Model: {model}\n"
+                     + "=" * 60 + "\n\n").encode('utf-8'))
         
-        for page_num in range(resume_page, end_page):
-            page_start = time.time()
-            
-            # Convert page to image
-            image_bytes = pdf_page_to_image(doc, page_num)
-            
-            # OCR
-            text = ocr_image(image_bytes)
-            
-            # Write to file
-            f.write(f"\n{'='*60}\n")
-            f.write(f"# PAGE {page_num + 1}\n")
-            f.write(f"{'='*60}\n\n")
-            f.write(text)
-            f.write("\n")
-            f.flush()
+        # Pages whose OCR failed after all retries are not written; they are
+        # re-attempted in requeue passes and appended (compaction restores order)
+        for attempt in range(requeue_passes + 1):
+            if attempt:
+                if not failed:
+                    break
+                todo, failed = failed, []
+                print(f"🔁 Requeue pass {attempt}/{requeue_passes}: {len(todo)} failed pages")
             
-            # Track time
-            page_time = time.time() - page_start
-            times.append(page_time)
+            next_render = 0        # index in todo of the next page to hand to the render pool
+            next_write = 0         # index in todo of the page the ordered writer is waiting for
+            rendering = deque()    # render futures in page order (the bounded queue)
+            batch = []             # (page_num, image, cache keys) waiting to fill a request
+            in_flight = {}         # OCR future -> ([page_num, ...], submit time, [cache keys per model, ...])
+            completed = {}         # page_num -> (text or None if failed, latency), may arrive out of order
+            waiting = {}           # source page_num -> duplicate pages waiting for its text
             
-            # Update progress
-            progress["last_page"] = page_num
-            progress["pages_done"].append(page_num)
-            save_progress(progress_file, progress)
+            # Memory is bounded by render_ahead images in the queue plus at most
+            # 2 x concurrency requests' pages in flight / batched / waiting for
+            # the ordered writer.
+            def can_submit():
+                pages = sum(len(v[0]) for v in in_flight.values()) + len(batch) + len(completed)
+                return len(in_flight) < concurrency and pages < 2 * concurrency * pages_per_request
             
-            # Calculate ETA
-            avg_time = sum(times) / len(times)
-            remaining_pages = end_page - page_num - 1
-            eta_seconds = avg_time * remaining_pages
+            def flush_batch():
+                future = submit_batch(pool, [image for _, image, _ in batch], prompt, mime=mime,
+                                      stream=stream, priority=priority, **OCR_PARAMS)
+                in_flight[future] = ([p for p, _, _ in batch], time.time(), [k for _, _, k in batch])
+                batch.clear()
+                usage['requests'] += 1
             
-            # Print progress
-            elapsed = time.time() - start_time
-            print(f"✅ Page {page_num + 1}/{end_page} | "
-                  f"Time: {page_time:.1f}s | "
-                  f"Avg: {avg_time:.1f}s | "
-                  f"Elapsed: {format_time(elapsed)} | "
-                  f"ETA: {format_time(eta_seconds)}")
+            with ProcessPoolExecutor(max_workers=render_workers, initializer=_init_render_worker,
+                                     initargs=(pdf_path,)) as render_pool:
+                while next_write < len(todo):
+                    # Hand rendered pages to OCR in page order. Buffered completions
+                    # are capped so a slow page cannot make the buffer grow without bound.
+                    while rendering and rendering[0].done() and can_submit():
+                        page_num, route, payload, seconds, info = rendering.popleft().result()
+                        for stage, stage_seconds in info.pop("stages", {}).items():
+                            profiler.add(stage, stage_seconds)
+                        if "dpi" in info and not attempt:
+                            dpis[info["dpi"]] += 1
+                            images.update({k: v for k, v in info.items() if k not in ("dpi", "fingerprint")})
+                            images['pages'] += 1
+                        if route == "blank":
+                            blank[page_num] = info["ink"]
+                        if "fingerprint" in info:
+                            match = duplicates.match(*info["fingerprint"], before=page_num)
+                            if match:
+                                route, source = "reused", match[0]
+                                reused[page_num] = match
+                                if known.get(source) is not None or source in failed:
+                                    completed[page_num] = (known[source], seconds)  # None: failed
+                                else:
+                                    waiting.setdefault(source, []).append(page_num)
+                            elif page_num not in known:
+                                duplicates.add(page_num, *info["fingerprint"])
+                                known[page_num] = None
+                        if route == "vlm":
+                            keys = {m: cache_key(payload, m, prompt, key_params) for m in pool.models} if cache else {}
+                            cached = cache.get(*keys.values()) if cache else None
+                            if cached is not None:
+                                route, payload = "cache", cached
+                            else:
+                                batch.append((page_num, payload, keys))
+                                if len(batch) >= pages_per_request:
+                                    flush_batch()
+                        if not attempt:
+                            routes[route] += 1
+                        if route not in ("vlm", "reused"):
+                            completed[page_num] = (payload, seconds)
+                    
+                    # Keep the renderer ahead of the OCR stage
+                    while next_render < len(todo) and len(rendering) < render_ahead:
+                        rendering.append(render_pool.submit(_render_page, todo[next_render], dpi,
+                                                            hybrid=hybrid, encoding=encoding,
+                                                            preprocess=preprocess, prefilter=prefilter))
+                        next_render += 1
+                    
+                    # Send a partial batch when no more pages can join it soon
+                    if batch and not in_flight and not (rendering and can_submit()):
+                        flush_batch()
+                    
+                    # Wait for an OCR result, or for the next render if OCR has room
+                    waitables = set(in_flight)
+                    if rendering and can_submit():
+                        waitables.add(rendering[0])
+                    with profiler.stage("wait"):
+                        done, _ = wait(waitables, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future not in in_flight:
+                            continue  # render finished; submitted on the next pass
+                        page_nums, submitted, page_keys = in_flight.pop(future)
+                        try:
+                            results = future.result()
+                        except Exception as e:
+                            print(f"❌ Page{'s' if len(page_nums) > 1 else ''} "
+                                  f"{', '.join(str(p + 1) for p in page_nums)} failed: {e}")
+                            results = [None] * len(page_nums)
+                        for page_num, keys, result in zip(page_nums, page_keys, results):
+                            text = result.text if result else None
+                            if result:
+                                usage['pages'] += 1
+                                usage['prompt_tokens'] += result.prompt_tokens
+                                usage['completion_tokens'] += result.completion_tokens
+                                loops['aborted'] += result.loops_aborted
+                                loops['tokens_saved'] += result.tokens_saved
+                                loops['unresolved'] += result.finish_reason == "repetition"
+                                splits['split'] += result.bands > 1
+                                if result.finish_reason == "length":
+                                    splits['truncated'] += 1
+                                    print(f"⚠️ Page {page_num + 1} still hits max_tokens after splitting")
+                                if cache and result.finish_reason in (None, "stop"):
+                                    cache.put(keys[result.model], text, result.model)
+                            completed[page_num] = (text, time.time() - submitted)
+                            vlm_times.append(completed[page_num][1])
+                    
+                    # Write every page that is now contiguous with the output
+                    while next_write < len(todo) and todo[next_write] in completed:
+                        page_num = todo[next_write]
+                        text, page_time = completed.pop(page_num)
+                        next_write += 1
+                        # Duplicates of this page share its text (or its failure)
+                        for duplicate in waiting.pop(page_num, []):
+                            completed[duplicate] = (text, 0.0)
+                        if page_num in known and text is not None:
+                            known[page_num] = text
+                        if text is None:
+                            failed.append(page_num)
+                            continue
+                        with profiler.stage("write"):
+                            offset, length = write_page(f, page_num, text)
+                        
+                        # Track time
+                        times.append(page_time)
+                        
+                        # Update progress (one appended journal line per page)
+                        journal.record(page_num, offset, length)
+                        if on_page:
+                            on_page(page_num, page_time)
+                        
+                        # Calculate ETA from throughput (pages overlap when concurrent)
+                        elapsed = time.time() - start_time
+                        avg_time = sum(times) / len(times)
+                        remaining_pages = len(todo) - next_write
+                        eta_seconds = elapsed / len(times) * remaining_pages
+                        
+                        # Print progress
+                        print(f"✅ Page {page_num + 1}/{end_page} | "
+                              f"Time: {page_time:.1f}s | "
+                              f"Avg: {avg_time:.1f}s | "
+                              f"Elapsed: {format_time(elapsed)} | "
+                              f"ETA: {format_time(eta_seconds)}")
     
     doc.close()
     
-    # Cleanup progress file on completion
-    if resume_page == start_page and progress["last_page"] == end_page - 1:
-        os.remove(progress_file)
+    # Once the whole document is done: put pages in order and drop the journal
+    if compact_output(output_path, journal):
+        print("🔃 Reordered output pages")
+    write_index(output_path, journal.pages)
+    if len(journal.pages) >= total_pages and all(p in journal.pages for p in range(total_pages)):
+        journal.remove()
+    else:
+        journal.close()
+    
+    if prefilter:
+        # Failed pages are retried on the next run, not skipped
+        blank = {p: ink for p, ink in blank.items() if p in journal.pages}
+        reused = {p: match for p, match in reused.items() if p in journal.pages}
+        write_manifest(output_path, blank, reused)
     
     total_time = time.time() - start_time
     print("\n" + "=" * 60)
     print(f"✅ OCR Complete!")
     print(f"📊 Pages processed: {len(times)}")
     print(f"⏱️  Total time: {format_time(total_time)}")
+    if times:
+        print(f"🚀 Throughput: {len(times) / total_time * 3600:.0f} pages/hour")
+    if len(pool.members) > 1:
+        print("🌐 Per endpoint:")
+        pool.report(total_time)
+    if cache:
+        print(f"📦 Cache: {cache.hits} hits / {cache.misses} misses (hit rate {cache.hit_rate:.0%})")
+    if usage['requests']:
+        vlm_pages = max(usage['pages'], 1)
+        print(f"🔢 VLM: {usage['requests']} requests for {usage['pages']} pages | tokens/page: "
+              f"prompt {usage['prompt_tokens'] / vlm_pages:.0f}, "
+              f"completion {usage['completion_tokens'] / vlm_pages:.0f}")
+    if dpi == AUTO_DPI and dpis:
+        print(f"📐 Adaptive DPI: {', '.join(f'{d} x{n}' for d, n in sorted(dpis.items()))}")
+    if prefilter:
+        skipped = len(blank) + len(reused)
+        vlm_page_time = sum(vlm_times) / len(vlm_times) if vlm_times else VLM_SECONDS_PER_PAGE
+        print(f"⏭️  Prefilter: {len(blank)} blank, {len(reused)} duplicate pages skipped OCR"
+              + (f" (~{format_time(skipped * vlm_page_time / concurrency)} of VLM time saved); "
+                 f"see {manifest_path(output_path)}" if skipped else ""))
+    if preprocess and images['pages']:
+        n = images['pages']
+        print(f"🧽 Preprocess: {n} pages | {images['prep_seconds'] / n * 1000:.0f} ms/page | "
+              f"pixels -{1 - images['pixels_out'] / images['pixels_in']:.0%} | "
+              f"payload {images['bytes'] * 4 / 3 / n / 1024:.0f} KB/page "
+              f"(compare with the raw page: python ocr/preprocess.py)")
+    if splits['split'] or splits['truncated']:
+        print(f"✂️  Split into bands (max_tokens): {splits['split']} pages"
+              + (f", {splits['truncated']} still truncated" if splits['truncated'] else ""))
+    if stream:
+        print(f"✂️  Repetition loops: {loops['aborted']} aborted, ~{loops['tokens_saved']:,} tokens saved"
+              + (f", {loops['unresolved']} pages truncated at the loop" if loops['unresolved'] else ""))
+    if hybrid:
+        print(f"🧬 Routing: {routes['text']} text layer | {routes['table']} pdfplumber tables | "
+              f"{routes['cache']} cached | {routes['vlm']} VLM")
+        skipped = routes['text'] + routes['table']
+        if skipped:
+            vlm_page_time = sum(vlm_times) / len(vlm_times) if vlm_times else VLM_SECONDS_PER_PAGE
+            saved_seconds = skipped * vlm_page_time / concurrency
+            print(f"💰 Saved ~{format_time(saved_seconds)} of VLM time "
+                  f"(~${saved_seconds / 3600 * vlm_cost_per_hour:.2f} at ${vlm_cost_per_hour}/h)")
+    if failed:
+        print(f"❌ {len(failed)} pages failed after {requeue_passes} requeue passes: "
+              f"{[p + 1 for p in sorted(failed)]} — rerun to retry them")
     print(f"📝 Output saved to: {output_path}")
+    profiler.close()
 
 
-def main():
-    parser = argparse.ArgumentParser(description="OCR PDF using Qwen3-VL-8B")
+def dpi_arg(value: str):
+    """argparse type for --dpi: an integer or "auto"."""
+    if value == AUTO_DPI:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer or '{AUTO_DPI}', got {value!r}")
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1 (-j, --render-workers, -k)."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer, got {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_arg_parser(description: str = "OCR PDF using Qwen3-VL-8B") -> argparse.ArgumentParser:
+    """CLI shared by ocr_pdf.py and ocr_pdf_2.py."""
+    parser = argparse.ArgumentParser(description=description)
     parser.add_argument("pdf_path", help="Path to PDF file")
     parser.add_argument("-o", "--output", help="Output text file path")
     parser.add_argument("-s", "--start", type=int, default=0, help="Start page (0-indexed)")
     parser.add_argument("-e", "--end", type=int, help="End page (exclusive)")
+    add_ocr_args(parser)
+    add_profiling_args(parser)
+    return parser
+
+
+def add_ocr_args(parser: argparse.ArgumentParser, default_concurrency: int = 1):
+    """Endpoint / render / OCR options shared with ocr_batch.py."""
+    parser.add_argument("-j", "--concurrency", type=positive_int,
+                        help=f"OCR requests kept in flight (default: {default_concurrency}, "
+                             f"or the pool's total capacity)")
+    parser.add_argument("--endpoints", metavar="SPEC",
+                        help="Endpoint pool: preset names (qwen,qwen3_30b,...) or a JSON config file")
+    parser.add_argument("--render-workers", type=positive_int,
+                        help=f"Render processes (default: {default_render_workers()})")
+    parser.add_argument("--render-ahead", type=positive_int,
+                        help="Rendered pages queued ahead of OCR (default: max(4, 2 x concurrency))")
+    parser.add_argument("--hybrid", action="store_true",
+                        help="Use the PDF text layer for born-digital pages, VLM only for scanned/garbled ones")
+    parser.add_argument("--vlm-cost-per-hour", type=float, default=VLM_COST_PER_HOUR,
+                        help=f"Endpoint cost for the --hybrid savings estimate (default: {VLM_COST_PER_HOUR})")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_RETRY.max_attempts,
+                        help=f"Attempts per page, with exponential backoff (default: {DEFAULT_RETRY.max_attempts})")
+    parser.add_argument("--requeue-passes", type=int, default=REQUEUE_PASSES,
+                        help=f"Re-attempt failed pages this many times at the end (default: {REQUEUE_PASSES})")
+    parser.add_argument("-k", "--pages-per-request", type=positive_int, default=1,
+                        help="Pack K page images into one request (default: 1); falls back to single pages")
+    parser.add_argument("--dpi", type=dpi_arg, default=DEFAULT_DPI,
+                        help=f"Render DPI, or 'auto' to pick per page from the text size (default: {DEFAULT_DPI})")
+    parser.add_argument("--encoding", choices=list(PROFILES),
+                        help="Page image encoding (default: the endpoints' image_profile, png); "
+                             "compare with ocr/image_encoding.py")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="Skip blank pages and reuse the OCR of near-identical earlier pages "
+                             "(listed in <output>.prefilter.json); preview with ocr/page_filter.py")
+    parser.add_argument("--preprocess", action="store_true",
+                        help=f"Clean scanned pages with OpenCV (stamps, deskew, binarize, margins) before OCR; "
+                             f"encoding defaults to {PREPROCESS_ENCODING}")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream responses; abort and retry requests stuck in a repetition loop")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help=f"OCR result cache (default: {DEFAULT_CACHE_PATH}, env OCR_CACHE_PATH)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API")
+
+
+def pool_from_args(args, default_concurrency: int = 1) -> tuple:
+    """(EndpointPool, concurrency) for the add_ocr_args options."""
+    retry = replace(DEFAULT_RETRY, max_attempts=args.max_retries)
+    if args.endpoints:
+        pool = load_endpoint_pool(args.endpoints, retry=retry)
+        return pool, args.concurrency or pool.capacity
+    concurrency = args.concurrency or default_concurrency
+    return EndpointPool([replace(ENDPOINT, max_concurrency=concurrency)], retry), concurrency
+
+
+def ocr_kwargs_from_args(args) -> dict:
+    """ocr_pdf() keyword arguments for the add_ocr_args options."""
+    return dict(render_workers=args.render_workers, render_ahead=args.render_ahead,
+                hybrid=args.hybrid, vlm_cost_per_hour=args.vlm_cost_per_hour,
+                requeue_passes=args.requeue_passes, stream=args.stream,
+                pages_per_request=args.pages_per_request, encoding=args.encoding, dpi=args.dpi,
+                preprocess=args.preprocess, prefilter=args.prefilter)
+
+
+def run_from_args(args, prompt: str = OCR_PROMPT):
+    output_path = args.output or os.path.splitext(args.pdf_path)[0] + ".txt"
+    profiler = profiler_from_args(args, os.path.splitext(output_path)[0])
     
-    args = parser.parse_args()
+    cache = None if args.no_cache else OCRCache(args.cache)
+    pool, concurrency = pool_from_args(args)
     
-    ocr_pdf(args.pdf_path, args.output, args.start, args.end)
+    try:
+        ocr_pdf(args.pdf_path, output_path, args.start, args.end, profiler, concurrency,
+                prompt=prompt, cache=cache, pool=pool, **ocr_kwargs_from_args(args))
+    finally:
+        if cache:
+            cache.evict()
+            cache.close()
+
+
+def main():
+    run_from_args(build_arg_parser().parse_args())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Multi-page OCR requests: K page images in one chat request.
+
+The instruction prompt (the long legal-document prompt of ocr_pdf_2.py is
+~600 tokens) is then sent once per K pages instead of once per page. The
+model is asked to start each page with a delimiter line:
+
+    <<<PAGE 1>>>
+    ...text of the first image...
+    <<<PAGE 2>>>
+    ...
+
+`parse_batch` accepts the response only if it has exactly the delimiters
+1..K, in order, each followed by some text; otherwise (or when the response
+hits max_tokens) every page of the batch is OCR'd on its own.
+
+Usage (measure against one page per request):
+    python ocr/page_batch.py ocr/data/file.pdf -k 3 -n 12
+    python ocr/page_batch.py ocr/data/file.pdf -k 3 -n 12 --prompt ocr_pdf
+"""
+
+import argparse
+import asyncio
+import re
+import time
+from dataclasses import replace
+
+from ocr_client import DEFAULT_PROMPT, get_loop
+from page_split import aocr_split
+
+DELIMITER_RE = re.compile(r"^[ \t]*<<<PAGE (\d+)>>>[ \t]*$", re.MULTILINE)
+
+BATCH_INSTRUCTIONS = """
+
+Có {k} hình ảnh, mỗi hình là một trang, theo đúng thứ tự.
+Xử lý từng trang theo yêu cầu trên. Trước nội dung của mỗi trang, ghi đúng một dòng
+<<<PAGE i>>> (i là số thứ tự hình, từ 1 đến {k}), kể cả khi trang trống.
+Không gộp nội dung của các trang với nhau."""
+
+
+def batch_prompt(prompt: str, k: int) -> str:
+    """The single-page prompt plus the delimiter contract for k images."""
+    return prompt.rstrip() + BATCH_INSTRUCTIONS.format(k=k)
+
+
+def parse_batch(text: str, k: int):
+    """Per-page texts from a batched response, or None if it breaks the contract."""
+    matches = list(DELIMITER_RE.finditer(text))
+    if [int(m.group(1)) for m in matches] != list(range(1, k + 1)):
+        return None
+    if text[:matches[0].start()].strip():
+        return None  # text before the first delimiter belongs to no page
+    pages = []
+    for m, following in zip(matches, matches[1:] + [None]):
+        pages.append(text[m.end():following.start() if following else len(text)].strip("\n"))
+    if sum(1 for page in pages if page.strip()) < k - 1:
+        return None  # at most one (genuinely blank) page may come back empty
+    return pages
+
+
+async def aocr_batch(ocr, images: list, prompt: str = DEFAULT_PROMPT, max_tokens: int = 4096,
+                     **kwargs) -> list:
+    """
+    OCR `images` (consecutive pages) in one request through `ocr` (an
+    OCRClient or EndpointPool). Returns one OCRResult per image; the request's
+    tokens and latency are shared out evenly. Falls back to one request per
+    page (with band splitting) if the response cannot be parsed.
+    """
+    k = len(images)
+    if k == 1:
+        return [await aocr_split(ocr, images[0], prompt, max_tokens=max_tokens, **kwargs)]
+
+    result = await ocr.aocr(images, batch_prompt(prompt, k), max_tokens=max_tokens * k, **kwargs)
+    pages = parse_batch(result.text, k) if result.finish_reason in (None, "stop") else None
+    if pages is None:
+        reason = "hit max_tokens" if result.finish_reason == "length" else "unparseable"
+        print(f"    ↩️  {k}-page response {reason}, falling back to single pages")
+        singles = await asyncio.gather(*(aocr_split(ocr, image, prompt, max_tokens=max_tokens, **kwargs)
+                                         for image in images))
+        # The failed batch request is charged to the first page
+        first = singles[0]
+        singles[0] = replace(first, prompt_tokens=first.prompt_tokens + result.prompt_tokens,
+                             completion_tokens=first.completion_tokens + result.completion_tokens,
+                             latency=first.latency + result.latency)
+        return list(singles)
+    return [replace(result, text=text,
+                    prompt_tokens=result.prompt_tokens // k,
+                    completion_tokens=result.completion_tokens // k,
+                    latency=result.latency / k)
+            for text in pages]
+
+
+def submit_batch(ocr, images: list, prompt: str = DEFAULT_PROMPT, **kwargs):
+    """Schedule aocr_batch() on the shared loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(aocr_batch(ocr, images, prompt, **kwargs), get_loop())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare K pages per request with one page per request")
+    parser.add_argument("pdf_path", help="Path to PDF file")
+    parser.add_argument("-k", "--pages-per-request", type=int, default=3, help="Pages per request (default: 3)")
+    parser.add_argument("-n", "--pages", type=int, default=12, help="Pages to OCR from the start (default: 12)")
+    parser.add_argument("-j", "--concurrency", type=int, default=4, help="Requests in flight (default: 4)")
+    parser.add_argument("--prompt", choices=["ocr_pdf", "ocr_pdf_2"], default="ocr_pdf_2",
+                        help="Which script's prompt to send (default: ocr_pdf_2, the long one)")
+    args = parser.parse_args()
+
+    import fitz  # PyMuPDF
+    import ocr_pdf
+    from ocr_client import EndpointPool
+
+    if args.prompt == "ocr_pdf_2":
+        from ocr_pdf_2 import OCR_PROMPT as prompt
+    else:
+        prompt = ocr_pdf.OCR_PROMPT
+
+    doc = fitz.open(args.pdf_path)
+    n = min(args.pages, len(doc))
+    images = [ocr_pdf.pdf_page_to_image(doc, p) for p in range(n)]
+    doc.close()
+    pool = EndpointPool([replace(ocr_pdf.ENDPOINT, max_concurrency=args.concurrency)])
+
+    print(f"📄 {args.pdf_path}: {n} pages, prompt from {args.prompt}, -j {args.concurrency}")
+    print("=" * 60)
+    rows = []
+    for k in (1, args.pages_per_request):
+        start = time.time()
+        futures = [submit_batch(pool, images[i:i + k], prompt, **ocr_pdf.OCR_PARAMS)
+                   for i in range(0, n, k)]
+        results = [r for future in futures for r in future.result()]
+        elapsed = time.time() - start
+        prompt_tokens = sum(r.prompt_tokens for r in results)
+        completion_tokens = sum(r.completion_tokens for r in results)
+        rows.append((k, elapsed, prompt_tokens, completion_tokens))
+        print(f"K={k}: {n / elapsed * 3600:.0f} pages/hour | "
+              f"prompt tokens/page {prompt_tokens / n:.0f} | "
+              f"completion tokens/page {completion_tokens / n:.0f} | {elapsed:.1f}s")
+
+    (_, t1, p1, c1), (k, tk, pk, ck) = rows
+    if p1 + c1:
+        print("=" * 60)
+        print(f"📊 K={k} vs K=1: throughput x{t1 / tk:.2f}, "
+              f"prompt tokens {1 - pk / p1:.0%} saved, total tokens {1 - (pk + ck) / (p1 + c1):.0%} saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Blank / duplicate page prefilter (ocr_pdf.py --prefilter).
+
+Long decisions carry blank separator pages and the same form page scanned
+again and again; each still costs a full VLM call. Before a page is rendered
+for OCR, a small grayscale raster (FILTER_DPI) gives:
+  - ink coverage: share of pixels much darker than the paper (the median
+    level, so grey scan backgrounds do not count). Below BLANK_INK the page
+    is blank and is written empty without an OCR call.
+  - a difference hash: HASH_SIZE x HASH_SIZE bits, each "is this cell
+    brighter than its right neighbour" on a box-downsampled page. A page
+    within MAX_DISTANCE bits (and MAX_INK_DELTA relative ink) of an earlier
+    page of the run is a candidate duplicate.
+  - an ink grid (ink share per GRID_CELL square) to confirm it: a copy of a
+    form filled in differently hashes the same, so the candidate is reused
+    only if no cell's ink changed by more than MAX_CELL_INK. Exact and
+    recompressed copies pass; a re-scan shifted by a few pixels usually does
+    not and is OCR'd (a wasted call is cheaper than wrong text).
+
+Skipped and reused pages are listed in <output>.prefilter.json.
+
+Usage:
+    python ocr/page_filter.py ocr/data/file.pdf      # ink, blank / duplicate-of per page
+    python ocr/ocr_pdf.py ocr/data/file.pdf --prefilter
+"""
+
+import argparse
+import json
+import os
+
+FILTER_DPI = 72
+HASH_SIZE = 32                 # 1024-bit hash
+MAX_DISTANCE = 16              # differing hash bits for pages to count as the same (~1.5%)
+MAX_INK_DELTA = 0.05           # and at most this relative difference in ink coverage
+BLANK_INK = 0.0015             # ink share below which a page is blank (scanner specks stay below)
+INK_CONTRAST = 80              # gray levels below the paper for a pixel to be ink
+GRID_CELL = 24                 # px at FILTER_DPI (1/3 inch)
+MAX_CELL_INK = 10              # max change of a cell's ink, in 1/255 of the cell
+
+
+def manifest_path(output_path: str) -> str:
+    return output_path + ".prefilter.json"
+
+
+def fingerprint(page) -> tuple:
+    """(ink coverage, hash as int, ink grid bytes) of a PyMuPDF page."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    scale = FILTER_DPI / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY)
+    img = Image.frombytes('L', [pix.width, pix.height], pix.samples)
+
+    histogram = img.histogram()
+    total = img.width * img.height
+    seen, paper = 0, 255
+    for level, count in enumerate(histogram):
+        seen += count
+        if seen * 2 >= total:
+            paper = level
+            break
+    dark = max(0, paper - INK_CONTRAST)
+    ink = sum(histogram[:dark]) / total
+    grid = img.point(lambda v: 255 if v < dark else 0).resize(
+        (max(1, img.width // GRID_CELL), max(1, img.height // GRID_CELL)), Image.BOX).tobytes()
+
+    cells = img.resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX).tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        line = cells[row * (HASH_SIZE + 1):(row + 1) * (HASH_SIZE + 1)]
+        for left, right in zip(line, line[1:]):
+            bits = (bits << 1) | (left > right)
+    return ink, bits, grid
+
+
+def is_blank(ink: float) -> bool:
+    return ink < BLANK_INK
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def same_layout(grid: bytes, other: bytes) -> bool:
+    return len(grid) == len(other) and max(abs(a - b) for a, b in zip(grid, other)) <= MAX_CELL_INK
+
+
+class DuplicateIndex:
+    """Fingerprints of the pages OCR'd so far in a run."""
+
+    def __init__(self):
+        self.pages = []        # (page_num, ink, hash, grid)
+
+    def match(self, ink: float, bits: int, grid: bytes, before: int = None):
+        """(page_num, hash distance) of the closest near-identical page (before `before`), or None."""
+        best = None
+        for page_num, other_ink, other_bits, other_grid in self.pages:
+            if before is not None and page_num >= before:
+                continue
+            if abs(ink - other_ink) > MAX_INK_DELTA * max(ink, other_ink):
+                continue
+            d = distance(bits, other_bits)
+            if d <= MAX_DISTANCE and (best is None or d < best[1]) and same_layout(grid, other_grid):
+                best = (page_num, d)
+        return best
+
+    def add(self, page_num: int, ink: float, bits: int, grid: bytes):
+        self.pages.append((page_num, ink, bits, grid))
+
+
+def load_manifest(output_path: str) -> dict:
+    path = manifest_path(output_path)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {"blank": [], "reused": []}
+
+
+def write_manifest(output_path: str, blank: dict, reused: dict):
+    """
+    Merge this run's skipped pages into the manifest (0-indexed page numbers
+    in, 1-indexed out). blank: {page_num: ink}; reused: {page_num: (source, distance)}.
+    """
+    if not (blank or reused or os.path.exists(manifest_path(output_path))):
+        return
+    data = load_manifest(output_path)
+    new = {p + 1 for p in list(blank) + list(reused)}
+    data["blank"] = [e for e in data["blank"] if e["page"] not in new] + [
+        {"page": p + 1, "ink": round(ink, 5)} for p, ink in blank.items()]
+    data["reused"] = [e for e in data["reused"] if e["page"] not in new] + [
+        {"page": p + 1, "source": source + 1, "distance": d} for p, (source, d) in reused.items()]
+    data["blank"].sort(key=lambda e: e["page"])
+    data["reused"].sort(key=lambda e: e["page"])
+    tmp = manifest_path(output_path) + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, manifest_path(output_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which PDF pages the prefilter would skip")
+    parser.add_argument("pdf_path", help="Path to PDF file")
+    parser.add_argument("-s", "--start", type=int, default=0, help="Start page (0-indexed)")
+    parser.add_argument("-e", "--end", type=int, help="End page (exclusive)")
+    args = parser.parse_args()
+
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(args.pdf_path)
+    end = args.end if args.end is not None else len(doc)
+    index = DuplicateIndex()
+    skipped = 0
+    for page_num in range(args.start, end):
+        ink, bits, grid = fingerprint(doc.load_page(page_num))
+        match = None if is_blank(ink) else index.match(ink, bits, grid)
+        if is_blank(ink):
+            verdict = "blank"
+        elif match:
+            verdict = f"duplicate of page {match[0] + 1} ({match[1]} bits)"
+        else:
+            verdict = "OCR"
+            index.add(page_num, ink, bits, grid)
+        skipped += verdict != "OCR"
+        print(f"Page {page_num + 1:>4} | ink {ink:6.2%} | {verdict}")
+    doc.close()
+    print(f"⏭️  {skipped} of {end - args.start} pages would skip OCR")
+
+
+if __name__ == "__main__":
+    main()
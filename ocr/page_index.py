@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Page-offset sidecar index for OCR outputs (`# PAGE n` framing).
+
+`<output>.index.json` stores the byte offset/length of every page block, so a
+page can be read through mmap without scanning the file, and a re-OCR'd page
+can be spliced in by rewriting only the bytes after it.
+
+ocr_pdf.py writes the index at the end of each run. For older outputs (or a
+stale index) readers scan the framing in memory; only `build` and writers
+such as splice_page save the sidecar, so read-only tools leave no files.
+
+Usage:
+    python ocr/page_index.py build ocr/data/file.txt
+    python ocr/page_index.py show ocr/data/file.txt 412
+    python ocr/page_index.py splice ocr/data/file.txt 412 page_412.md
+
+To re-OCR pages from the PDF use quality_scan.py --reocr (flagged pages) or
+--pages 412 413 (any pages), with the options the output was made with.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+
+INDEX_VERSION = 1
+SEPARATOR = '=' * 60
+
+# Page framing written by ocr_pdf.write_page
+PAGE_BLOCK_RE = re.compile(rb'\n={60}\n# PAGE (\d+)\n={60}\n\n')
+
+
+def page_block(page_num: int, text: str) -> bytes:
+    """One page as written to the output (page_num is 0-indexed)."""
+    return (f"\n{SEPARATOR}\n"
+            f"# PAGE {page_num + 1}\n"
+            f"{SEPARATOR}\n\n"
+            f"{text}\n").encode('utf-8')
+
+
+def block_text(block: bytes) -> str:
+    """Inverse of page_block: the page text without framing."""
+    m = PAGE_BLOCK_RE.match(block)
+    body = block[m.end():] if m else block
+    if body.endswith(b"\n"):
+        body = body[:-1]
+    return body.decode('utf-8')
+
+
+def scan_pages(output_path: str) -> dict:
+    """Rebuild {page_num: (offset, length)} from the `# PAGE n` framing of an output file."""
+    with open(output_path, 'rb') as f:
+        data = f.read()
+    starts = [(m.start(), int(m.group(1)) - 1) for m in PAGE_BLOCK_RE.finditer(data)]
+    pages = {}
+    for i, (offset, page_num) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(data)
+        pages[page_num] = (offset, end - offset)
+    return pages
+
+
+def index_path(output_path: str) -> str:
+    return output_path + ".index.json"
+
+
+def write_index(output_path: str, pages: dict):
+    data = {
+        "version": INDEX_VERSION,
+        "size": os.path.getsize(output_path),
+        "pages": [[p, offset, length] for p, (offset, length) in sorted(pages.items())],
+    }
+    tmp = index_path(output_path) + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, index_path(output_path))
+
+
+def load_index(output_path: str, write: bool = False) -> dict:
+    """
+    {page_num: (offset, length)}; rebuilt from the file if missing or stale,
+    and then saved only with write=True.
+    """
+    path = index_path(output_path)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") == INDEX_VERSION and data.get("size") == os.path.getsize(output_path):
+            return {p: (offset, length) for p, offset, length in data["pages"]}
+    pages = scan_pages(output_path)
+    if write:
+        write_index(output_path, pages)
+    return pages
+
+
+def read_page(output_path: str, page_num: int, pages: dict = None) -> str:
+    """Text of one page (0-indexed) via mmap, without reading the rest of the file."""
+    if pages is None:
+        pages = load_index(output_path)
+    if page_num not in pages:
+        raise KeyError(f"Page {page_num + 1} not in {output_path}")
+    offset, length = pages[page_num]
+    with open(output_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return block_text(mm[offset:offset + length])
+
+
+def splice_page(output_path: str, page_num: int, text: str) -> int:
+    """
+    Replace (or insert, in page order) one page block. Only the bytes after the
+    page are rewritten. Returns the number of bytes written.
+    """
+    if os.path.exists(output_path + ".progress.jsonl"):
+        raise RuntimeError(f"{output_path} has an unfinished OCR run (.progress.jsonl); finish it first")
+
+    pages = load_index(output_path)
+    if page_num in pages:
+        offset, length = pages[page_num]
+    else:
+        following = [pages[p][0] for p in pages if p > page_num]
+        offset, length = (min(following) if following else os.path.getsize(output_path)), 0
+
+    new_block = page_block(page_num, text)
+    with open(output_path, 'r+b') as f:
+        f.seek(offset + length)
+        tail = f.read()
+        f.seek(offset)
+        f.write(new_block)
+        f.write(tail)
+        f.truncate()
+
+    delta = len(new_block) - length
+    pages = {p: (o + delta if o > offset or (o == offset and p != page_num) else o, n)
+             for p, (o, n) in pages.items()}
+    pages[page_num] = (offset, len(new_block))
+    write_index(output_path, pages)
+    return len(new_block) + len(tail)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Random access into OCR outputs by page")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="(Re)build the sidecar index")
+    build.add_argument("output", help="OCR output file")
+    show = sub.add_parser("show", help="Print one page")
+    show.add_argument("output", help="OCR output file")
+    show.add_argument("page", type=int, help="Page number (1-indexed, as in # PAGE n)")
+    splice = sub.add_parser("splice", help="Replace one page with the contents of a file")
+    splice.add_argument("output", help="OCR output file")
+    splice.add_argument("page", type=int, help="Page number (1-indexed)")
+    splice.add_argument("text_file", help="New page text ('-' for stdin)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.output):
+        print(f"❌ Output not found: {args.output}")
+        sys.exit(1)
+
+    if args.command == "build":
+        pages = scan_pages(args.output)
+        write_index(args.output, pages)
+        print(f"📇 Indexed {len(pages)} pages → {index_path(args.output)}")
+    elif args.command == "show":
+        print(read_page(args.output, args.page - 1))
+    else:
+        if args.text_file == "-":
+            text = sys.stdin.read()
+        else:
+            with open(args.text_file, 'r', encoding='utf-8') as f:
+                text = f.read()
+        written = splice_page(args.output, args.page - 1, text.rstrip("\n"))
+        print(f"✂️  Spliced page {args.page} ({written:,} bytes rewritten)")
+
+
+if __name__ == "__main__":
+    main()
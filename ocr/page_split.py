@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Split pages whose OCR output hits max_tokens into overlapping horizontal bands.
+
+A dense table page can need more than max_tokens; the response then stops
+with finish_reason "length" and the rest of the page is lost. `aocr_split`
+detects that, cuts the page image into SPLIT_BANDS bands (boundaries snapped
+to the whitest pixel row nearby, so text lines are not sliced, plus a small
+overlap), OCRs the bands concurrently and stitches the texts:
+  - lines repeated across a band boundary (the overlap) are dropped once
+  - a markdown table header the model repeats at the top of a band that
+    continues the previous band's table is dropped
+A band that still overflows is split again, up to MAX_SPLIT_DEPTH.
+
+Usage:
+    python ocr/page_split.py file.pdf 12 -o bands/   # write the bands of page 12 as PNG
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import re
+from dataclasses import replace
+
+from ocr_client import DEFAULT_PROMPT, get_loop
+
+SPLIT_BANDS = 3
+OVERLAP = 0.03            # band overlap, as a share of the page height
+SNAP_WINDOW = 0.04        # search this far (share of height) for a white row to cut at
+MAX_SPLIT_DEPTH = 2
+STITCH_LOOKAHEAD = 15     # max lines of overlap between two bands
+EDGE_SLACK = 2            # lines at the top of a band allowed before the overlap
+
+TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{3,}")
+
+
+def split_bands(image_bytes: bytes, bands: int = SPLIT_BANDS, overlap: float = OVERLAP) -> list:
+    """Encoded `bands` overlapping horizontal bands of the image, top to bottom."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    width, height = image.size
+    # Mean brightness of every pixel row; cut where the page is whitest
+    rows = list(image.convert("L").resize((1, height), Image.BOX).getdata())
+    window = max(1, int(height * SNAP_WINDOW))
+    cuts = [0]
+    for i in range(1, bands):
+        target = height * i // bands
+        lo, hi = max(cuts[-1] + 1, target - window), min(height - 1, target + window)
+        if lo > hi:
+            cuts.append(target)
+            continue
+        cuts.append(max(range(lo, hi + 1), key=lambda y: (rows[y], -abs(y - target))))
+    cuts.append(height)
+
+    # Bands keep the page's format, so the request mime type still matches
+    fmt = image.format or "PNG"
+    options = {"quality": 90} if fmt in ("JPEG", "WEBP") else {}
+    pad = int(height * overlap)
+    out = []
+    for top, bottom in zip(cuts, cuts[1:]):
+        band = image.crop((0, max(0, top - pad), width, min(height, bottom + pad)))
+        buf = io.BytesIO()
+        band.save(buf, format=fmt, **options)
+        out.append(buf.getvalue())
+    return out
+
+
+def _norm(line: str) -> str:
+    return " ".join(line.split()).lower()
+
+
+def _table_header(lines: list):
+    """(header, separator) of the last markdown table in lines, or None."""
+    for i in range(len(lines) - 1, 0, -1):
+        if TABLE_SEPARATOR_RE.match(lines[i].strip()) and lines[i - 1].strip().startswith("|"):
+            return _norm(lines[i - 1]), _norm(lines[i])
+    return None
+
+
+def _find_overlap(a: list, b: list):
+    """
+    (a_end, b_start) such that a[:a_end] + b[b_start:] drops the overlap, or None.
+    The overlap is the longest run of lines at the end of a that reappears
+    within EDGE_SLACK lines of the start of b (cut-off lines, a repeated table
+    header). The last line of a may be cut off by the band edge; it is dropped
+    if b continues with the whole line.
+    """
+    a_norm = [_norm(line) for line in a]
+    b_norm = [_norm(line) for line in b]
+    for size in range(min(STITCH_LOOKAHEAD, len(a), len(b)), 0, -1):
+        for b_start in range(EDGE_SLACK + 1):
+            b_end = b_start + size
+            run = b_norm[b_start:b_end]
+            if len(run) < size or not any(len(line) > 5 for line in run):
+                continue
+            if a_norm[len(a) - size:] == run:
+                return len(a), b_end
+            if (len(a) > size and a_norm[len(a) - size - 1:-1] == run and b_end < len(b)
+                    and b_norm[b_end].startswith(a_norm[-1])):
+                return len(a) - 1, b_end
+    return None
+
+
+def stitch(first: str, second: str) -> str:
+    """Join the texts of two vertically adjacent bands, dropping the overlap."""
+    a = first.rstrip("\n").split("\n")
+    b = second.strip("\n").split("\n")
+
+    overlap = _find_overlap(a, b)
+    if overlap:
+        a_end, b_start = overlap
+        a, b = a[:a_end], b[b_start:]
+        joiner = "\n"
+    else:
+        # No overlap found: the model may have restarted the table with its header
+        header = _table_header(a)
+        if header and len(b) >= 2 and (_norm(b[0]), _norm(b[1])) == header:
+            b = b[2:]
+        # Continue a table without a blank line; otherwise separate paragraphs
+        continues_table = b and a[-1].strip().startswith("|") and b[0].strip().startswith("|")
+        joiner = "\n" if continues_table else "\n\n"
+    if not b:
+        return "\n".join(a)
+    return "\n".join(a).rstrip() + joiner + "\n".join(b)
+
+
+async def aocr_split(ocr, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, depth: int = 0, **kwargs):
+    """
+    OCR through `ocr` (an OCRClient or EndpointPool); when the output stops at
+    max_tokens, OCR the page as bands concurrently and stitch them. The result
+    has finish_reason "length" only if a band still overflowed at MAX_SPLIT_DEPTH.
+    """
+    result = await ocr.aocr(image_bytes, prompt, **kwargs)
+    if result.finish_reason != "length" or depth >= MAX_SPLIT_DEPTH:
+        return result
+
+    if depth == 0:
+        print(f"    ✂️  Output hit max_tokens ({result.completion_tokens} tokens), "
+              f"splitting into {SPLIT_BANDS} bands")
+    # Decoding, cropping and re-encoding take a noticeable fraction of a second per
+    # page: run them in a thread so the shared loop keeps serving the other requests
+    images = await asyncio.to_thread(split_bands, image_bytes)
+    bands = await asyncio.gather(*(aocr_split(ocr, band, prompt, depth + 1, **kwargs)
+                                   for band in images))
+    text = bands[0].text
+    for band in bands[1:]:
+        text = stitch(text, band.text)
+    return replace(
+        result,
+        text=text,
+        finish_reason="length" if any(b.finish_reason == "length" for b in bands) else "stop",
+        prompt_tokens=result.prompt_tokens + sum(b.prompt_tokens for b in bands),
+        completion_tokens=result.completion_tokens + sum(b.completion_tokens for b in bands),
+        latency=result.latency + max(b.latency for b in bands),
+        loops_aborted=result.loops_aborted + sum(b.loops_aborted for b in bands),
+        tokens_saved=result.tokens_saved + sum(b.tokens_saved for b in bands),
+        bands=sum(b.bands for b in bands),
+    )
+
+
+def submit_split(ocr, image_bytes: bytes, prompt: str = DEFAULT_PROMPT, **kwargs):
+    """Schedule aocr_split() on the shared loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(aocr_split(ocr, image_bytes, prompt, **kwargs), get_loop())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the OCR bands of one PDF page as PNG")
+    parser.add_argument("pdf_path", help="Path to PDF file")
+    parser.add_argument("page", type=int, help="Page number (1-indexed)")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory for the band images")
+    parser.add_argument("-n", "--bands", type=int, default=SPLIT_BANDS, help=f"Bands (default: {SPLIT_BANDS})")
+    args = parser.parse_args()
+
+    import fitz  # PyMuPDF
+    from ocr_pdf import pdf_page_to_image
+
+    doc = fitz.open(args.pdf_path)
+    image_bytes = pdf_page_to_image(doc, args.page - 1)
+    doc.close()
+    os.makedirs(args.output_dir, exist_ok=True)
+    for i, band in enumerate(split_bands(image_bytes, args.bands), 1):
+        path = os.path.join(args.output_dir, f"page_{args.page}_band_{i}.png")
+        with open(path, "wb") as f:
+            f.write(band)
+        print(f"🖼️  {path} ({len(band) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Append-only progress journal for ocr_pdf.py.
+
+`<output>.progress.jsonl` gets one line per finished page once the page has
+been flushed to the output:
+
+    {"page": 12, "offset": 48213, "length": 2071}
+
+offset/length are byte positions of the page block (`# PAGE n` framing
+included) in the output file. Checkpointing is O(1) per page, pages may finish
+in any order, and a resume processes exactly the pages that are missing.
+`compact_output` rewrites the output in page order once every page is done.
+"""
+
+import json
+import os
+
+from page_index import scan_pages
+
+
+class ProgressJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self.pages = {}  # page_num -> (offset, length)
+        if os.path.exists(path):
+            self._load()
+        self._f = None
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line from a crash
+                self.pages[entry['page']] = (entry['offset'], entry['length'])
+
+    @property
+    def end_offset(self) -> int:
+        """End of the last journaled page block in the output."""
+        return max((offset + length for offset, length in self.pages.values()), default=0)
+
+    def record(self, page_num: int, offset: int, length: int):
+        if self._f is None:
+            self._f = open(self.path, 'a', encoding='utf-8')
+        self._f.write(json.dumps({"page": page_num, "offset": offset, "length": length}) + "\n")
+        self._f.flush()
+        self.pages[page_num] = (offset, length)
+
+    def rewrite(self):
+        """Write the journal from self.pages (after migration / truncation / compaction)."""
+        self.close()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for page_num, (offset, length) in sorted(self.pages.items(), key=lambda kv: kv[1][0]):
+                f.write(json.dumps({"page": page_num, "offset": offset, "length": length}) + "\n")
+        os.replace(tmp, self.path)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def migrate_legacy_progress(legacy_file: str, output_path: str, journal: ProgressJournal):
+    """Import an old `.progress.json` ({"last_page", "pages_done"}) by scanning the output."""
+    with open(legacy_file, 'r') as f:
+        legacy = json.load(f)
+    done = set(legacy.get("pages_done", []))
+    if os.path.exists(output_path):
+        for page_num, span in scan_pages(output_path).items():
+            if page_num in done:
+                journal.pages[page_num] = span
+    journal.rewrite()
+    os.remove(legacy_file)
+
+
+def truncate_to_journal(output_path: str, journal: ProgressJournal):
+    """
+    Make the output end where the journal does: drop a partially written page
+    after a crash, and forget journal entries the output no longer contains.
+    """
+    size = os.path.getsize(output_path)
+    valid = {p: span for p, span in journal.pages.items() if span[0] + span[1] <= size}
+    if len(valid) != len(journal.pages):
+        journal.pages = valid
+        journal.rewrite()
+    end = journal.end_offset
+    if end and size > end:
+        with open(output_path, 'r+b') as f:
+            f.truncate(end)
+
+
+def compact_output(output_path: str, journal: ProgressJournal) -> bool:
+    """Rewrite the output with page blocks in page order. Returns True if it had to."""
+    by_offset = sorted(journal.pages, key=lambda p: journal.pages[p][0])
+    if by_offset == sorted(journal.pages):
+        return False
+
+    header_end = min(offset for offset, _ in journal.pages.values())
+    tmp = output_path + '.tmp'
+    with open(output_path, 'rb') as src, open(tmp, 'wb') as dst:
+        dst.write(src.read(header_end))
+        new_pages = {}
+        for page_num in sorted(journal.pages):
+            offset, length = journal.pages[page_num]
+            src.seek(offset)
+            new_pages[page_num] = (dst.tell(), length)
+            dst.write(src.read(length))
+    os.replace(tmp, output_path)
+    journal.pages = new_pages
+    journal.rewrite()
+    return True
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Scan an OCR output for bad pages and re-OCR only those.
+
+Checks per page:
+  error      the page holds an "[OCR ERROR" marker (older runs wrote them)
+  loop       the text ends in a repetition loop (repetition.find_loop)
+  truncated  the page ends inside a markdown table row
+  table      a markdown table is broken: no |---| separator under the header,
+             a row with more cells than the header, or more than
+             MAX_SHORT_ROW_SHARE of the rows with fewer (one merged section
+             row such as "| I | Danh mục ... |" is normal)
+  short      fewer than SHORT_RATIO of the letters of the PDF text layer
+             (pages with a text layer of at least MIN_LAYER_LETTERS)
+  empty      no text although the page has ink (page_filter)
+  missing    the page is not in the output at all (failed in every pass)
+
+With --reocr the flagged pages (plus any given with --pages, which are
+replaced whatever their new issues) are rendered and OCR'd concurrently through
+the endpoint pool (loop pages with LOOP_RETRY_PARAMS), and each new text is
+spliced in (page_index.splice_page) if it has fewer issues than the old one.
+Pages are rendered the way ocr_pdf.py does, so pass the options the output
+was made with (--dpi auto, --preprocess, --encoding, -k): the VLM then sees
+the same image, and the fixed text replaces the page's entry in the OCR
+cache under the key a full rerun looks up, so the rerun does not bring the
+bad text back.
+
+Usage:
+    python ocr/quality_scan.py ocr/data/file.txt                        # report (PDF: ocr/data/file.pdf)
+    python ocr/quality_scan.py ocr/data/file.txt --pdf other.pdf --reocr -j 4
+    python ocr/quality_scan.py ocr/data/file.txt --reocr --dpi auto --preprocess   # as the run was made
+    python ocr/quality_scan.py ocr/data/file.txt --pages 412 413                    # these pages, flagged or not
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import as_completed
+
+from page_index import load_index, read_page, splice_page
+from repetition import find_loop
+
+SHORT_RATIO = 0.6
+MIN_LAYER_LETTERS = 200
+MAX_SHORT_ROW_SHARE = 0.2
+DEFAULT_CONCURRENCY = 4
+
+SEPARATOR_ROW_RE = re.compile(r"^\|(\s*:?-+:?\s*\|)+$")
+LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+def _cells(row: str) -> int:
+    return row.replace("\\|", "").count("|") - 1
+
+
+def table_issues(text: str) -> list:
+    """'truncated' / 'table' issues of the page's markdown tables."""
+    issues = []
+    lines = text.rstrip("\n").split("\n")
+    last = lines[-1].strip() if lines else ""
+    if last.startswith("|") and not last.endswith("|"):
+        issues.append("truncated")
+
+    tables, rows = [], []
+    for line in lines + [""]:
+        line = line.strip()
+        if line.startswith("|"):
+            rows.append(line)
+        elif rows:
+            tables.append(rows)
+            rows = []
+    for table in tables:
+        if len(table) < 2:
+            continue  # a lone row: a table continued from the previous page
+        header = _cells(table[0])
+        body = [row for row in table[2:] if row.endswith("|")]
+        fewer = sum(1 for row in body if _cells(row) < header)
+        if (not SEPARATOR_ROW_RE.match(table[1])
+                or any(_cells(row) > header for row in body)
+                or (fewer > 1 and fewer > MAX_SHORT_ROW_SHARE * len(body))):
+            issues.append("table")
+            break
+    return issues
+
+
+def letters(text: str) -> int:
+    return len(LETTER_RE.findall(text))
+
+
+def scan_text(text: str, layer_letters: int = None, ink: float = None) -> list:
+    """Issues of one page's OCR text. layer_letters / ink come from the PDF page."""
+    issues = []
+    if "[OCR ERROR" in text:
+        issues.append("error")
+    if find_loop(text):
+        issues.append("loop")
+    issues.extend(table_issues(text))
+    if layer_letters and layer_letters >= MIN_LAYER_LETTERS and letters(text) < SHORT_RATIO * layer_letters:
+        issues.append("short")
+    elif not text.strip() and ink is not None:
+        from page_filter import is_blank
+        if not is_blank(ink):
+            issues.append("empty")
+    return issues
+
+
+def page_reference(page) -> tuple:
+    """(text layer letters, ink coverage) of a PyMuPDF page."""
+    from page_filter import fingerprint
+    return letters(page.get_text()), fingerprint(page)[0]
+
+
+def scan_output(output_path: str, pdf_path: str = None) -> dict:
+    """{page_num: [issues]} for the flagged pages (0-indexed)."""
+    pages = load_index(output_path)
+    references = {}
+    page_count = max(pages) + 1 if pages else 0
+    if pdf_path:
+        import fitz  # PyMuPDF
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+        references = {p: page_reference(doc.load_page(p)) for p in range(page_count)}
+        doc.close()
+
+    flagged = {}
+    for page_num in range(page_count):
+        if page_num not in pages:
+            flagged[page_num] = ["missing"]
+            continue
+        issues = scan_text(read_page(output_path, page_num, pages), *references.get(page_num, (None, None)))
+        if issues:
+            flagged[page_num] = issues
+    return flagged
+
+
+def reocr_pages(output_path: str, pdf_path: str, flagged: dict, pool, prompt: str, dpi=None,
+                cache=None, stream: bool = False, encoding: str = None, preprocess: bool = False,
+                pages_per_request: int = 1) -> dict:
+    """
+    OCR the flagged pages concurrently through `pool` and splice in every
+    page whose new text has fewer issues. Returns {page_num: issues left}.
+    dpi / encoding / preprocess / pages_per_request are those of the run
+    that made the output (see ocr_pdf.ocr_pdf); pages are OCR'd one per
+    request either way, pages_per_request only picks the cache key.
+    """
+    import fitz  # PyMuPDF
+    import ocr_pdf
+    from ocr_cache import cache_key
+    from ocr_client import LOOP_RETRY_PARAMS
+    from page_split import submit_split
+
+    encoding = ocr_pdf.page_encoding(pool, encoding, preprocess)
+    mime = ocr_pdf.get_profile(encoding).mime
+    key_params = ocr_pdf.cache_params(pages_per_request)
+    doc = fitz.open(pdf_path)
+    futures = {}
+    for page_num, issues in sorted(flagged.items()):
+        image = ocr_pdf.pdf_page_to_image(doc, page_num, dpi or ocr_pdf.DEFAULT_DPI, encoding, preprocess)
+        params = {**ocr_pdf.OCR_PARAMS, **LOOP_RETRY_PARAMS} if "loop" in issues else ocr_pdf.OCR_PARAMS
+        future = submit_split(pool, image, prompt, mime=mime, stream=stream, **params)
+        futures[future] = (page_num, image, page_reference(doc.load_page(page_num)))
+    doc.close()
+
+    left = {}
+    for future in as_completed(futures):
+        page_num, image, reference = futures[future]
+        old = flagged[page_num]
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"❌ Page {page_num + 1} failed: {e}")
+            left[page_num] = old
+            continue
+        issues = scan_text(result.text, *reference)
+        if len(issues) < len(old) or "missing" in old or "requested" in old:
+            splice_page(output_path, page_num, result.text)
+            if cache and result.finish_reason in (None, "stop"):
+                cache.put(cache_key(image, result.model, prompt, key_params), result.text, result.model)
+            status = "✅" if not issues else "🩹"
+            print(f"{status} Page {page_num + 1}: {', '.join(old)} -> {', '.join(issues) or 'ok'} | "
+                  f"{result.latency:.1f}s")
+        else:
+            print(f"⚠️ Page {page_num + 1}: still {', '.join(issues)}; kept the old text")
+            issues = old
+        if issues:
+            left[page_num] = issues
+    return left
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag bad pages in an OCR output and re-OCR only those")
+    parser.add_argument("output", help="OCR output file (# PAGE n framing)")
+    parser.add_argument("--pdf", help="Source PDF (default: the output path with .pdf)")
+    parser.add_argument("--reocr", action="store_true", help="Re-OCR the flagged pages and splice them in")
+    parser.add_argument("--only", help="Comma-separated issues to re-OCR (default: all)")
+    parser.add_argument("--pages", nargs="+", type=int, metavar="PAGE",
+                        help="Also re-OCR these pages (1-indexed), flagged or not; implies --reocr")
+    parser.add_argument("--prompt", choices=["ocr_pdf", "ocr_pdf_2"], default="ocr_pdf",
+                        help="Prompt the output was made with (default: ocr_pdf)")
+    # The endpoint / render options of ocr_pdf.py: use the ones the output was made with
+    from ocr_pdf import add_ocr_args
+    add_ocr_args(parser, default_concurrency=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+    args.reocr = args.reocr or bool(args.pages)
+
+    if not os.path.exists(args.output):
+        print(f"❌ Output not found: {args.output}")
+        sys.exit(1)
+    pdf_path = args.pdf or os.path.splitext(args.output)[0] + ".pdf"
+    if not os.path.exists(pdf_path):
+        if args.pdf or args.reocr:
+            print(f"❌ PDF not found: {pdf_path}")
+            sys.exit(1)
+        pdf_path = None
+        print("ℹ️  No PDF next to the output: short / empty checks skipped")
+
+    start = time.time()
+    flagged = scan_output(args.output, pdf_path)
+    for page_num, issues in sorted(flagged.items()):
+        print(f"🚩 Page {page_num + 1}: {', '.join(issues)}")
+    counts = {}
+    for issues in flagged.values():
+        for issue in issues:
+            counts[issue] = counts.get(issue, 0) + 1
+    print(f"🔎 {len(flagged)} flagged pages in {time.time() - start:.1f}s"
+          + (f" ({', '.join(f'{k} {v}' for k, v in sorted(counts.items()))})" if counts else ""))
+
+    if args.only:
+        wanted = set(args.only.split(","))
+        flagged = {p: issues for p, issues in flagged.items() if wanted & set(issues)}
+    if args.pages:
+        import fitz  # PyMuPDF
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+        for page in args.pages:
+            if page < 1 or page > page_count:
+                print(f"❌ Page {page} out of range (PDF has {page_count} pages)")
+                sys.exit(1)
+            flagged[page - 1] = flagged.get(page - 1, []) + ["requested"]
+    if not args.reocr or not flagged:
+        return
+
+    import ocr_pdf
+    from ocr_cache import OCRCache
+
+    if args.prompt == "ocr_pdf_2":
+        from ocr_pdf_2 import OCR_PROMPT as prompt
+    else:
+        prompt = ocr_pdf.OCR_PROMPT
+    pool, _ = ocr_pdf.pool_from_args(args, DEFAULT_CONCURRENCY)
+    cache = None if args.no_cache else OCRCache(args.cache)
+
+    print("=" * 60)
+    print(f"🔁 Re-OCR {len(flagged)} pages")
+    start = time.time()
+    try:
+        left = reocr_pages(args.output, pdf_path, flagged, pool, prompt, args.dpi, cache, args.stream,
+                           encoding=args.encoding, preprocess=args.preprocess,
+                           pages_per_request=args.pages_per_request)
+    finally:
+        if cache:
+            cache.close()
+    print("=" * 60)
+    print(f"✅ {len(flagged) - len(left)} of {len(flagged)} pages fixed in {time.time() - start:.1f}s"
+          + (f"; still flagged: {[p + 1 for p in sorted(left)]}" if left else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Online detection of degenerate repetition in streamed VLM output.
+
+On dense tables a VLM sometimes loops: the same row, or the same few words,
+over and over until max_tokens. `RepetitionDetector.feed` is called with each
+streamed delta and reports a loop as soon as the tail of the text is one unit
+repeated back to back:
+  - the unit is 1..MAX_PERIOD characters (an n-gram or a whole table row)
+  - it repeats at least MIN_REPEATS times and covers MIN_LOOP_CHARS characters
+  - units without letters or digits (dot leaders "......", table rules
+    "|---|---|", blank form lines) need FILLER_LOOP_CHARS, since forms
+    legitimately contain long runs of them
+
+Usage:
+    python ocr/repetition.py ocr/data/file.txt   # report loops in an OCR output
+"""
+
+import argparse
+
+MAX_PERIOD = 400
+MIN_REPEATS = 4
+MIN_LOOP_CHARS = 300
+FILLER_LOOP_CHARS = 2000
+CHECK_EVERY = 32  # characters between checks, to keep feed() cheap
+# Longest loop find_loop must see (filler of the longest period), plus one
+# period to extend it back to its first copy and one to reach a line break
+TAIL_CHARS = FILLER_LOOP_CHARS + 2 * MAX_PERIOD
+
+
+def find_loop(text: str):
+    """
+    (start, period) if text ends with a repetition loop, else None. `start` is
+    where the second copy of the unit begins, i.e. text[:start] keeps one copy;
+    it is moved back to a line break when the unit spans lines, so a looping
+    table row is kept whole.
+    """
+    n = len(text)
+    for period in range(1, min(MAX_PERIOD, n // MIN_REPEATS) + 1):
+        # Cheap rejects first: most periods fail on the last character
+        if text[n - 1] != text[n - 1 - period] or text[n - period:] != text[n - 2 * period:n - period]:
+            continue
+        unit = text[n - period:]
+        filler = not any(ch.isalnum() for ch in unit)
+        needed = max(MIN_REPEATS * period, FILLER_LOOP_CHARS if filler else MIN_LOOP_CHARS)
+        if needed > n:
+            continue
+        repeats = -(-needed // period)
+        if text.endswith(unit * repeats):
+            # Extend back to the first copy of the unit
+            start = n - repeats * period
+            while start >= period and text[start - period:start] == unit:
+                start -= period
+            start += period
+            newline = text.rfind("\n", start - period, start)
+            return (newline + 1 if newline != -1 else start), period
+    return None
+
+
+class RepetitionDetector:
+    """
+    Feed streamed deltas; `looped` turns True once the text ends in a loop.
+
+    Checks only scan the last TAIL_CHARS characters, so a check costs the
+    same at the end of a long page as at the start (feed() runs on the
+    shared event loop, next to every other request in flight).
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+        self._tail = ""
+        self._next_check = MIN_LOOP_CHARS
+        self.looped = False
+        self.loop_start = None
+        self.period = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def feed(self, delta: str) -> bool:
+        self.parts.append(delta)
+        self.length += len(delta)
+        self._tail += delta
+        if len(self._tail) > 2 * TAIL_CHARS:
+            self._tail = self._tail[-TAIL_CHARS:]
+        if self.length >= self._next_check and not self.looped:
+            self._next_check = self.length + CHECK_EVERY
+            tail = self._tail[-TAIL_CHARS:]
+            loop = find_loop(tail)
+            if loop is not None:
+                self.looped = True
+                self.loop_start = self.length - len(tail) + loop[0]
+                self.period = loop[1]
+        return self.looped
+
+    def truncated(self) -> str:
+        """Text with the loop cut down to a single copy of the repeated unit."""
+        text = self.text
+        return text[:self.loop_start] if self.looped else text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find repetition loops in OCR output pages")
+    parser.add_argument("output", help="OCR output file (# PAGE n framing)")
+    args = parser.parse_args()
+
+    from page_index import block_text, load_index
+
+    pages = load_index(args.output)
+    with open(args.output, 'rb') as f:
+        data = f.read()
+    found = 0
+    for page_num, (offset, length) in sorted(pages.items()):
+        text = block_text(data[offset:offset + length])
+        # A loop that ran to max_tokens sits at the end of the page text
+        loop = find_loop(text.rstrip())
+        if loop is not None:
+            found += 1
+            start, period = loop
+            unit = text[start - period:start].replace("\n", "\\n")
+            print(f"🔁 Page {page_num + 1}: {len(text) - start} looping chars, unit {unit[:60]!r}")
+    print(f"📊 {found}/{len(pages)} pages end in a repetition loop")
+
+
+if __name__ == "__main__":
+    main()
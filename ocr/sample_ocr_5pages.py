@@ -3,16 +3,13 @@
 OCR 5 sample pages and save output for quality review.
 """
 
-import base64
 import io
 import os
 
 import fitz  # PyMuPDF
-from dotenv import load_dotenv
-from openai import OpenAI
 from PIL import Image
 
-load_dotenv()
+from ocr_client import DEFAULT_PROMPT, OCRClient, get_endpoint, get_ocr_client
 
 
 def pdf_page_to_image(pdf_path: str, page_num: int, dpi: int = 150) -> bytes:
@@ -28,42 +25,9 @@ def pdf_page_to_image(pdf_path: str, page_num: int, dpi: int = 150) -> bytes:
     return buffer.getvalue()
 
 
-def ocr_with_openai(image_bytes: bytes, client: OpenAI) -> dict:
-    """OCR image using OpenAI Vision API."""
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
-    
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": """Trích xuất toàn bộ text từ hình ảnh này. 
-Đây là văn bản pháp luật Việt Nam, có thể chứa bảng.
-Nếu có bảng, hãy format thành markdown table với đầy đủ các cột.
-Giữ nguyên định dạng và thứ tự của văn bản.
-Không thêm giải thích, chỉ trả về nội dung được trích xuất."""
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{base64_image}",
-                            "detail": "high"
-                        }
-                    }
-                ]
-            }
-        ],
-        max_tokens=4096
-    )
-    
-    return {
-        "text": response.choices[0].message.content,
-        "prompt_tokens": response.usage.prompt_tokens,
-        "completion_tokens": response.usage.completion_tokens,
-    }
+def ocr_with_openai(image_bytes: bytes, client: OCRClient):
+    """Queue OCR of one image on the shared OpenAI connection pool (returns a Future)."""
+    return client.submit(image_bytes, DEFAULT_PROMPT, max_retries=1)
 
 
 def main():
@@ -75,7 +39,7 @@ def main():
     # Sample 5 diverse pages: cover, table start, middle tables, end
     sample_pages = [0, 2, 50, 200, 500]  # 0-indexed
     
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_ocr_client(get_endpoint("gpt-4o-mini"))
     
     doc = fitz.open(pdf_path)
     total_pages = len(doc)
@@ -90,6 +54,8 @@ def main():
     
     all_results = []
     
+    # Render every page first and queue it, so requests overlap on the pool
+    futures = {}
     for i, page_num in enumerate(sample_pages):
         if page_num >= total_pages:
             print(f"⚠️ Page {page_num + 1} exceeds total pages, skipping")
@@ -107,22 +73,25 @@ def main():
         print(f"   📷 Saved image: {img_path}")
         
         # OCR
-        result = ocr_with_openai(image_bytes, client)
-        total_prompt += result["prompt_tokens"]
-        total_completion += result["completion_tokens"]
+        futures[page_num] = ocr_with_openai(image_bytes, client)
+    
+    for page_num, future in futures.items():
+        result = future.result()
+        total_prompt += result.prompt_tokens
+        total_completion += result.completion_tokens
         
-        print(f"   ✅ OCR done - Tokens: {result['prompt_tokens']} prompt, {result['completion_tokens']} completion")
+        print(f"   ✅ OCR done - Tokens: {result.prompt_tokens} prompt, {result.completion_tokens} completion")
         
         # Save OCR result
         txt_path = os.path.join(output_dir, f"page_{page_num + 1:04d}.md")
         with open(txt_path, "w", encoding="utf-8") as f:
             f.write(f"# Page {page_num + 1}\n\n")
-            f.write(result["text"])
+            f.write(result.text)
         print(f"   📝 Saved OCR: {txt_path}")
         
         all_results.append({
             "page": page_num + 1,
-            "text": result["text"]
+            "text": result.text
         })
     
     # Save combined output
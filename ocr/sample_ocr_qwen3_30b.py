@@ -3,19 +3,17 @@
 Test OCR with Qwen3-VL-30B on HuggingFace.
 """
 
-import base64
 import io
 import os
 import fitz
-from openai import OpenAI
 from PIL import Image
 
-# Qwen3 VL 30B on HuggingFace
-client = OpenAI(
-    base_url=os.getenv('QWEN3_30B_BASE_URL', 'https://b9q7ifg75v5zmz40.us-east-1.aws.endpoints.huggingface.cloud/v1/'),
-    api_key=os.getenv('QWEN_API_KEY', '')
-)
-MODEL = "Qwen/Qwen3-VL-30B-A3B-Instruct-FP8"
+from ocr_client import DEFAULT_PROMPT, get_endpoint, get_ocr_client
+
+# Qwen3 VL 30B on HuggingFace (shared pooled client, see ocr_client.py)
+ENDPOINT = get_endpoint('qwen3_30b')
+client = get_ocr_client(ENDPOINT)
+MODEL = ENDPOINT.model
 
 pdf_path = 'ocr/data/Quyet_dinh_3467-QD-BYT.pdf'
 output_dir = 'ocr/data/sample_ocr_qwen3_30b'
@@ -27,38 +25,23 @@ test_pages = [0, 2, 12, 50, 200]  # 0-indexed
 doc = fitz.open(pdf_path)
 all_results = []
 
+# Render all pages first and queue them, so requests overlap on the pool
+futures = {}
 for page_num in test_pages:
-    print("=" * 60)
-    print(f"Testing page {page_num + 1} with {MODEL}...")
-    
     page = doc.load_page(page_num)
     mat = fitz.Matrix(150 / 72, 150 / 72)
     pix = page.get_pixmap(matrix=mat)
     img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
     buffer = io.BytesIO()
     img.save(buffer, format='PNG', optimize=True)
-    image_bytes = buffer.getvalue()
-    
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    futures[page_num] = client.submit(buffer.getvalue(), DEFAULT_PROMPT, max_retries=1)
+
+for page_num, future in futures.items():
+    print("=" * 60)
+    print(f"Testing page {page_num + 1} with {MODEL}...")
     
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{
-                'role': 'user',
-                'content': [
-                    {'type': 'image_url', 'image_url': {'url': f'data:image/png;base64,{base64_image}'}},
-                    {'type': 'text', 'text': '''Trích xuất toàn bộ text từ hình ảnh này. 
-Đây là văn bản pháp luật Việt Nam, có thể chứa bảng.
-Nếu có bảng, hãy format thành markdown table với đầy đủ các cột.
-Giữ nguyên định dạng và thứ tự của văn bản.
-Không thêm giải thích, chỉ trả về nội dung được trích xuất.'''}
-                ]
-            }],
-            max_tokens=4096
-        )
-        
-        result = response.choices[0].message.content
+        result = future.result().text
         print(f"Page {page_num + 1} result (first 1000 chars):")
         print(result[:1000])
         print()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Shard one large PDF across machines: workers claim page blocks from a lease table.
+
+`init` splits the PDF into blocks of --block pages and creates the lease
+table <output>.shards/leases.sqlite. Every `work` process (any number, on any
+machine that sees the shards directory) then loops:
+
+  1. claim the first block that is free, or whose lease expired (its worker
+     died), in one BEGIN IMMEDIATE transaction
+  2. OCR the block with ocr_pdf() (-s/-e of the block) into its own segment,
+     <output>.shards/block_<start>.<worker>.txt, with the usual journal; the
+     lease is renewed after every page (a worker that lost its lease stops)
+  3. mark the block done, or free it again if pages failed (up to
+     MAX_ATTEMPTS claims, then it is left failed)
+
+`merge` assembles the done segments in page order into the output (with its
+page index); `status` shows progress, workers and an ETA. `local` runs N
+worker processes on this machine and merges: the way to test it.
+
+The shards directory must be on a filesystem with working file locks for
+SQLite (local disk, NFSv4 with locking); segments are never shared between
+workers, so a block taken over after a lease expired starts a new segment.
+
+Usage:
+    python ocr/shard.py init ocr/data/file.pdf --block 25
+    python ocr/shard.py work ocr/data/file.pdf -j 4             # on each machine, as often as wanted
+    python ocr/shard.py status ocr/data/file.pdf
+    python ocr/shard.py merge ocr/data/file.pdf
+    python ocr/shard.py local ocr/data/file.pdf --workers 3 --block 10   # init + 3 workers + merge
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+from page_index import load_index, page_block, read_page, write_index
+
+DEFAULT_BLOCK = 20
+LEASE_SECONDS = 600            # > the slowest page with all its retries; renewed per page
+MAX_ATTEMPTS = 3
+IDLE_POLL = 10                 # seconds between claims when every free block is leased
+LOCAL_OPTIONS = ("--workers", "--block", "-o", "--output")  # `local` options not passed to its workers
+
+
+class LeaseLost(Exception):
+    """Another worker took over the block (our lease expired)."""
+
+
+def shards_dir(output_path: str) -> str:
+    return output_path + ".shards"
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseTable:
+    """The blocks of one PDF and who holds them, in a SQLite file shared by all workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA busy_timeout = 60000')
+
+    @classmethod
+    def create(cls, path: str, pages: int, block: int) -> "LeaseTable":
+        table = cls(path)
+        table.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS blocks (
+                start INTEGER PRIMARY KEY, end INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'todo',   -- todo / leased / done / failed
+                worker TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0,
+                segment TEXT, claimed_at REAL, done_at REAL);
+        ''')
+        if table.conn.execute('SELECT COUNT(*) FROM blocks').fetchone()[0] == 0:
+            table.conn.execute('BEGIN IMMEDIATE')
+            table.conn.executemany('INSERT INTO blocks (start, end) VALUES (?, ?)',
+                                   [(s, min(s + block, pages)) for s in range(0, pages, block)])
+            table.conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                                   [("pages", str(pages)), ("block", str(block))])
+            table.conn.execute('COMMIT')
+        return table
+
+    def meta(self, key: str) -> str:
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, worker: str, lease: float = LEASE_SECONDS):
+        """(start, end, attempt) of the block now leased to `worker`, or None if none is free."""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute(
+                "SELECT start, end, attempts FROM blocks "
+                "WHERE status = 'todo' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY start LIMIT 1", (now,)).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            start, end, attempts = row
+            if attempts >= MAX_ATTEMPTS:
+                self.conn.execute("UPDATE blocks SET status = 'failed', worker = NULL WHERE start = ?", (start,))
+                self.conn.execute('COMMIT')
+                return self.claim(worker, lease)
+            self.conn.execute(
+                "UPDATE blocks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "claimed_at = ? WHERE start = ?", (worker, now + lease, now, start))
+            self.conn.execute('COMMIT')
+            return start, end, attempts + 1
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def renew(self, start: int, worker: str, lease: float = LEASE_SECONDS):
+        """Extend our lease; LeaseLost if the block is no longer ours."""
+        updated = self.conn.execute(
+            "UPDATE blocks SET lease_until = ? WHERE start = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease, start, worker)).rowcount
+        if not updated:
+            raise LeaseLost(f"block {start + 1} was taken over")
+
+    def finish(self, start: int, worker: str, segment: str):
+        self.conn.execute(
+            "UPDATE blocks SET status = 'done', segment = ?, done_at = ?, lease_until = NULL "
+            "WHERE start = ? AND worker = ? AND status = 'leased'",
+            (segment, time.time(), start, worker))
+
+    def release(self, start: int, worker: str):
+        """Give the block back (pages failed) for another claim."""
+        self.conn.execute(
+            "UPDATE blocks SET status = 'todo', worker = NULL, lease_until = NULL "
+            "WHERE start = ? AND worker = ? AND status = 'leased'", (start, worker))
+
+    def blocks(self) -> list:
+        return self.conn.execute(
+            'SELECT start, end, status, worker, lease_until, attempts, segment, claimed_at, done_at '
+            'FROM blocks ORDER BY start').fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def open_table(output_path: str) -> LeaseTable:
+    path = os.path.join(shards_dir(output_path), "leases.sqlite")
+    if not os.path.exists(path):
+        print(f"❌ No lease table at {path}; run `shard.py init` first")
+        sys.exit(1)
+    return LeaseTable(path)
+
+
+def init(pdf_path: str, output_path: str, block: int = DEFAULT_BLOCK) -> LeaseTable:
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        pages = len(doc)
+    os.makedirs(shards_dir(output_path), exist_ok=True)
+    table = LeaseTable.create(os.path.join(shards_dir(output_path), "leases.sqlite"), pages, block)
+    block = int(table.meta("block"))
+    print(f"🧩 {pages} pages in {len(table.blocks())} blocks of {block} → {shards_dir(output_path)}")
+    return table
+
+
+def segment_done(segment: str, start: int, end: int) -> bool:
+    """Every page of the block is in the segment (its journal, or the index once finished)."""
+    from progress_journal import ProgressJournal
+    journal_file = segment + ".progress.jsonl"
+    pages = ProgressJournal(journal_file).pages if os.path.exists(journal_file) else (
+        load_index(segment) if os.path.exists(segment) else {})
+    return all(p in pages for p in range(start, end))
+
+
+def work(pdf_path: str, output_path: str, pool, concurrency: int, prompt: str, cache=None,
+         lease: float = LEASE_SECONDS, wait: bool = True, **ocr_kwargs) -> int:
+    """Claim and OCR blocks until none is left; returns the number of blocks done."""
+    from ocr_pdf import ocr_pdf
+
+    table = open_table(output_path)
+    worker = worker_id()
+    done = 0
+    try:
+        while True:
+            claimed = table.claim(worker, lease)
+            if claimed is None:
+                pending = [b for b in table.blocks() if b[2] == "leased"]
+                if not (wait and pending):
+                    break
+                time.sleep(IDLE_POLL)  # a lease may expire (dead worker) and need taking over
+                continue
+            start, end, attempt = claimed
+            segment = os.path.join(shards_dir(output_path), f"block_{start + 1:05d}.{worker}.txt")
+            print(f"🧩 [{worker}] pages {start + 1}-{end} (attempt {attempt}) → {os.path.basename(segment)}")
+            try:
+                ocr_pdf(pdf_path, segment, start, end, concurrency=concurrency, prompt=prompt, pool=pool,
+                        cache=cache, on_page=lambda p, _: table.renew(start, worker, lease), **ocr_kwargs)
+            except LeaseLost as e:
+                print(f"⚠️ [{worker}] {e}; moving on")
+                continue
+            if segment_done(segment, start, end):
+                table.finish(start, worker, segment)
+                done += 1
+            else:
+                print(f"❌ [{worker}] pages {start + 1}-{end} incomplete; released for another attempt")
+                table.release(start, worker)
+    finally:
+        table.close()
+    return done
+
+
+def merge(output_path: str) -> int:
+    """Assemble the done segments into the output in page order; returns the pages written."""
+    table = open_table(output_path)
+    blocks = table.blocks()
+    table.close()
+    missing = [(start, end, status) for start, end, status, *_ in blocks if status != "done"]
+    if missing:
+        print(f"❌ {len(missing)} blocks not done: "
+              + ", ".join(f"{s + 1}-{e} ({status})" for s, e, status in missing[:10]))
+        return 0
+
+    tmp = output_path + ".tmp"
+    pages = {}
+    with open(tmp, 'wb') as f:
+        for i, (start, end, _, _, _, _, segment, _, _) in enumerate(blocks):
+            index = load_index(segment)
+            if i == 0:
+                with open(segment, 'rb') as seg:
+                    f.write(seg.read(min(offset for offset, _ in index.values())))  # header
+            for page_num in range(start, end):
+                offset = f.tell()
+                block = page_block(page_num, read_page(segment, page_num, index))
+                f.write(block)
+                pages[page_num] = (offset, len(block))
+    os.replace(tmp, output_path)
+    write_index(output_path, pages)
+    return len(pages)
+
+
+def status(output_path: str):
+    table = open_table(output_path)
+    blocks = table.blocks()
+    total_pages = int(table.meta("pages"))
+    table.close()
+    now = time.time()
+    counts = {}
+    workers = {}
+    done_pages = 0
+    for start, end, state, worker, lease_until, attempts, _, claimed_at, done_at in blocks:
+        if state == "leased" and lease_until < now:
+            state = "expired"
+        counts[state] = counts.get(state, 0) + 1
+        if state == "done":
+            done_pages += end - start
+        if state in ("leased", "done") and worker:
+            workers.setdefault(worker, []).append(state)
+    print(f"🧩 {len(blocks)} blocks: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+    print(f"📊 Pages done: {done_pages}/{total_pages}")
+    for worker, states in sorted(workers.items()):
+        print(f"   {worker}: {states.count('done')} blocks done"
+              + (", working" if "leased" in states else ""))
+    started = [b[7] for b in blocks if b[7]]
+    if started and done_pages:
+        from ocr_pdf import format_time
+        elapsed = now - min(started)
+        print(f"⏱️  ETA: {format_time(elapsed / done_pages * (total_pages - done_pages))} "
+              f"({done_pages / elapsed * 3600:.0f} pages/hour over all workers)")
+
+
+def run_local(args, worker_argv: list):
+    """init + args.workers `work` processes on this machine + merge."""
+    output_path = args.output or os.path.splitext(args.pdf_path)[0] + ".txt"
+    init(args.pdf_path, output_path, args.block).close()
+    start = time.time()
+    workers = []
+    for i in range(args.workers):
+        log = open(os.path.join(shards_dir(output_path), f"worker_{i + 1}.log"), 'w')
+        command = [sys.executable, os.path.abspath(__file__), "work", args.pdf_path, "-o", output_path,
+                   *worker_argv]
+        workers.append((subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log))
+    print(f"👷 {args.workers} workers (logs: {shards_dir(output_path)}/worker_N.log)")
+    for process, log in workers:
+        process.wait()
+        log.close()
+    status(output_path)
+    written = merge(output_path)
+    if written:
+        elapsed = time.time() - start
+        from ocr_pdf import format_time
+        print(f"✅ Merged {written} pages → {output_path} in {format_time(elapsed)} "
+              f"({written / elapsed * 3600:.0f} pages/hour)")
+
+
+def main():
+    from ocr_pdf import add_ocr_args, positive_int
+
+    parser = argparse.ArgumentParser(description="Shard one PDF across workers with a lease table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    commands = {
+        "init": sub.add_parser("init", help="Create the lease table"),
+        "work": sub.add_parser("work", help="Claim and OCR blocks until none is left"),
+        "status": sub.add_parser("status", help="Blocks, workers and ETA"),
+        "merge": sub.add_parser("merge", help="Assemble the segments into the output"),
+        "local": sub.add_parser("local", help="init + N local worker processes + merge"),
+    }
+    for name, command in commands.items():
+        command.add_argument("pdf_path", help="Path to PDF file")
+        command.add_argument("-o", "--output", help="Output text file path (default: PDF path with .txt)")
+        if name in ("init", "local"):
+            command.add_argument("--block", type=positive_int, default=DEFAULT_BLOCK,
+                                 help=f"Pages per block (default: {DEFAULT_BLOCK})")
+        if name in ("work", "local"):
+            command.add_argument("--prompt", choices=["ocr_pdf", "ocr_pdf_2"], default="ocr_pdf",
+                                 help="Which script's prompt to use (default: ocr_pdf)")
+            command.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                                 help=f"Lease seconds, renewed per page (default: {LEASE_SECONDS})")
+            command.add_argument("--no-wait", action="store_true",
+                                 help="Exit when no block is free instead of waiting for expiring leases")
+            add_ocr_args(command)
+        if name == "local":
+            command.add_argument("--workers", type=positive_int, default=3, help="Worker processes (default: 3)")
+        if name == "merge":
+            command.add_argument("--clean", action="store_true", help="Delete the shards directory after merging")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pdf_path):
+        print(f"❌ PDF not found: {args.pdf_path}")
+        sys.exit(1)
+    output_path = args.output or os.path.splitext(args.pdf_path)[0] + ".txt"
+
+    if args.command == "init":
+        init(args.pdf_path, output_path, args.block).close()
+    elif args.command == "status":
+        status(output_path)
+    elif args.command == "merge":
+        written = merge(output_path)
+        if written:
+            print(f"✅ Merged {written} pages → {output_path}")
+            if args.clean:
+                shutil.rmtree(shards_dir(output_path))
+        else:
+            sys.exit(1)
+    elif args.command == "local":
+        # The workers get every option except the local-only ones
+        worker_argv = []
+        argv = iter(sys.argv[sys.argv.index("local") + 1:])
+        for arg in argv:
+            if arg in LOCAL_OPTIONS:
+                next(argv, None)  # and its value
+            elif arg.split("=")[0] not in LOCAL_OPTIONS and arg != args.pdf_path:
+                worker_argv.append(arg)
+        run_local(args, worker_argv)
+    else:
+        import ocr_pdf
+        from ocr_cache import OCRCache
+
+        if args.prompt == "ocr_pdf_2":
+            from ocr_pdf_2 import OCR_PROMPT as prompt
+        else:
+            prompt = ocr_pdf.OCR_PROMPT
+        pool, concurrency = ocr_pdf.pool_from_args(args)
+        cache = None if args.no_cache else OCRCache(args.cache)
+        start = time.time()
+        try:
+            done = work(args.pdf_path, output_path, pool, concurrency, prompt, cache, args.lease,
+                        not args.no_wait, **ocr_pdf.ocr_kwargs_from_args(args))
+        finally:
+            if cache:
+                cache.close()
+        print(f"🏁 [{worker_id()}] {done} blocks in {ocr_pdf.format_time(time.time() - start)}")
+
+
+if __name__ == "__main__":
+    main()
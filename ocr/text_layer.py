@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Text-layer scoring for born-digital PDF pages.
+
+`score_page` looks at a page's embedded text (PyMuPDF) and decides whether it
+can be used instead of vision OCR:
+  - chars: enough text to be a real page, not a scan with a stray watermark
+  - diacritic_ratio: share of words carrying Vietnamese diacritics; legacy
+    TCVN3/VNI fonts extract as diacritic-free or symbol-laden garbage
+  - invalid_ratio: share of characters outside Vietnamese letters, ASCII and
+    common typographic punctuation (mojibake, private-use glyphs, U+FFFD)
+  - table_lines: ruling line segments; pages with tables are extracted with
+    pdfplumber so tables come out as markdown like the VLM output
+
+Usage:
+    python ocr/text_layer.py file.pdf            # score every page
+    python ocr/text_layer.py file.pdf -s 0 -e 20
+"""
+
+import argparse
+import os
+import re
+from dataclasses import dataclass
+
+VI_LOWER = ("àáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọôồốổỗộơờớởỡợ"
+            "ùúủũụưừứửữựỳýỷỹỵđ")
+VI_CHARS = frozenset(VI_LOWER + VI_LOWER.upper())
+EXTRA_CHARS = frozenset("“”‘’–—…•°№×÷≤≥±§")
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+# Thresholds for a usable text layer
+MIN_CHARS = 100
+MIN_DIACRITIC_RATIO = 0.15
+MAX_INVALID_RATIO = 0.02
+MIN_TABLE_LINES = 4
+
+
+@dataclass
+class TextLayerScore:
+    chars: int
+    diacritic_ratio: float
+    invalid_ratio: float
+    table_lines: int
+
+    @property
+    def usable(self) -> bool:
+        return (self.chars >= MIN_CHARS
+                and self.diacritic_ratio >= MIN_DIACRITIC_RATIO
+                and self.invalid_ratio <= MAX_INVALID_RATIO)
+
+    @property
+    def has_tables(self) -> bool:
+        return self.table_lines >= MIN_TABLE_LINES
+
+
+def _is_valid_char(ch: str) -> bool:
+    return (ch.isascii() and (ch.isprintable() or ch in "\n\t")) or ch in VI_CHARS or ch in EXTRA_CHARS
+
+
+def score_text(text: str, table_lines: int = 0) -> TextLayerScore:
+    """Score extracted text (see module docstring)."""
+    stripped = "".join(text.split())
+    words = WORD_RE.findall(text)
+    if not stripped:
+        return TextLayerScore(0, 0.0, 0.0, table_lines)
+    invalid = sum(1 for ch in stripped if not _is_valid_char(ch))
+    with_diacritics = sum(1 for w in words if any(ch in VI_CHARS for ch in w))
+    return TextLayerScore(
+        chars=len(stripped),
+        diacritic_ratio=with_diacritics / len(words) if words else 0.0,
+        invalid_ratio=invalid / len(stripped),
+        table_lines=table_lines,
+    )
+
+
+def count_table_lines(page) -> int:
+    """Horizontal/vertical ruling segments drawn on a PyMuPDF page."""
+    count = 0
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.x - p2.x) < 1 or abs(p1.y - p2.y) < 1:
+                    count += 1
+            elif item[0] == "re":
+                rect = item[1]
+                # thin rectangles are how many generators draw cell borders
+                count += 1 if min(rect.width, rect.height) < 2 else 4
+    return count
+
+
+def score_page(page) -> tuple:
+    """Return (TextLayerScore, text) for a PyMuPDF page."""
+    text = page.get_text()
+    return score_text(text, count_table_lines(page)), text
+
+
+def page_markdown_with_tables(plumber_page) -> str:
+    """
+    Text of a pdfplumber page with tables rendered as markdown, in reading
+    order: the page is cut into horizontal bands above/between/below tables.
+    """
+    from extract_tables import table_to_markdown
+
+    tables = sorted(plumber_page.find_tables(), key=lambda t: t.bbox[1])
+    width, height = plumber_page.width, plumber_page.height
+    parts = []
+    top = 0
+    for table in tables:
+        _, table_top, _, table_bottom = table.bbox
+        if table_top > top:
+            parts.append(plumber_page.crop((0, top, width, table_top)).extract_text() or "")
+        rows = table.extract()
+        if rows and len(rows) > 1:
+            parts.append(table_to_markdown(rows))
+        top = max(top, table_bottom)
+    if top < height:
+        parts.append(plumber_page.crop((0, top, width, height)).extract_text() or "")
+    return "\n\n".join(part.strip() for part in parts if part.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the text layer of PDF pages")
+    parser.add_argument("pdf_path", help="Path to PDF file")
+    parser.add_argument("-s", "--start", type=int, default=0, help="Start page (0-indexed)")
+    parser.add_argument("-e", "--end", type=int, help="End page (exclusive)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pdf_path):
+        print(f"❌ PDF not found: {args.pdf_path}")
+        return
+
+    import fitz  # PyMuPDF
+    doc = fitz.open(args.pdf_path)
+    end = args.end if args.end is not None else len(doc)
+    usable = 0
+    for page_num in range(args.start, end):
+        score, _ = score_page(doc.load_page(page_num))
+        usable += score.usable
+        route = ("table" if score.has_tables else "text") if score.usable else "vlm"
+        print(f"Page {page_num + 1:>4} | {route:<5} | chars {score.chars:>6} | "
+              f"diacritics {score.diacritic_ratio:.2f} | invalid {score.invalid_ratio:.3f} | "
+              f"lines {score.table_lines}")
+    doc.close()
+    print(f"📊 Usable text layer: {usable}/{end - args.start} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 Pipeline hoàn chỉnh để crawl và xử lý văn bản pháp luật từ thuvienphapluat.vn
 
 Sử dụng:
-    python pipeline.py <url> [--output FILE] [--cookies FILE] [--doc-name NAME]
+    python pipeline.py <url> [--output FILE] [--cookies FILE] [--doc-name NAME] [--format txt|json|jsonl]
 
 Ví dụ:
     python pipeline.py "https://thuvienphapluat.vn/van-ban/Doanh-nghiep/Nghi-dinh-47-2021-ND-CP-huong-dan-Luat-Doanh-nghiep-470561.aspx"
@@ -14,9 +14,23 @@ import argparse
 import os
 import re
 import sys
+from typing import TYPE_CHECKING
 
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from legal_tree import build_document_tree, render_text, to_chunks_jsonl, to_json, to_jsonl
+from profiling import Profiler, add_profiling_args, profiler_from_args
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+OUTPUT_FORMATS = {
+    "txt": ".txt",      # text, mỗi Điều một đoạn có tên văn bản ở đầu (mặc định)
+    "json": ".json",    # cây Chương/Mục/Điều/Khoản/Điểm
+    "jsonl": ".jsonl",  # mỗi dòng một Điều
+    "chunks": ".chunks.jsonl",  # chunk theo Điều cho retrieval, id = hash nội dung
+}
+
+# bs4 và Playwright được import trong hàm dùng đến, để --help và các bước
+# không cần crawl (postprocess) khởi động nhanh.
 
 
 def load_cookies_from_file(cookie_file: str) -> list:
@@ -105,6 +119,8 @@ def crawl_html(url: str, cookie_file: str = None) -> str:
     Returns:
         HTML content
     """
+    from playwright.sync_api import sync_playwright
+    
     print(f"🌐 Đang crawl: {url}")
     
     with sync_playwright() as p:
@@ -126,7 +142,7 @@ def crawl_html(url: str, cookie_file: str = None) -> str:
     return html
 
 
-def extract_hover_content(soup: BeautifulSoup, element) -> str:
+def extract_hover_content(soup: "BeautifulSoup", element) -> str:
     """
     Trích xuất nội dung hover tooltip từ element.
     """
@@ -151,7 +167,7 @@ def extract_hover_content(soup: BeautifulSoup, element) -> str:
     return ""
 
 
-def extract_note_content(soup: BeautifulSoup, element) -> str:
+def extract_note_content(soup: "BeautifulSoup", element) -> str:
     """
     Trích xuất nội dung từ dvNoteDieuKhoan dựa vào id của element.
     Ví dụ: id="span-note_khoan_34_4" -> tìm div id="note_khoan_34_4"
@@ -184,7 +200,7 @@ def extract_note_content(soup: BeautifulSoup, element) -> str:
     return ""
 
 
-def process_element_with_hover(soup: BeautifulSoup, content_div) -> None:
+def process_element_with_hover(soup: "BeautifulSoup", content_div) -> None:
     """
     Xử lý các element có hover và chèn nội dung tooltip vào sau text.
     """
@@ -223,6 +239,8 @@ def extract_content(html: str) -> str:
     Returns:
         Text content đã được chuẩn hóa
     """
+    from bs4 import BeautifulSoup, NavigableString
+    
     print("📄 Đang trích xuất nội dung...")
     
     soup = BeautifulSoup(html, "html.parser")
@@ -245,7 +263,6 @@ def extract_content(html: str) -> str:
             normalized_text = ' '.join(text_content.split())
             b_tag.string = normalized_text
             # Thêm marker sau thẻ <b> này
-            from bs4 import NavigableString
             b_tag.insert_after(NavigableString(DIEU_MARKER))
     
     # Lấy text
@@ -384,7 +401,13 @@ def postprocess(content: str, doc_name: str) -> str:
     return content
 
 
-def run_pipeline(url: str, cookie_file: str = "cookies.txt", doc_name: str = None) -> str:
+def output_file_for(doc_name: str, output_format: str = "txt") -> str:
+    """Tên file output suy ra từ tên văn bản."""
+    return f"{doc_name.replace(' ', '_').replace('/','-')}{OUTPUT_FORMATS[output_format]}"
+
+
+def run_pipeline(url: str, cookie_file: str = "cookies.txt", doc_name: str = None,
+                 profiler: Profiler = None, output_format: str = "txt") -> str:
     """
     Chạy pipeline hoàn chỉnh.
     
@@ -393,6 +416,8 @@ def run_pipeline(url: str, cookie_file: str = "cookies.txt", doc_name: str = Non
         output_file: File output (optional)
         cookie_file: File cookies (default: cookies.txt)
         doc_name: Tên văn bản (auto-detect nếu không cung cấp)
+        profiler: Profiler cho từng bước (optional)
+        output_format: txt | json | jsonl | chunks (xem OUTPUT_FORMATS)
         
     Returns:
         Nội dung văn bản đã xử lý
@@ -406,27 +431,32 @@ def run_pipeline(url: str, cookie_file: str = "cookies.txt", doc_name: str = Non
         doc_name = extract_doc_name_from_url(url)
     print(f"📋 Văn bản: {doc_name}")
     
+    output_file = output_file_for(doc_name, output_format)
+    if profiler is None:
+        profiler = Profiler(os.path.splitext(output_file)[0])
+    
     # Step 1: Crawl HTML
-    html = crawl_html(url, cookie_file if os.path.exists(cookie_file) else None)
+    with profiler.stage("crawl"):
+        html = crawl_html(url, cookie_file if os.path.exists(cookie_file) else None)
     # html = crawl_html(url)
     print(f"   ✓ Đã tải {len(html):,} bytes HTML")
     
-    # Step 2: Extract content
-    content = extract_content(html)
-    print(f"   ✓ Đã trích xuất {len(content):,} ký tự")
+    # Step 2: Dựng cây văn bản trực tiếp từ DOM
+    with profiler.stage("extract"):
+        tree = build_document_tree(html, doc_name)
+    print(f"   ✓ Đã dựng cấu trúc văn bản")
     
-    # Step 3: Postprocess
-    processed = postprocess(content, doc_name)
-    print(f"   ✓ Đã postprocess xong")
-    
-    # Step 4: Thêm doc_name vào đầu file
-    processed = f"{doc_name}\n{processed}"
+    # Step 3-4: Render theo format (txt có tên văn bản ở dòng đầu)
+    with profiler.stage("render"):
+        serialize = {"txt": render_text, "json": to_json, "jsonl": to_jsonl, "chunks": to_chunks_jsonl}[output_format]
+        processed = serialize(tree)
+    print(f"   ✓ Đã render {len(processed):,} ký tự ({output_format})")
     
     # Step 5: Save output
-    output_file = f"{doc_name.replace(' ', '_').replace('/','-')}.txt"
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(processed)
     print(f"   ✓ Đã lưu vào: {output_file}")
+    profiler.close()
     
     print("=" * 60)
     print("✅ HOÀN THÀNH!")
@@ -446,20 +476,29 @@ Ví dụ:
   python pipeline.py "https://thuvienphapluat.vn/van-ban/..." --output "output.txt"
   
   python pipeline.py "https://thuvienphapluat.vn/van-ban/..." --doc-name "Luật ABC 2024"
+  
+  python pipeline.py "https://thuvienphapluat.vn/van-ban/..." --format json
         """
     )
     
     parser.add_argument("url", help="URL của văn bản pháp luật trên thuvienphapluat.vn")
     parser.add_argument("-c", "--cookies", default="cookies.txt", help="File cookies (default: cookies.txt)")
     parser.add_argument("-n", "--doc-name", help="Tên văn bản (auto-detect nếu không cung cấp)")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="txt",
+                        help="Định dạng output: txt (default), json (cây văn bản), jsonl (mỗi dòng một Điều), "
+                             "chunks (chunk theo Điều với id ổn định)")
+    add_profiling_args(parser)
     
     args = parser.parse_args()
+    doc_name = args.doc_name or extract_doc_name_from_url(args.url)
     
     try:
         run_pipeline(
             url=args.url,
             cookie_file=args.cookies,
-            doc_name=args.doc_name
+            doc_name=doc_name,
+            profiler=profiler_from_args(args, os.path.splitext(output_file_for(doc_name))[0]),
+            output_format=args.format
         )
     except Exception as e:
         print(f"❌ Lỗi: {e}")
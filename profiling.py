@@ -0,0 +1,215 @@
+"""
+Profiling hooks dùng chung cho các CLI (pipeline.py, ocr/*.py).
+
+Mỗi CLI gọi `add_profiling_args(parser)` rồi `profiler_from_args(args, base)`
+và bọc từng bước bằng `with profiler.stage("ten_buoc"):`. Khi không bật
+--profile / --trace-memory thì profiler là no-op.
+
+Output (cạnh file output, cùng prefix `base`):
+    <base>.<stage>.prof        cProfile dump (xem bằng snakeviz / pstats)
+    <base>.<stage>.folded      stack đã gộp, dùng cho flamegraph.pl / speedscope
+    <base>.memory.txt          tracemalloc top-N allocation theo từng stage
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+def add_profiling_args(parser) -> None:
+    """Thêm --profile / --trace-memory / --sample-interval vào argparse parser."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILE_MODES,
+                       help="Profile từng stage: cprofile (.prof) hoặc sample (.folded flamegraph)")
+    group.add_argument("--trace-memory", type=int, nargs="?", const=10, default=0, metavar="N",
+                       help="Ghi tracemalloc top-N allocation theo từng stage (default N: 10)")
+    group.add_argument("--sample-interval", type=float, default=5.0, metavar="MS",
+                       help="Chu kỳ lấy mẫu (ms) cho --profile sample (default: 5)")
+
+
+def profiler_from_args(args, output_base: str) -> "Profiler":
+    """Tạo Profiler từ args đã parse; output_base là đường dẫn output bỏ extension."""
+    return Profiler(
+        output_base,
+        mode=getattr(args, "profile", None),
+        trace_memory=getattr(args, "trace_memory", 0) or 0,
+        sample_interval=getattr(args, "sample_interval", 5.0) / 1000,
+    )
+
+
+class _StackSampler:
+    """Sampling profiler thuần Python: chụp stack của một thread theo chu kỳ."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Profile theo stage. Một stage có thể được vào nhiều lần (vd. render/ocr
+    cho từng trang); kết quả được cộng dồn và ghi ra khi gọi close().
+    """
+
+    def __init__(self, output_base: str, mode: str = None, trace_memory: int = 0,
+                 sample_interval: float = 0.005):
+        self.output_base = output_base
+        self.mode = mode
+        self.trace_memory = trace_memory
+        self.sample_interval = sample_interval
+        self.enabled = bool(mode or trace_memory)
+        self._profiles = {}
+        self._samplers = {}
+        self._memory = {}
+        self._timings = Counter()
+        self._external = set()
+        self._active = None
+
+    def add(self, name: str, seconds: float):
+        """
+        Cộng thời gian đo ở nơi khác (vd. trong process render của ocr_pdf) vào
+        stage `name`. Stage này chỉ có thời gian, không có cProfile / sampler.
+        """
+        if not self.enabled:
+            return
+        self._timings[name] += seconds
+        self._external.add(name)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Bọc một bước xử lý. Stage lồng nhau được tính vào stage ngoài cùng."""
+        if not self.enabled or self._active is not None:
+            yield
+            return
+
+        self._active = name
+        snapshot = self._start_memory()
+        collector = self._start_cpu(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timings[name] += time.perf_counter() - start
+            self._stop_cpu(collector)
+            self._stop_memory(name, snapshot)
+            self._active = None
+
+    def _start_cpu(self, name: str):
+        if self.mode == "cprofile":
+            import cProfile
+            prof = self._profiles.setdefault(name, cProfile.Profile())
+            prof.enable()
+            return prof
+        if self.mode == "sample":
+            sampler = self._samplers.get(name)
+            if sampler is None:
+                sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+                self._samplers[name] = sampler
+            sampler.start()
+            return sampler
+        return None
+
+    def _stop_cpu(self, collector):
+        if collector is None:
+            return
+        if self.mode == "cprofile":
+            collector.disable()
+        else:
+            collector.stop()
+
+    def _start_memory(self):
+        if not self.trace_memory:
+            return None
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        return tracemalloc.take_snapshot()
+
+    def _stop_memory(self, name: str, before):
+        if before is None:
+            return
+        import tracemalloc
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        entry = self._memory.setdefault(name, {"peak": 0, "calls": 0, "stats": Counter(), "counts": Counter()})
+        entry["peak"] = max(entry["peak"], peak)
+        entry["calls"] += 1
+        for stat in after.compare_to(before, "lineno"):
+            key = str(stat.traceback[0])
+            entry["stats"][key] += stat.size_diff
+            entry["counts"][key] += stat.count_diff
+
+    def close(self) -> list:
+        """Ghi kết quả profile ra đĩa. Trả về danh sách file đã ghi."""
+        if not self.enabled:
+            return []
+
+        written = []
+        for name, prof in self._profiles.items():
+            path = f"{self.output_base}.{name}.prof"
+            prof.dump_stats(path)
+            written.append(path)
+        for name, sampler in self._samplers.items():
+            path = f"{self.output_base}.{name}.folded"
+            sampler.write_folded(path)
+            written.append(path)
+        if self._memory:
+            path = f"{self.output_base}.memory.txt"
+            self._write_memory_report(path)
+            written.append(path)
+            import tracemalloc
+            tracemalloc.stop()
+
+        print("🔬 Profile:")
+        for name, seconds in self._timings.items():
+            where = " (tổng trong các worker process)" if name in self._external else ""
+            print(f"   {name}: {seconds:.2f}s{where}")
+        for path in written:
+            print(f"   → {path}")
+        return written
+
+    def _write_memory_report(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for name, entry in self._memory.items():
+                f.write(f"# Stage: {name} | calls: {entry['calls']} | "
+                        f"peak: {entry['peak'] / 1024 / 1024:.1f} MiB\n")
+                for key, size in entry["stats"].most_common(self.trace_memory):
+                    f.write(f"{size / 1024:>12.1f} KiB {entry['counts'][key]:>8} blocks  {key}\n")
+                f.write("\n")
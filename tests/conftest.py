@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Script ở gốc repo và trong ocr/ import lẫn nhau theo tên file (chạy bằng `python x.py`)
+for path in (ROOT, ROOT / "ocr"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
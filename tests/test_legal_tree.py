@@ -0,0 +1,74 @@
+import re
+
+from conftest import ROOT
+from legal_tree import Chuong, Dieu, LegalDocument, Muc, build_document_tree, iter_dieu, render_text
+from pipeline import extract_content, postprocess
+
+FIXTURE = ROOT / "benchmarks" / "fixtures" / "nghi_dinh_47_2021.html"
+DOC_NAME = "Nghị định 47/2021/NĐ-CP"
+
+
+def _old_txt(html: str) -> str:
+    """Output txt trước đây của pipeline: extract_content + postprocess."""
+    return f"{DOC_NAME}\n{postprocess(extract_content(html), DOC_NAME)}"
+
+
+def test_render_text_matches_old_txt_output():
+    html = FIXTURE.read_text(encoding="utf-8")
+    old = _old_txt(html)
+    new = render_text(build_document_tree(html, DOC_NAME))
+
+    # Khác biệt có chủ đích: phần mở đầu (bảng tiêu đề, tên văn bản) và phần kết
+    # (Nơi nhận, chữ ký) giữ xuống dòng theo ô bảng / <br> thay vì dính liền
+    # ("CHÍNH PHỦ-------"), file kết thúc bằng newline. Bỏ khoảng trắng thì giống hệt.
+    assert re.sub(r'\s+', '', new) == re.sub(r'\s+', '', old)
+
+    # Từ Chương đầu tiên đến trước phần kết: giống từng ký tự.
+    def body(text):
+        start = text.index(f"\n\n{DOC_NAME}. Chương")
+        return text[start:text.index("\nNơi nhận:")]
+
+    assert body(new) == body(old)
+
+
+def test_note_attached_to_current_khoan():
+    doc = build_document_tree(FIXTURE.read_text(encoding="utf-8"), DOC_NAME)
+    dieu = next(dieu for _, _, dieu in iter_dieu(doc) if dieu.number == "5")
+
+    # Ghi chú "4. Ý kiến ..." bổ sung cho Khoản 3, không mở Khoản 4 mới
+    assert [khoan.number for khoan in dieu.khoan] == ["1", "2", "3"]
+    assert dieu.khoan[-1].text.endswith("4. Ý kiến bằng văn bản của Bộ Tài chính. "
+                                        "[Khoản này được bổ sung bởi Khoản 2 Điều 1 Nghị định 16/2023/NĐ-CP]")
+    assert dieu.khoan[-1].notes == ["Khoản này được bổ sung bởi Khoản 2 Điều 1 Nghị định 16/2023/NĐ-CP"]
+
+
+def test_note_never_opens_structure():
+    html = """<div class="content1">
+<p><b>Điều 1. Phạm vi</b></p>
+<p>1. Khoản một.<huongdan id="span-note_1">Bổ sung</huongdan></p>
+<p>2. Khoản hai.</p>
+</div>
+<div id="note_1">Điều 2. Không phải Điều mới|~|Được bổ sung bởi Nghị định X</div>"""
+    doc = build_document_tree(html, DOC_NAME)
+
+    assert [dieu.number for dieu in doc.dieu] == ["1"]
+    assert [khoan.number for khoan in doc.dieu[0].khoan] == ["1", "2"]
+    assert doc.dieu[0].khoan[0].text == "Khoản một.\nĐiều 2. Không phải Điều mới [Được bổ sung bởi Nghị định X]"
+
+
+def test_chuong_children_in_document_order():
+    chuong = Chuong("I", "QUY ĐỊNH CHUNG", children=[
+        Dieu("1", "Một"),
+        Muc("1", "MỤC MỘT", dieu=[Dieu("2", "Hai")]),
+        Dieu("3", "Ba"),
+    ])
+    doc = LegalDocument(name=DOC_NAME, chuong=[chuong])
+
+    assert [dieu.number for _, _, dieu in iter_dieu(doc)] == ["1", "2", "3"]
+    text = render_text(doc)
+    assert text.index("Điều 1.") < text.index("Mục 1.") < text.index("Điều 2.") < text.index("Điều 3.")
+
+
+def test_fixture_dieu_order():
+    doc = build_document_tree(FIXTURE.read_text(encoding="utf-8"), DOC_NAME)
+    assert [dieu.number for _, _, dieu in iter_dieu(doc)] == [str(n) for n in range(1, 10)]
@@ -0,0 +1,65 @@
+import asyncio
+import io
+import time
+
+import page_split
+from ocr_client import OCRResult
+
+SPLIT_SECONDS = 0.3
+
+
+def _page_png() -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("L", (200, 300), 255).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class _OverflowingOCR:
+    """The whole page hits max_tokens; every band fits."""
+
+    def __init__(self, page: bytes):
+        self.page = page
+
+    async def aocr(self, image_bytes, prompt, **kwargs):
+        if image_bytes == self.page:
+            return OCRResult(text="| a |", finish_reason="length")
+        return OCRResult(text="band", finish_reason="stop")
+
+
+def test_split_does_not_block_the_loop(monkeypatch):
+    original = page_split.split_bands
+
+    def slow_split(image_bytes, *args, **kwargs):
+        time.sleep(SPLIT_SECONDS)   # as long as a large page takes to crop and re-encode
+        return original(image_bytes, *args, **kwargs)
+
+    monkeypatch.setattr(page_split, "split_bands", slow_split)
+
+    async def run():
+        gaps = []
+
+        async def ticker(stop):
+            last = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        page = _page_png()
+        stop = asyncio.Event()
+        tick = asyncio.create_task(ticker(stop))
+        result = await page_split.aocr_split(_OverflowingOCR(page), page)
+        stop.set()
+        await tick
+        return result, gaps
+
+    result, gaps = asyncio.run(run())
+
+    assert result.bands == page_split.SPLIT_BANDS
+    assert result.finish_reason == "stop"
+    # The loop kept ticking while the split ran in a thread
+    assert sum(gaps) >= SPLIT_SECONDS
+    assert max(gaps) < SPLIT_SECONDS / 2